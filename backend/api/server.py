@@ -2,10 +2,12 @@ from fastapi import FastAPI, Response
 from threading import Thread
 import subprocess
 import time
-import psutil
 import os, json
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from api.sessions import SessionManager, DEFAULT_SESSION
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from utils.metrics import MetricsRegistry, process_collector, metrics_enabled_at_start
+from utils.model_pool import ModelPool, runtime_available, preload_enabled
 
 app = FastAPI()
 # --- Enable CORS ---
@@ -17,16 +19,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Try to import detector modules for in-process capture. If these imports fail
-# we'll fall back to launching the existing `main.py` as a subprocess.
+# Try to import the in-process capture code. mediapipe/ultralytics are only
+# imported when models load, so their presence is checked without importing
+# them. If anything is missing we fall back to launching `main.py` as a subprocess.
 try:
-    from modules.face_eye_tracker import FaceEyeTracker
-    from modules.phone_detector import PhoneDetector
-    from modules.pen_tracker import PenTracker
-    from modules.alerts import alert_user
-    from utils.focus_score import calculate_focus_score
+    from modules.frame_analyzer import create_frame_analyzer
+    from utils.scheduler import target_fps_from_env
+    from utils.process_pool import exec_mode_from_env
+    from utils.logger import log_focus_data, flush_session_log, close_session_log
+    from modules.alerts import alert_user, shutdown_alerts
+    from utils.focus_engine import FocusEngine
+    from utils.frame_source import open_frame_source, PACING_FAST
+    from utils.pipeline import Pipeline, FramePacket
+    from utils.broadcaster import FrameBroadcaster, STREAM_TIERS
+    from utils.focus_stream import FocusChannel, SnapshotWriter, snapshot_enabled
+    from utils.history import open_history
+    from utils.trace import open_trace
+    from utils.timing import timed, record
     import cv2
-    IN_PROCESS_AVAILABLE = True
+    IN_PROCESS_AVAILABLE = runtime_available()
 except Exception:
     IN_PROCESS_AVAILABLE = False
 
@@ -38,121 +49,334 @@ log_file = None  # file handle where child stdout/stderr are written
 
 # In-process camera worker -------------------------------------------------------
 class CameraWorker(Thread):
-    def __init__(self, camera_index=0):
-        super().__init__(daemon=True)
-        self.camera_index = camera_index
+    def __init__(self, source=None, pacing=None, fps=None, loop=False, detector=None, target_fps=None,
+                 motion_gate=None, roi=None, exec_mode=None, session_id=DEFAULT_SESSION, pool=None,
+                 history=None, track=None, classroom=None, hands=None):
+        """
+        source: webcam index, video file, image folder or "synthetic[:WxH]".
+        None falls back to $FOCUS_SOURCE (default webcam 0).
+        detector: "separate" or "fused" YOLO models (None -> $FOCUS_DETECTOR).
+        target_fps: let the scheduler skip detector runs to hold this FPS.
+        motion_gate: skip YOLO on static scenes (None -> $FOCUS_MOTION_GATE, default on).
+        roi: run object detectors on face-anchored crops (None -> $FOCUS_ROI, default off).
+        exec_mode: "thread" or "process" (one worker process per detector; None -> $FOCUS_EXEC).
+        track: run YOLO every few frames and track its boxes in between (None -> $FOCUS_TRACK).
+        classroom: score up to this many people, each with their own ID (None -> $FOCUS_CLASSROOM).
+        hands: detect writing from hand landmarks and run the pen model only when unsure (None -> $FOCUS_HANDS).
+        pool: shared ModelPool; its engine runs the YOLO models for all sessions
+        and it lends an already warm FaceEyeTracker.
+        history: shared FocusHistory that every scored frame is appended to.
+        """
+        super().__init__(daemon=True, name=f"CameraWorker-{session_id}")
+        self.session_id = session_id
+        self.pool = pool
+        self.history = history
+        self.source = source
+        self.pacing = pacing
+        self.fps = fps
+        self.loop = loop
+        self.detector = detector
+        self.target_fps = target_fps
+        if motion_gate is None:
+            motion_gate = os.environ.get("FOCUS_MOTION_GATE", "1") != "0"
+        self.motion_gate = motion_gate
+        self.roi = roi if roi is not None else os.environ.get("FOCUS_ROI") == "1"
+        self.exec_mode = exec_mode or exec_mode_from_env()
+        self.track = track
+        self.hands = hands
+        self.classroom = classroom if classroom is not None else int(os.environ.get("FOCUS_CLASSROOM", 0) or 0)
         self.running = False
-        self.latest_frame = None  # JPEG bytes
-        self.focus_data = {"focus_score": 0, "distractions": 0, "active": False, "start_time": None}
+        self.broadcaster = FrameBroadcaster()  # annotated frames for /video_feed clients
+        # latest focus state, pushed to /focus_stream clients
+        self.channel = FocusChannel({"focus_score": 0, "distractions": 0, "active": False, "start_time": None})
+        self.snapshot = None
+        self.face_tracker = None  # borrowed from the pool, given back when the session ends
+        self.cap = self.analyzer = self.engine = self.trace = self.pipeline = None
+        self.started_at = None
+        self.first_frame_s = None
+
+    @property
+    def focus_data(self):
+        return self.channel.latest()
+
+    def start(self):
+        self.running = True
+        self.started_at = time.perf_counter()
+        super().start()
 
     def run(self):
         self.running = True
         try:
-            face_tracker = FaceEyeTracker()
-            phone_detector = PhoneDetector()
-            pen_tracker = PenTracker()
-        except Exception as e:
-            print("❌ CameraWorker: failed to initialize detectors:", e)
+            self._run_session()
+        finally:
+            self.broadcaster.close()
+            self.channel.close()
             self.running = False
-            return
 
-        cap = cv2.VideoCapture(self.camera_index)
-        if not cap.isOpened():
-            print("❌ CameraWorker: could not open webcam")
-            self.running = False
+    def _run_session(self):
+        # Check the source before paying for the models
+        try:
+            self.cap = open_frame_source(self.source, pacing=self.pacing, fps=self.fps, loop=self.loop)
+        except ValueError as e:
+            print("❌ CameraWorker: bad frame source config:", e)
+            return
+        if not self.cap.isOpened():
+            print("❌ CameraWorker: could not open frame source")
+            self.cap.release()
             return
 
-        last_save_time = 0
-        distractions = 0
-        smooth_score = 100
-
-        json_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "focus_data.json"))
-
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                time.sleep(0.01)
-                continue
-
-            # Run detectors (they may draw on the frame)
+        # From here on the capture, analyzer and borrowed tracker are released however the session ends
+        try:
             try:
-                face_detected, eyes_closed, looking_away, base_score = face_tracker.analyze_frame(frame)
-                phone_detected, frame = phone_detector.analyze_frame(frame)
-                pen_detected, idle_time, frame = pen_tracker.analyze_frame(frame)
+                # The pool's warm trackers are single-face; classroom mode builds its own
+                if self.pool is not None and self.exec_mode == "thread" and not self.classroom:
+                    self.face_tracker = self.pool.borrow_face_tracker()
+                self.analyzer = create_frame_analyzer(
+                    detector=self.detector,
+                    target_fps=self.target_fps or target_fps_from_env(),
+                    motion_gate=self.motion_gate,
+                    roi=self.roi,
+                    exec_mode=self.exec_mode,
+                    engine=self.pool.engine if self.pool is not None else None,
+                    face_tracker=self.face_tracker,
+                    track=self.track,
+                    classroom=self.classroom,
+                    hands=self.hands,
+                )
             except Exception as e:
-                print("⚠️ Detector error:", e)
-                # don't crash the worker on a single-frame error
-                time.sleep(0.05)
-                continue
-
-            # Compute focus score
-            try:
-                focus_score = calculate_focus_score(face_detected, eyes_closed, phone_detected, pen_detected)
-            except Exception:
-                focus_score = 100
-
-            if phone_detected:
-                focus_score -= 20
-                distractions += 1
-                try:
-                    alert_user("mobile")
-                except Exception:
-                    pass
-
-            if eyes_closed:
-                try:
-                    alert_user("drowsy")
-                except Exception:
-                    pass
-
-            if pen_detected and idle_time > 300:
-                try:
-                    alert_user("inactivity")
-                except Exception:
-                    pass
-
-            smooth_score = 0.85 * smooth_score + 0.15 * focus_score
-            smooth_score = max(0, min(100, smooth_score))
-
-            # Save focus data once per second
-            current_time = time.time()
-            if current_time - last_save_time >= 1:
-                self.focus_data = {
-                    "focus_score": round(smooth_score, 1),
-                    "distractions": distractions,
-                    "active": True,
-                    "timestamp": current_time,
-                }
-                try:
-                    with open(json_path, "w") as f:
-                        json.dump(self.focus_data, f)
-                except Exception:
-                    pass
-                last_save_time = current_time
-
-            # Encode frame to JPEG for streaming
-            try:
-                ok, jpeg = cv2.imencode('.jpg', frame)
-                if ok:
-                    self.latest_frame = jpeg.tobytes()
-            except Exception:
-                pass
-
-            time.sleep(0.02)
-
-        cap.release()
+                print("❌ CameraWorker: failed to initialize detectors:", e)
+                return
+
+            self.engine = FocusEngine(self.session_id, history=self.history, alert=alert_user, log=log_focus_data)
+            # Per-frame detector outputs for offline re-scoring (FOCUS_TRACE=<dir>)
+            self.trace = open_trace(self.session_id, meta={"source": str(self.source)})
+            # Only the default session mirrors its state to focus_data.json,
+            # from a background thread (FOCUS_SNAPSHOT=0 turns it off)
+            if self.session_id == DEFAULT_SESSION and snapshot_enabled():
+                json_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "focus_data.json"))
+                self.snapshot = SnapshotWriter(self.channel, json_path)
+                self.snapshot.start()
+
+            # capture -> inference -> scoring -> publish, one thread each. Live
+            # sources drop the oldest frame under backpressure; "fast" offline
+            # replays block instead so every frame gets scored.
+            self.pipeline = Pipeline([
+                ("capture", self._capture),
+                ("inference", self._inference),
+                ("scoring", self._scoring),
+                ("publish", self._publish),
+            ], queue_size=1, lossless=self.cap.pacing == PACING_FAST)
+            self.pipeline.start()
+
+            while self.running and self.pipeline.is_running():
+                time.sleep(0.1)
+        finally:
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                self.pipeline.join(timeout=2)
+            self.cap.release()
+            if self.analyzer is not None:
+                self.analyzer.close()
+            self._give_back()
+            if self.trace is not None:
+                self.trace.close()
+            flush_session_log()
+            if self.engine is not None:
+                final = dict(self.channel.latest(), active=False, timestamp=time.time(),
+                             summary=self.engine.summary())
+                self.channel.publish(final)
+                if self.snapshot is not None:
+                    self.snapshot.stop(final)
+
+    # --- Pipeline stages ---------------------------------------------------------
+    def _capture(self):
+        with timed("capture"):
+            ret, frame = self.cap.read()
+        if not ret:
+            if self.cap.exhausted:
+                print("🏁 CameraWorker: frame source finished")
+                raise StopIteration
+            else:
+                time.sleep(0.01)
+            return None
+        return FramePacket(self.pipeline.next_frame_id(), frame)
+
+    def _inference(self, packet):
+        # Run detectors (they may draw on the frame)
+        detections, packet.frame = self.analyzer.analyze(packet.frame)
+        if "people" in detections:
+            self.analyzer.face_tracker.redraw(packet.frame)
+        if self.trace is not None:
+            # Here rather than in scoring, while the detectors still hold this frame's boxes
+            self.trace.record(detections, self.analyzer, packet.frame_id)
+        packet.data.update(detections)
+        return packet
+
+    def _scoring(self, packet):
+        # Score, debounce episodes, alert, record history and log (see utils/focus_engine.py)
+        state = self.engine.update(packet.data)
+        state["frame_id"] = packet.frame_id
+        if "people" in packet.data:
+            state["people"] = packet.data["people"]
+        # Push the new state to subscribers (cheap: replaces the latest dict)
+        self.channel.publish(state)
+        return packet
+
+    def _publish(self, packet):
+        # JPEG encoding happens lazily in the broadcaster, only for connected clients
+        self.broadcaster.publish(packet.frame)
+        record("frame_latency", packet.age())  # capture -> ready to stream
+        if self.first_frame_s is None:
+            self.first_frame_s = time.perf_counter() - self.started_at
+            if self.pool is not None:
+                self.pool.record_first_frame(self.session_id, self.first_frame_s)
+        return None
+
+    def _give_back(self):
+        if self.face_tracker is not None:
+            self.pool.give_back(self.face_tracker)
+            self.face_tracker = None
+
+    def pipeline_stats(self):
+        pipeline = getattr(self, "pipeline", None)
+        return pipeline.stats() if pipeline else {}
+
+    def scheduler_stats(self):
+        analyzer = getattr(self, "analyzer", None)
+        return analyzer.scheduler.stats() if analyzer else {}
 
     def stop(self):
         self.running = False
 
 
-camera_worker = None
+pool = ModelPool()  # YOLO engine + warm face trackers, preloaded after startup
+history = None  # shared FocusHistory (SQLite), opened with the first session
+
+
+def _make_worker(session_id, **config):
+    global history
+    if history is None:
+        history = open_history()
+    return CameraWorker(session_id=session_id, pool=pool, history=history, **config)
+
+
+sessions = SessionManager(_make_worker)
+
+
+# Metrics ---------------------------------------------------------------------------
+metrics = MetricsRegistry()
+metrics.add_collector(process_collector)
+if metrics_enabled_at_start():
+    metrics.enable()
+
+
+@metrics.add_collector
+def _session_metrics():
+    workers = {sid: sessions.get(sid) for sid in sessions.list()}
+    workers = {sid: w for sid, w in workers.items() if w is not None}
+    yield "sessions_running", "gauge", "Running camera sessions.", \
+        [({}, sum(1 for w in workers.values() if w.running))]
+
+    processed, dropped, stale, depth, errors = [], [], [], [], []
+    runs, skips, reused, every = [], [], [], []
+    clients, encoded = [], []
+    for sid, worker in workers.items():
+        for stage, st in worker.pipeline_stats().items():
+            labels = {"session": sid, "stage": stage}
+            processed.append((labels, st["processed"]))
+            dropped.append((labels, st["dropped"]))
+            stale.append((labels, st["skipped_stale"]))
+            depth.append((labels, st["queue_depth"]))
+            errors.append((labels, st["errors"]))
+        for job, st in worker.scheduler_stats().get("jobs", {}).items():
+            labels = {"session": sid, "job": job}
+            runs.append((labels, st["runs"]))
+            skips.append((labels, st["skips"]))
+            reused.append((labels, st["reused"]))
+            every.append((labels, st["every"]))
+        stream = worker.broadcaster.stats()
+        clients.append(({"session": sid}, stream["subscribers"]))
+        encoded.append(({"session": sid}, stream["encoded"]))
+
+    yield "frames_processed_total", "counter", "Frames handled by each pipeline stage.", processed
+    yield "frames_dropped_total", "counter", "Frames dropped from the queue in front of a stage.", dropped
+    yield "frames_stale_total", "counter", "Frames skipped as too old by a stage.", stale
+    yield "stage_errors_total", "counter", "Exceptions raised by a pipeline stage.", errors
+    yield "queue_depth", "gauge", "Frames waiting in front of a stage.", depth
+    yield "detector_runs_total", "counter", "Detector runs.", runs
+    yield "detector_skips_total", "counter", "Frames where the scheduler skipped a detector.", skips
+    yield "detector_reused_total", "counter", "Detector runs replaced by the last result on a static scene.", reused
+    yield "detector_every_frames", "gauge", "Current detector cadence (runs every N frames).", every
+    yield "stream_clients", "gauge", "Connected /video_feed clients.", clients
+    yield "stream_frames_encoded_total", "counter", "JPEG encodes done by the broadcaster.", encoded
+
+    engine = pool.engine_if_loaded()
+    if engine is not None:
+        batch = engine.stats()
+        yield "engine_queue_depth", "gauge", "Frames waiting for batched inference.", \
+            [({"model": path}, st["queued"]) for path, st in batch.items()]
+        yield "engine_batches_total", "counter", "Batched inference calls.", \
+            [({"model": path}, st["batches"]) for path, st in batch.items()]
+    if history is not None:
+        st = history.stats()
+        yield "history_queue_depth", "gauge", "Samples waiting to be written to the history store.", [({}, st["queued"])]
+        yield "history_dropped_total", "counter", "Samples dropped because the history queue was full.", \
+            [({}, st["dropped"])]
+
+    st = pool.status()
+    yield "models_ready", "gauge", "1 once the model pool has preloaded and warmed the models.", \
+        [({}, int(st["ready"]))]
+    yield "warm_face_trackers", "gauge", "Warm FaceEyeTrackers waiting to be borrowed.", [({}, st["faces_idle"])]
+    yield "model_cold_starts_total", "counter", "Sessions that had to build a face tracker themselves.", \
+        [({}, st["cold_starts"])]
+    yield "first_frame_seconds", "gauge", "Time from session start to its first published frame (last session).", \
+        [({}, st["first_frame_s"]["last"])]
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text format. Stage histograms start with the first scrape."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+def preload_models():
+    # In the background, so the server answers right away; /ready reports progress
+    if IN_PROCESS_AVAILABLE and preload_enabled():
+        pool.preload_async()
+    else:
+        pool.ready.set()  # nothing to wait for: sessions load their models on demand
+
+
+@app.get("/ready")
+def ready(response: Response):
+    """503 until the models are loaded and warm."""
+    status = pool.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
+@app.on_event("shutdown")
+def shutdown():
+    sessions.stop_all()
+    engine = pool.engine_if_loaded()
+    if engine is not None:
+        engine.shutdown()
+    if IN_PROCESS_AVAILABLE:
+        shutdown_alerts()
+        close_session_log()
+    if history is not None:
+        history.close()
 # ----------------------------------------------------------------------------------
 
 
 @app.post("/start_session")
-def start_session():
-    global process, log_file, camera_worker
+def start_session(source: str = None, pacing: str = None, fps: float = None, loop: bool = False,
+                  detector: str = None, target_fps: float = None, motion_gate: bool = None,
+                  roi: bool = None, exec_mode: str = None, track: bool = None,
+                  classroom: int = None, hands: bool = None):
+    global process, log_file
 
     # If a subprocess is running already (fallback), prevent double-start
     if process is not None and process.poll() is None:
@@ -160,11 +384,13 @@ def start_session():
 
     # Prefer in-process worker when available
     if IN_PROCESS_AVAILABLE:
-        if camera_worker is not None and camera_worker.running:
+        _, worker = sessions.start(DEFAULT_SESSION, source=source, pacing=pacing, fps=fps, loop=loop,
+                                   detector=detector, target_fps=target_fps, motion_gate=motion_gate, roi=roi,
+                                   exec_mode=exec_mode, track=track, classroom=classroom,
+                                   hands=hands)
+        if worker is None:
             return {"status": "error", "message": "Session already running (worker)."}
-        camera_worker = CameraWorker(camera_index=0)
-        camera_worker.start()
-        print(f"✅ Started in-process CameraWorker (thread name={camera_worker.name})")
+        print(f"✅ Started in-process CameraWorker (thread name={worker.name})")
         return {"status": "success", "message": "Focus session started (in-process)."}
 
     # Fallback: launch main.py using the mp_env python
@@ -221,13 +447,12 @@ def start_session():
 
 @app.post("/stop_session")
 def stop_session():
-    global process, log_file, camera_worker
+    global process, log_file
 
     # Stop in-process worker if running
-    if camera_worker is not None and camera_worker.running:
+    if sessions.is_running(DEFAULT_SESSION):
         print("🛑 Stopping in-process CameraWorker...")
-        camera_worker.stop()
-        camera_worker = None
+        sessions.stop(DEFAULT_SESSION)
         return {"status": "success", "message": "Focus session stopped (worker)."}
 
     if process is None or process.poll() is not None:
@@ -253,47 +478,93 @@ def stop_session():
     return {"status": "success", "message": "Focus session stopped."}
 
 
+_file_cache = {"mtime": None, "data": None}
+
+
 @app.get("/focus_data")
 def get_focus_data():
     json_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "focus_data.json")
     json_path = os.path.abspath(json_path)
 
     # If the in-process worker has fresh data, prefer it
-    global camera_worker
-    try:
-        if camera_worker is not None and camera_worker.focus_data:
-            return camera_worker.focus_data
-    except Exception:
-        pass
+    worker = sessions.get(DEFAULT_SESSION)
+    if worker is not None and worker.focus_data:
+        return worker.focus_data
 
-    if os.path.exists(json_path):
+    # Subprocess fallback: only re-parse the file when it changed
+    try:
+        mtime = os.path.getmtime(json_path)
+    except OSError:
+        return {"focus_score": 0, "distractions": 0, "active": False}
+    if mtime != _file_cache["mtime"]:
         with open(json_path, "r") as f:
             try:
-                data = json.load(f)
-                return data
+                _file_cache["data"] = json.load(f)
             except json.JSONDecodeError:
                 return {"focus_score": 0, "distractions": 0, "active": False}
-    return {"focus_score": 0, "distractions": 0, "active": False}
+        _file_cache["mtime"] = mtime
+    return _file_cache["data"]
+
+
+@app.get("/history")
+def focus_history(start: float = None, end: float = None, buckets: int = 300, run: float = None):
+    return session_history(DEFAULT_SESSION, start, end, buckets, run)
+
+
+@app.get("/focus_stream")
+def focus_stream(max_rate: float = 10):
+    """
+    Server-Sent Events stream of focus updates for the default session. Each
+    event carries only the fields that changed; a slow client just gets the
+    latest state. max_rate caps events per second.
+    """
+    return _focus_stream(DEFAULT_SESSION, max_rate)
+
+
+def _focus_stream(session_id, max_rate):
+    worker = sessions.get(session_id)
+    if worker is None or not worker.running:
+        return Response(status_code=404, content=b"No active session")
+
+    def generate():
+        for delta in worker.channel.deltas(max_rate=max_rate):
+            if delta is None:
+                yield b": keepalive\n\n"
+            else:
+                yield b"data: " + json.dumps(delta).encode() + b"\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.get("/video_feed")
-def video_feed():
-    """Return an MJPEG stream of latest frames captured by the in-process worker."""
-    global camera_worker
+def video_feed(fps: float = None, quality: int = None, width: int = None, tier: str = None):
+    """
+    Return an MJPEG stream of latest frames captured by the in-process worker.
+    fps caps this client's frame rate; tier ("high", "medium", "low") or
+    quality/width pick the JPEG quality and resolution.
+    """
+    return _video_feed(DEFAULT_SESSION, fps, quality, width, tier)
+
+
+def _video_feed(session_id, fps=None, quality=None, width=None, tier=None):
+    camera_worker = sessions.get(session_id)
     if camera_worker is None or not camera_worker.running:
         return Response(status_code=404, content=b"No active video stream")
+    if tier is not None and tier not in STREAM_TIERS:
+        return Response(status_code=400, content=f"Unknown tier: {tier}".encode())
+
+    subscriber = camera_worker.broadcaster.subscribe(fps=fps, quality=quality, width=width, tier=tier)
 
     def generate():
         boundary = b"--frame"
-        while camera_worker is not None and camera_worker.running:
-            frame = camera_worker.latest_frame
-            if frame:
-                yield boundary + b"\r\n"
-                yield b"Content-Type: image/jpeg\r\n"
-                yield b"Content-Length: " + str(len(frame)).encode() + b"\r\n\r\n"
-                yield frame + b"\r\n"
-            else:
-                time.sleep(0.05)
+        # Blocks on the broadcaster until a newer frame exists, so idle
+        # streams don't spin and nobody gets the same JPEG twice
+        for frame in subscriber:
+            yield boundary + b"\r\n"
+            yield b"Content-Type: image/jpeg\r\n"
+            yield b"Content-Length: " + str(len(frame)).encode() + b"\r\n\r\n"
+            yield frame + b"\r\n"
 
     headers = {
         "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -307,4 +578,97 @@ def video_feed():
         generate(),
         headers=headers,
         media_type="multipart/x-mixed-replace; boundary=frame"
-    )
\ No newline at end of file
+    )
+
+
+# Multi-session API ---------------------------------------------------------------
+@app.post("/sessions")
+def create_session(source: str = None, pacing: str = None, fps: float = None, loop: bool = False,
+                   detector: str = None, target_fps: float = None, motion_gate: bool = None,
+                   roi: bool = None, exec_mode: str = None, track: bool = None, classroom: int = None,
+                   hands: bool = None, session_id: str = None):
+    if not IN_PROCESS_AVAILABLE:
+        return {"status": "error", "message": "In-process detectors are not available."}
+    session_id, worker = sessions.start(session_id, source=source, pacing=pacing, fps=fps, loop=loop,
+                                        detector=detector, target_fps=target_fps,
+                                        motion_gate=motion_gate, roi=roi, exec_mode=exec_mode, track=track,
+                                        classroom=classroom, hands=hands)
+    if worker is None:
+        return {"status": "error", "message": f"Session {session_id} already running."}
+    return {"status": "success", "session_id": session_id}
+
+
+@app.get("/sessions")
+def list_sessions():
+    running = sessions.list()
+    engine = pool.engine_if_loaded()
+    streams = {}
+    for session_id in running:
+        worker = sessions.get(session_id)
+        if worker is not None:
+            streams[session_id] = worker.broadcaster.stats()
+    return {
+        "sessions": running,
+        "streams": streams,
+        "engine": engine.stats() if engine is not None else {},
+        "models": pool.status(),
+        "history": history.stats() if history is not None else {},
+    }
+
+
+@app.post("/sessions/{session_id}/stop")
+def stop_named_session(session_id: str):
+    if not sessions.stop(session_id):
+        return {"status": "error", "message": f"No session {session_id}."}
+    return {"status": "success", "message": f"Session {session_id} stopped."}
+
+
+@app.get("/sessions/{session_id}/focus_data")
+def get_session_focus_data(session_id: str):
+    worker = sessions.get(session_id)
+    if worker is None:
+        return {"focus_score": 0, "distractions": 0, "active": False}
+    return worker.focus_data
+
+
+@app.get("/sessions/{session_id}/summary")
+def get_session_summary(session_id: str):
+    """Totals, rolling windows and recent distraction episodes of a session."""
+    worker = sessions.get(session_id)
+    engine = getattr(worker, "engine", None)
+    if engine is None:
+        return {"status": "error", "message": f"Session {session_id} not found."}
+    return engine.summary()
+
+
+@app.get("/sessions/{session_id}/focus_stream")
+def session_focus_stream(session_id: str, max_rate: float = 10):
+    return _focus_stream(session_id, max_rate)
+
+
+@app.get("/sessions/{session_id}/history")
+def session_history(session_id: str, start: float = None, end: float = None, buckets: int = 300,
+                    run: float = None):
+    """
+    Focus history between start and end (unix seconds), downsampled to at
+    most `buckets` min/max/avg buckets, plus distraction events. Without a
+    time range only the latest run of the session is returned (pass `run`,
+    one of "runs", for an earlier one).
+    """
+    if history is None:
+        return {"samples": [], "events": []}
+    buckets = max(1, min(buckets, 5000))
+    if run is None and start is None and end is None:
+        run = history.latest_run(session_id)
+    return {
+        "run": run,
+        "runs": history.runs(session_id),
+        "samples": history.query(session_id, start, end, buckets, run),
+        "events": history.events(session_id, start, end, run),
+    }
+
+
+@app.get("/sessions/{session_id}/video_feed")
+def session_video_feed(session_id: str, fps: float = None, quality: int = None, width: int = None,
+                       tier: str = None):
+    return _video_feed(session_id, fps, quality, width, tier)
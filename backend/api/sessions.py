@@ -0,0 +1,55 @@
+import threading
+import uuid
+
+DEFAULT_SESSION = "default"
+
+
+class SessionManager:
+    """
+    Keeps one worker per session ID. `worker_factory(session_id, **config)`
+    builds a (not yet started) worker thread with `.running` and `.stop()`.
+    """
+
+    def __init__(self, worker_factory):
+        self.worker_factory = worker_factory
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def start(self, session_id=None, **config):
+        """Returns (session_id, worker), or (session_id, None) if it's already running."""
+        session_id = session_id or uuid.uuid4().hex[:8]
+        with self._lock:
+            worker = self._workers.get(session_id)
+            if worker is not None and worker.running:
+                return session_id, None
+            worker = self.worker_factory(session_id, **config)
+            self._workers[session_id] = worker
+        worker.start()
+        return session_id, worker
+
+    def get(self, session_id):
+        return self._workers.get(session_id)
+
+    def is_running(self, session_id):
+        worker = self._workers.get(session_id)
+        return worker is not None and worker.running
+
+    def stop(self, session_id):
+        with self._lock:
+            worker = self._workers.pop(session_id, None)
+        if worker is None:
+            return False
+        worker.stop()
+        return True
+
+    def stop_all(self):
+        for session_id in list(self._workers):
+            self.stop(session_id)
+
+    def list(self):
+        # Drop workers whose source finished on its own
+        with self._lock:
+            for session_id, worker in list(self._workers.items()):
+                if not worker.running and not worker.is_alive():
+                    del self._workers[session_id]
+            return {session_id: worker.running for session_id, worker in self._workers.items()}
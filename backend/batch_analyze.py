@@ -0,0 +1,254 @@
+"""
+Headless offline analysis of recorded study-session videos.
+
+    python batch_analyze.py sessions/*.mp4 --out reports/
+    python batch_analyze.py lecture.mp4 --workers 8 --sample-fps 10 --segment 120
+
+Each video is cut into segments (--segment seconds) that are analysed in
+parallel by a pool of worker processes, each holding its own FaceEyeTracker
+and YOLO detectors. A segment starts --overlap seconds early so the EAR
+calibration, smoothing buffers and trackers are warmed up; frames of the
+overlap are dropped. Frames are analysed at --sample-fps (others are only
+grabbed). Every timer in the detectors (eye-closure hold, calibration, pen
+idle time, motion-gate reuse, carried results, tracked visible times) runs
+on a VideoClock set to the frame's video time, so results don't depend on
+how fast the workers run.
+
+The segments are merged per video into
+    <out>/<video>/trace.ftrace     per-frame detector outputs (see utils/trace.py)
+    <out>/<video>/timeline.csv     per-second focus score and condition shares
+    <out>/<video>/summary.json     FocusEngine session summary + throughput
+and <out>/report.json lists every video.
+"""
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+from utils.trace import TRACE_DTYPE, fill_record, write_trace
+
+_worker = {}  # detectors of this worker process, built once by _init_worker
+
+
+class VideoClock:
+    """Time source for the detectors: the video time of the frame being analysed."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score recorded session videos offline, in parallel")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--out", default="batch_reports")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--segment", type=float, default=60.0, help="segment length in seconds")
+    parser.add_argument("--overlap", type=float, default=5.0, help="warm-up seconds analysed before each segment")
+    parser.add_argument("--sample-fps", type=float, default=10.0, help="frames analysed per second of video (0 = all)")
+    parser.add_argument("--detector", choices=("separate", "fused"), default=None)
+    parser.add_argument("--no-motion-gate", action="store_true")
+    return parser.parse_args()
+
+
+# --- planning ----------------------------------------------------------------------------
+def probe(path):
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frames
+
+
+def plan_segments(path, fps, frames, args):
+    """Tasks (path, index, warm-up start, start, end, fps, step) covering every frame once."""
+    seg = max(1, int(args.segment * fps))
+    overlap = int(args.overlap * fps)
+    step = max(1, int(round(fps / args.sample_fps))) if args.sample_fps else 1
+    return [(path, i, max(0, start - overlap), start, min(frames, start + seg), fps, step)
+            for i, start in enumerate(range(0, frames, seg))]
+
+
+# --- worker side -------------------------------------------------------------------------
+def _init_worker(detector, motion_gate):
+    import cv2
+
+    # One process per core: keep each one from spreading over all cores itself
+    cv2.setNumThreads(1)
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    from modules.face_eye_tracker import FaceEyeTracker
+    from modules.object_detector import build_object_detector
+
+    _worker["clock"] = clock = VideoClock()
+    _worker["face"] = FaceEyeTracker(clock=clock)
+    _worker["objects"] = build_object_detector(detector, clock=clock)
+    _worker["motion_gate"] = motion_gate
+
+
+def _reset_detectors():
+    _worker["face"].reset()
+    _worker["objects"].pen.last_seen_time = _worker["clock"]()
+    for part in ("phone", "pen"):
+        tracker = getattr(getattr(_worker["objects"], part, None), "tracker", None)
+        if tracker is not None:
+            tracker.reset()
+    tracker = getattr(_worker["objects"], "tracker", None)
+    if tracker is not None:
+        tracker.reset()
+
+
+def analyze_segment(task):
+    """Returns (path, index, records, error) for one segment; records exclude the warm-up."""
+    import cv2
+    from modules.frame_analyzer import FrameAnalyzer
+    from utils.motion_utils import MotionAnalyzer
+
+    path, index, warm_start, start, end, fps, step = task
+    clock = _worker["clock"]
+    clock.now = warm_start / fps
+    _reset_detectors()
+    analyzer = FrameAnalyzer(_worker["face"], _worker["objects"], motion=MotionAnalyzer(),
+                             motion_gate=_worker["motion_gate"], clock=clock)
+    records = np.zeros((end - start) // step + 1, dtype=TRACE_DTYPE)  # upper bound on sampled frames
+    count = 0
+
+    cap = cv2.VideoCapture(path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+        for idx in range(warm_start, end):
+            if idx % step:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            t = clock.now = idx / fps
+            result, _ = analyzer.analyze(frame)
+            if idx >= start and count < len(records):
+                fill_record(records[count], result, analyzer, idx, t)
+                count += 1
+    except Exception as e:
+        return path, index, records[:count], repr(e)
+    finally:
+        cap.release()
+    return path, index, records[:count], None
+
+
+# --- merging -----------------------------------------------------------------------------
+def score_video(records, name):
+    """Runs the merged frames through FocusEngine; returns (per-frame scores, summary)."""
+    from rescore_trace import frame_flags
+    from utils.focus_engine import FocusEngine
+
+    engine = FocusEngine(name)
+    cols = frame_flags(records)
+    keys = [k for k in cols if k != "t"]
+    scores = np.empty(len(records), dtype=np.float32)
+    for i, t in enumerate(cols["t"]):
+        scores[i] = engine.update({k: cols[k][i] for k in keys}, t)["focus_score"]
+    end = cols["t"][-1] if cols["t"] else 0.0
+    return scores, engine.summary(end)
+
+
+def timeline(records, scores):
+    """Per-second rows: second, mean focus score and the share of frames with each condition."""
+    if len(records) == 0:
+        return []
+    seconds = records["t"].astype(np.int64)
+    n = int(seconds.max()) + 1
+    frames = np.bincount(seconds, minlength=n)
+    seen = frames > 0
+
+    def mean(values):
+        return np.bincount(seconds, weights=values, minlength=n)[seen] / frames[seen]
+
+    columns = [mean(scores), mean(records["face"]), mean(records["eyes_closed"]),
+               mean(records["looking_away"]), mean(records["phone"]), mean(records["pen"])]
+    return [[int(s)] + [round(float(c[i]), 3) for c in columns] for i, s in enumerate(np.nonzero(seen)[0])]
+
+
+def write_video_report(out_dir, path, records, started, fps, errors):
+    name = os.path.splitext(os.path.basename(path))[0]
+    video_dir = os.path.join(out_dir, name)
+    os.makedirs(video_dir, exist_ok=True)
+
+    scores, summary = score_video(records, name)
+    write_trace(os.path.join(video_dir, "trace.ftrace"), records, meta={"session": name, "source": path})
+    with open(os.path.join(video_dir, "timeline.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["second", "focus_score", "face", "eyes_closed", "looking_away", "phone", "pen"])
+        writer.writerows(timeline(records, scores))
+
+    wall = time.perf_counter() - started
+    video_seconds = float(records["t"][-1]) if len(records) else 0.0
+    summary.update(video=path, fps=fps, frames_analyzed=len(records), wall_seconds=round(wall, 1),
+                   realtime_factor=round(video_seconds / wall, 1) if wall > 0 else None, errors=errors)
+    with open(os.path.join(video_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    tasks, videos = [], {}
+    for path in args.videos:
+        info = probe(path)
+        if info is None or info[1] <= 0:
+            print(f"❌ Could not read {path}")
+            continue
+        fps, frames = info
+        segments = plan_segments(path, fps, frames, args)
+        videos[path] = {"fps": fps, "segments": len(segments), "done": {}, "errors": []}
+        tasks.extend(segments)
+        print(f"🎞️ {path}: {frames / fps / 60:.1f} min, {len(segments)} segments")
+    if not tasks:
+        return
+
+    started = time.perf_counter()
+    reports = []
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(args.workers, initializer=_init_worker, initargs=(args.detector, not args.no_motion_gate)) as pool:
+        for path, index, records, error in pool.imap_unordered(analyze_segment, tasks):
+            video = videos[path]
+            video["done"][index] = records
+            if error:
+                video["errors"].append(f"segment {index}: {error}")
+                print(f"⚠️ {path} segment {index}: {error}")
+            if len(video["done"]) == video["segments"]:
+                merged = np.concatenate([video["done"][i] for i in range(video["segments"])])
+                video["done"] = {}  # free the segments
+                report = write_video_report(args.out, path, merged, started, video["fps"], video["errors"])
+                reports.append(report)
+                print(f"✅ {path}: avg focus {report['average_focus']}, {report['distractions']} distractions, "
+                      f"{report['realtime_factor']}x real time")
+
+    wall = time.perf_counter() - started
+    total_video = sum(r["duration"] for r in reports)
+    with open(os.path.join(args.out, "report.json"), "w") as f:
+        json.dump({"videos": reports, "wall_seconds": round(wall, 1), "video_seconds": round(total_video, 1),
+                   "realtime_factor": round(total_video / wall, 1) if wall > 0 else None,
+                   "workers": args.workers}, f, indent=2)
+    print(f"🏁 {len(reports)} videos, {total_video / 60:.1f} min of video in {wall:.0f}s "
+          f"({total_video / wall:.1f}x real time) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+End-to-end benchmark: replays a clip or image folder through the real
+FaceEyeTracker, phone/pen detectors, scoring and JPEG encoding, and reports
+throughput plus p50/p95/p99 latency per stage.
+
+    python benchmark.py --source ../dataset/test/images --frames 300
+    python benchmark.py --source clip.mp4 --baseline benchmark_baseline.json
+
+Results are written as JSON (--out). With --baseline, any stage whose p95
+got slower than the baseline by more than --tolerance is reported and the
+exit code is 1, so the script can gate a release.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+
+from utils.frame_source import open_frame_source, PACING_FAST
+from utils.focus_engine import FocusEngine
+from utils.timing import timed, add_recorder, remove_recorder, SampleRecorder
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the focus tracking pipeline")
+    parser.add_argument("--source", default="../dataset/test/images",
+                        help="video file, image folder or 'synthetic[:WxH]'")
+    parser.add_argument("--frames", type=int, default=300, help="frames to measure (after warm-up)")
+    parser.add_argument("--warmup", type=int, default=10, help="frames to run before measuring")
+    parser.add_argument("--detector", choices=("separate", "fused"), default=None)
+    parser.add_argument("--analyzer", action="store_true",
+                        help="go through FrameAnalyzer (scheduler + motion gate) instead of running every detector")
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs baseline (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def build_runner(args):
+    """Returns process(frame) -> (detections dict, annotated frame)."""
+    if args.analyzer:
+        from modules.frame_analyzer import create_frame_analyzer
+
+        analyzer = create_frame_analyzer(detector=args.detector)
+        return analyzer.analyze
+
+    from modules.face_eye_tracker import FaceEyeTracker
+    from modules.object_detector import build_object_detector
+
+    face_tracker = FaceEyeTracker()
+    object_detector = build_object_detector(args.detector)
+
+    def process(frame):
+        # Same order as FrameAnalyzer: face first, so FaceMesh never sees drawn boxes
+        face_detected, eyes_closed, _, _ = face_tracker.analyze_frame(frame)
+        phone_detected, pen_detected, _, frame = object_detector.analyze_frame(frame)
+        return {"face_detected": face_detected, "eyes_closed": eyes_closed,
+                "phone_detected": phone_detected, "pen_detected": pen_detected}, frame
+
+    return process
+
+
+def run(args):
+    source = open_frame_source(args.source, pacing=PACING_FAST, loop=True)
+    if not source.isOpened():
+        print("❌ Could not open", args.source)
+        return None
+    process = build_runner(args)
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality]
+
+    engine = FocusEngine()
+    recorder = SampleRecorder()
+    add_recorder(recorder)
+    frame_size = None
+    start = time.perf_counter()
+    try:
+        for i in range(args.warmup + args.frames):
+            if i == args.warmup:
+                recorder.reset()
+                start = time.perf_counter()
+            with timed("frame"):
+                with timed("capture"):
+                    ret, frame = source.read()
+                if not ret:
+                    break
+                frame_size = frame.shape[1::-1]
+                detections, frame = process(frame)
+                with timed("scoring"):
+                    engine.update(detections)
+                with timed("jpeg_encode"):
+                    cv2.imencode(".jpg", frame, encode_params)
+        elapsed = time.perf_counter() - start
+    finally:
+        remove_recorder(recorder)
+        source.release()
+
+    stages = recorder.summary()
+    measured = stages.get("frame", {}).get("count", 0)
+    return {
+        "meta": {
+            "source": args.source,
+            "frames": measured,
+            "frame_size": list(frame_size) if frame_size else None,
+            "detector": args.detector or os.environ.get("FOCUS_DETECTOR", "separate"),
+            "mode": "analyzer" if args.analyzer else "all_detectors",
+            "commit": _git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "throughput_fps": round(measured / elapsed, 2) if elapsed > 0 else 0,
+        "stages": stages,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of (stage, baseline p95, current p95) that regressed."""
+    regressions = []
+    for stage, current in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before and before["p95_ms"] > 0 and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append((stage, before["p95_ms"], current["p95_ms"]))
+    return regressions
+
+
+def print_report(results):
+    meta = results["meta"]
+    print(f"📊 {meta['frames']} frames from {meta['source']} ({meta['mode']}, {meta['detector']})")
+    print(f"🚀 Throughput: {results['throughput_fps']} FPS")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in sorted(results["stages"].items(), key=lambda item: -item[1]["p50_ms"] * item[1]["count"]):
+        print(f"{stage:<16}{s['count']:>7}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+
+
+def main():
+    args = parse_args()
+    results = run(args)
+    if results is None:
+        sys.exit(2)
+    print_report(results)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Saved results to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for stage, before, now in regressions:
+            print(f"🔴 {stage}: p95 {before:.2f} ms -> {now:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print("✅ No p95 regressions vs", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
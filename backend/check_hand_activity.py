@@ -0,0 +1,114 @@
+"""
+Checks the hand-landmark writing classifier (modules/hand_activity.py) on
+synthetic hands, without a camera or MediaPipe.
+
+    python check_hand_activity.py
+
+Every scenario jitters the 21 landmarks like MediaPipe does on a webcam and
+replays them through WritingClassifier at 30 fps:
+- resting hands must be still, including small hands whose jitter is above
+  `still_below`, and never writing
+- writing hands must be writing, and writing on small hands (40-60 px) must
+  never turn still, however long it goes on, or after a rest has set the
+  jitter floor (a still hand skips the pen model and the idle timer keeps
+  running, so the student would get inactivity alerts while writing)
+- a reaching hand must be ambiguous
+The exit code is 1 if any scenario fails.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from modules.hand_activity import WritingClassifier, WRIST, MIDDLE_MCP, FINGERTIPS, WRITING, STILL, AMBIGUOUS
+
+FPS = 30
+SETTLE = 2.0  # seconds after a change of motion before it is judged (the window is 1.5 s)
+
+# (motion, hand size px, jitter px, seconds resting first, seconds of motion, expected state, forbidden state)
+SCENARIOS = [
+    ("rest", 80, 0.6, 0, 40, STILL, None),
+    ("rest", 60, 0.6, 0, 40, STILL, None),
+    ("rest", 120, 0.3, 0, 40, STILL, None),
+    ("rest", 50, 1.0, 0, 60, None, WRITING),
+    ("rest", 40, 1.0, 0, 60, None, WRITING),
+    ("write", 80, 0.6, 0, 40, WRITING, STILL),
+    ("write", 120, 0.3, 0, 40, WRITING, STILL),
+    ("write", 60, 0.6, 0, 60, WRITING, STILL),
+    ("write", 50, 0.6, 0, 60, None, STILL),
+    ("write", 40, 0.6, 0, 60, None, STILL),
+    ("write", 50, 1.0, 0, 60, None, STILL),
+    ("write", 60, 1.0, 0, 60, None, STILL),
+    ("write", 60, 0.6, 30, 60, None, STILL),
+    ("write", 50, 1.0, 30, 60, None, STILL),
+    ("write", 40, 0.6, 30, 60, None, STILL),
+    ("reach", 80, 0.6, 0, 20, AMBIGUOUS, None),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check the writing classifier on synthetic hands")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-share", type=float, default=0.9,
+                        help="share of frames that must show the expected state")
+    return parser.parse_args()
+
+
+def synthetic_hand(size, rng):
+    """21 landmarks (pixels) of a hand whose wrist-to-middle-knuckle distance is `size`."""
+    points = rng.uniform(-1.0, 1.0, (21, 2)) * size + (320, 240)
+    points[WRIST] = (320, 240)
+    points[MIDDLE_MCP] = (320, 240 - size)
+    return points
+
+
+def move(points, motion, size, t):
+    if motion == "write":
+        # ~3 mm strokes at 3-4 Hz on an ~85 mm hand, drifting along the line
+        stroke = 0.04 * size * np.array([np.sin(2 * np.pi * 4 * t), np.cos(2 * np.pi * 3 * t)])
+        points[FINGERTIPS] += stroke
+        points += (0.05 * size * t % (0.5 * size), 0)
+    elif motion == "reach":
+        points += (3 * size * (t % 1.0), 0)
+    return points
+
+
+def run(motion, size, jitter, rest, seconds, seed=0):
+    """State counts while the hand shows `motion`, after `rest` seconds of resting."""
+    rng = np.random.default_rng(seed)
+    hand = synthetic_hand(size, rng)
+    classifier = WritingClassifier()
+    counts = dict.fromkeys((WRITING, STILL, AMBIGUOUS), 0)
+    for i in range(int((rest + seconds) * FPS)):
+        t = i / FPS
+        points = hand + rng.normal(0, jitter, hand.shape)
+        if t >= rest:
+            points = move(points, motion, size, t - rest)
+        classifier.observe("Right", points, t)
+        state = classifier.classify(t)
+        if t >= rest + SETTLE:
+            counts[state] += 1
+    return counts
+
+
+def main():
+    args = parse_args()
+    failed = 0
+    for motion, size, jitter, rest, seconds, expected, forbidden in SCENARIOS:
+        counts = run(motion, size, jitter, rest, seconds, args.seed)
+        total = float(sum(counts.values()))
+        passed = True
+        if expected:
+            passed &= counts[expected] / total >= args.min_share
+        if forbidden:
+            passed &= counts[forbidden] == 0
+        failed += not passed
+        after = f" after {rest}s rest" if rest else ""
+        print(f"{'✅' if passed else '❌'} {motion:<5} {size:>3}px hand, {jitter}px jitter, {seconds}s{after}: "
+              + ", ".join(f"{state} {n / total:.0%}" for state, n in counts.items()))
+    print(f"\n{'❌' if failed else '✅'} {len(SCENARIOS) - failed}/{len(SCENARIOS)} scenarios passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Export the YOLO checkpoints for CPU inference and check their accuracy.
+
+    python export_models.py                       # all models, all installed backends
+    python export_models.py --models models/pen_detectorv2.pt --backends onnx-int8 openvino-int8
+
+For every model and backend this
+1. exports to models/exported/ (ONNX via ultralytics; ONNX INT8 via
+   onnxruntime static quantization; OpenVINO FP32/INT8 via ultralytics,
+   whose INT8 path uses NNCF). INT8 calibration uses dataset/train images.
+2. runs the export and the original .pt over dataset/valid and compares
+   mAP@0.5. Classes the dataset has are scored against its labels; every
+   other class (COCO's and the fused model's "cell phone") against the .pt
+   model's own detections, so that number measures agreement.
+3. records mAP, the drop vs PyTorch, latency and passed = drop <= tolerance
+   for every one of these checks
+   in models/exported/backends.json, which utils/inference_backend.py reads
+   at startup to pick a backend.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from utils.dataset import DATASET_NAMES, split_images_dir, list_images, label_path_for, ground_truth
+from utils.detections import parse_detections, mean_average_precision
+from utils.inference_backend import (BACKENDS, BACKEND_TORCH, EXPORT_DIR, backend_available, exported_path,
+                                     load_report, save_report, model_key)
+
+DEFAULT_MODELS = ["models/yolov8n.pt", "models/pen_detectorv2.pt", "models/focus_objects.pt"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export YOLO models to ONNX/OpenVINO (FP32 + INT8) and check mAP parity")
+    parser.add_argument("--models", nargs="+", default=None)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS[1:], default=None,
+                        help="default: every backend whose runtime is installed")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calib-images", type=int, default=100, help="dataset/train images used for INT8 calibration")
+    parser.add_argument("--tolerance", type=float, default=float(os.environ.get("FOCUS_MAP_TOLERANCE", 0.02)),
+                        help="max allowed mAP@0.5 drop vs PyTorch (absolute, e.g. 0.02)")
+    parser.add_argument("--conf", type=float, default=0.35, help="confidence used for pseudo ground truth")
+    parser.add_argument("--skip-export", action="store_true", help="only re-run the parity check")
+    return parser.parse_args()
+
+
+# --- export ----------------------------------------------------------------------------
+def letterbox(image, size):
+    """Resize keeping aspect ratio and pad to size x size, like the YOLO preprocessor."""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return canvas
+
+
+def calibration_images(limit):
+    images_dir = split_images_dir("train")
+    names = list_images(images_dir)[:limit]
+    return [os.path.join(images_dir, name) for name in names]
+
+
+def _move(src, dst):
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    elif os.path.exists(dst):
+        os.remove(dst)
+    shutil.move(src, dst)
+    return dst
+
+
+def export_onnx(model_path, imgsz):
+    from ultralytics import YOLO
+
+    # dynamic input shapes, so ROI crops can still run at their own imgsz
+    out = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    return _move(str(out), exported_path(model_path, "onnx"))
+
+
+def export_onnx_int8(model_path, imgsz, calib_limit):
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    fp32_path = exported_path(model_path, "onnx")
+    if not os.path.exists(fp32_path):
+        export_onnx(model_path, imgsz)
+
+    class TrainImages(CalibrationDataReader):
+        def __init__(self, paths, input_name):
+            self.paths = iter(paths)
+            self.input_name = input_name
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            image = letterbox(cv2.imread(path), imgsz)[:, :, ::-1]  # BGR -> RGB
+            tensor = np.ascontiguousarray(image.transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+            return {self.input_name: tensor}
+
+    source = onnx.load(fp32_path)
+    int8_path = exported_path(model_path, "onnx-int8")
+    quantize_static(fp32_path, int8_path,
+                    TrainImages(calibration_images(calib_limit), source.graph.input[0].name),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8, per_channel=True)
+
+    # Keep the class names / stride metadata ultralytics reads when loading
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, int8_path)
+    return int8_path
+
+
+def export_openvino(model_path, imgsz, int8=False, calib_limit=100):
+    from ultralytics import YOLO
+
+    kwargs = {}
+    tmp_dir = None
+    if int8:
+        # ultralytics calibrates on the "val" split of `data`: point it at dataset/train
+        tmp_dir = tempfile.mkdtemp()
+        calib_dir = os.path.join(tmp_dir, "images")
+        os.makedirs(calib_dir)
+        for path in calibration_images(calib_limit):
+            shutil.copy2(path, calib_dir)
+        data_yaml = os.path.join(tmp_dir, "calibration.yaml")
+        with open(data_yaml, "w") as f:
+            f.write(f"path: {tmp_dir}\ntrain: images\nval: images\nnames: {DATASET_NAMES}\n")
+        kwargs = dict(int8=True, data=data_yaml)
+    try:
+        # dynamic input shapes, so ROI crops can still run at their own imgsz
+        out = YOLO(model_path).export(format="openvino", imgsz=imgsz, dynamic=True, **kwargs)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return _move(str(out), exported_path(model_path, "openvino-int8" if int8 else "openvino"))
+
+
+def export(model_path, backend, args):
+    if backend == "onnx":
+        return export_onnx(model_path, args.imgsz)
+    if backend == "onnx-int8":
+        return export_onnx_int8(model_path, args.imgsz, args.calib_images)
+    return export_openvino(model_path, args.imgsz, int8=backend == "openvino-int8", calib_limit=args.calib_images)
+
+
+# --- parity ----------------------------------------------------------------------------
+def load_split_images(split="valid", limit=None):
+    """[(name, frame, label file)] for one dataset split."""
+    images_dir = split_images_dir(split)
+    images = []
+    for name in list_images(images_dir)[:limit]:
+        frame = cv2.imread(os.path.join(images_dir, name))
+        if frame is not None:
+            images.append((name, frame, label_path_for(images_dir, name)))
+    return images
+
+
+def predict_all(model, images, imgsz, conf=0.01):
+    """Low-confidence predictions for mAP, plus median latency over the set."""
+    predictions, times = [], []
+    for _, frame, _ in images[:3]:  # warm-up
+        model(frame, imgsz=imgsz, conf=conf, verbose=False)
+    for _, frame, _ in images:
+        start = time.perf_counter()
+        results = model(frame, imgsz=imgsz, conf=conf, verbose=False)
+        times.append(time.perf_counter() - start)
+        predictions.append(parse_detections(results, model.names))
+    return predictions, round(statistics.median(times) * 1000, 2) if times else None
+
+
+def build_truths(class_names, images, reference_predictions, conf):
+    """
+    Truth sets to score a model against, by source: "labels" (dataset labels)
+    for the classes the dataset has, "reference" (the .pt model's own
+    detections at `conf`) for the model's other classes, e.g. the fused
+    model's or COCO's "cell phone".
+    """
+    model_names = set(class_names)
+    shared = [name for name in DATASET_NAMES if name in model_names]
+    checks = {}
+    if shared:
+        truths = []
+        for _, frame, label_file in images:
+            h, w = frame.shape[:2]
+            truths.append([(n, box) for n, box in ground_truth(label_file, DATASET_NAMES, w, h) if n in shared])
+        checks["labels"] = truths
+    if model_names - set(shared):
+        checks["reference"] = [[(d.cls_name, d.box) for d in preds if d.conf >= conf and d.cls_name not in shared]
+                               for preds in reference_predictions]
+    return checks
+
+
+def merge_truths(checks):
+    """One truth list per image from all truth sets (their classes don't overlap)."""
+    return [sum(per_image, []) for per_image in zip(*checks.values())]
+
+
+def check_model(model_path, backends, args, report):
+    from ultralytics import YOLO
+
+    images = load_split_images("valid")
+    if not images:
+        print("❌ No images in", split_images_dir("valid"))
+        return
+    key = model_key(model_path)
+    entries = report.setdefault(key, {})
+
+    reference = YOLO(model_path)
+    ref_predictions, ref_latency = predict_all(reference, images, args.imgsz)
+    checks = build_truths(reference.names.values(), images, ref_predictions, args.conf)
+    ref_maps = {source: mean_average_precision(ref_predictions, truths)[0] for source, truths in checks.items()}
+    entries[BACKEND_TORCH] = {"map50": round(next(iter(ref_maps.values())), 4), "latency_ms": ref_latency,
+                              "passed": True, "truth": "+".join(checks),
+                              "checks": {source: {"map50": round(m, 4)} for source, m in ref_maps.items()}}
+    print(f"📏 {key} torch: " + ", ".join(f"mAP50={m:.4f} ({source})" for source, m in ref_maps.items())
+          + f", {ref_latency} ms")
+
+    for backend in backends:
+        path = exported_path(model_path, backend)
+        try:
+            if not args.skip_export:
+                print(f"📦 Exporting {key} -> {backend}")
+                path = export(model_path, backend, args)
+            model = YOLO(path, task="detect")
+            predictions, latency = predict_all(model, images, args.imgsz)
+        except Exception as e:
+            print(f"❌ {key} {backend}: {e}")
+            entries[backend] = {"passed": False, "error": repr(e)}
+            continue
+        # Every truth set has to pass: labels alone would miss a broken phone class in the fused model
+        results = {}
+        for source, truths in checks.items():
+            cand_map = mean_average_precision(predictions, truths)[0]
+            drop = ref_maps[source] - cand_map
+            results[source] = {"map50": round(cand_map, 4), "map50_drop": round(drop, 4),
+                               "passed": drop <= args.tolerance}
+        passed = all(r["passed"] for r in results.values())
+        first = next(iter(results.values()))
+        entries[backend] = {"map50": first["map50"], "map50_drop": max(r["map50_drop"] for r in results.values()),
+                            "latency_ms": latency, "speedup": round(ref_latency / latency, 2) if latency else None,
+                            "passed": passed, "tolerance": args.tolerance, "truth": "+".join(checks),
+                            "checks": results}
+        mark = "✅" if passed else "🚫"
+        print(f"{mark} {key} {backend}: "
+              + ", ".join(f"mAP50={r['map50']:.4f} (drop {r['map50_drop']:+.4f}, {source})" for source, r in results.items())
+              + f", {latency} ms")
+
+
+def main():
+    args = parse_args()
+    models = args.models or [m for m in DEFAULT_MODELS if os.path.exists(m)]
+    backends = args.backends or [b for b in BACKENDS[1:] if backend_available(b)]
+    if not backends:
+        print("❌ Neither onnxruntime nor openvino is installed; nothing to export")
+        return
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+    report = load_report()
+    for model_path in models:
+        check_model(model_path, backends, args, report)
+        save_report(report)  # after each model, so a crash keeps earlier results
+    print(f"💾 Parity report saved to {os.path.relpath(os.path.join(EXPORT_DIR, 'backends.json'))}")
+
+
+if __name__ == "__main__":
+    main()
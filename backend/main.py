@@ -1,105 +1,154 @@
 import cv2
 import time
-import json
 import os
-
-from modules.face_eye_tracker import FaceEyeTracker
-from modules.phone_detector import PhoneDetector
-from modules.pen_tracker import PenTracker
-from modules.alerts import alert_user
-from utils.focus_score import calculate_focus_score
-
-
-def main():
-    # Initialize all detectors
-    face_tracker = FaceEyeTracker()
-    phone_detector = PhoneDetector()
-    pen_tracker = PenTracker()
-
-    cap = cv2.VideoCapture(0)
+import argparse
+
+from modules.frame_analyzer import create_frame_analyzer
+from modules.alerts import alert_user, shutdown_alerts
+from utils.focus_engine import FocusEngine
+from utils.frame_source import open_frame_source, PACING_MODES
+from utils.scheduler import target_fps_from_env
+from utils.process_pool import exec_mode_from_env
+from utils.logger import log_focus_data, close_session_log
+from utils.focus_stream import FocusChannel, SnapshotWriter, snapshot_enabled
+from utils.history import open_history
+from utils.trace import open_trace
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI Focus Tracker")
+    parser.add_argument("--source", default=None,
+                        help="webcam index, video file, image folder or 'synthetic[:WxH]' (default: $FOCUS_SOURCE or 0)")
+    parser.add_argument("--pacing", choices=PACING_MODES, default=None,
+                        help="realtime, fast (as fast as possible) or fixed (use --fps)")
+    parser.add_argument("--fps", type=float, default=None, help="frame rate for fixed pacing")
+    parser.add_argument("--loop", action="store_true", help="loop video/image sources forever")
+    parser.add_argument("--detector", choices=("separate", "fused"), default=None,
+                        help="two YOLO models or one fused model (default: $FOCUS_DETECTOR or separate)")
+    parser.add_argument("--target-fps", type=float, default=None,
+                        help="run detectors less often to hold this FPS (default: $FOCUS_TARGET_FPS, off)")
+    parser.add_argument("--no-motion-gate", action="store_true",
+                        help="run YOLO even when the scene is static (also $FOCUS_MOTION_GATE=0)")
+    parser.add_argument("--roi", action="store_true",
+                        help="run the object detectors only on face-anchored regions (also $FOCUS_ROI=1)")
+    parser.add_argument("--track", action="store_true",
+                        help="run YOLO every few frames and track the boxes in between (also $FOCUS_TRACK=1)")
+    parser.add_argument("--classroom", type=int, default=None, metavar="N",
+                        help="score up to N people in view, each with their own ID (also $FOCUS_CLASSROOM=N)")
+    parser.add_argument("--hands", action="store_true",
+                        help="detect writing from hand landmarks; run the pen model only when unsure (also $FOCUS_HANDS=1)")
+    parser.add_argument("--exec", dest="exec_mode", choices=("thread", "process"), default=None,
+                        help="run detectors in this process or one worker process each (default: $FOCUS_EXEC or thread)")
+    parser.add_argument("--trace", default=None,
+                        help="record detector outputs to this .ftrace file or directory (also $FOCUS_TRACE)")
+    parser.add_argument("--headless", action="store_true", help="don't open a preview window")
+    return parser.parse_args()
+
+
+def main(args=None):
+    args = args or parse_args()
+
+    # Check the source config before spending time on loading the models
+    try:
+        cap = open_frame_source(args.source, pacing=args.pacing, fps=args.fps, loop=args.loop)
+    except ValueError as e:
+        print("❌ Bad frame source config:", e)
+        return
     if not cap.isOpened():
-        print("❌ Error: Could not access the webcam.")
+        print("❌ Error: Could not open the frame source.")
         return
 
-    print("🎥 AI Focus Tracker Started — Press 'q' to quit.\n")
-
-    # Create JSON file path for focus data
-    # json_path = os.path.join(os.path.dirname(__file__), "focus_data.json")
-    # Always save JSON to backend/focus_data.json (absolute path)
-    json_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "focus_data.json")
-    print(f"🟢 Writing focus data to: {json_path}")
-
-
-    last_save_time = 0
-    distractions = 0
-    smooth_score = 100  # initial focus score
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("⚠️ Frame capture failed. Exiting...")
-            break
-
-        # Run detectors (each may draw on the frame and return updated frame)
-        face_detected, eyes_closed, looking_away, base_score = face_tracker.analyze_frame(frame)
-        phone_detected, frame = phone_detector.analyze_frame(frame)
-        pen_detected, idle_time, frame = pen_tracker.analyze_frame(frame)
-
-        # --- Compute focus score ---
-        # calculate_focus_score expects: face_detected, eyes_closed, mobile_detected, pen_detected
-        focus_score = calculate_focus_score(face_detected, eyes_closed, phone_detected, pen_detected)
-
-        # Penalize for distractions
-        if phone_detected:
-            focus_score -= 20
-            distractions += 1
-            alert_user("mobile")
-
-        if eyes_closed:
-            alert_user("drowsy")
-
-        if pen_detected and idle_time > 300:
-            alert_user("inactivity")
-
-        # Smooth transitions in score (no flicker)
-        smooth_score = 0.85 * smooth_score + 0.15 * focus_score
-        smooth_score = max(0, min(100, smooth_score))
-
-        # --- Save focus data to JSON (every 1 second) ---
-        current_time = time.time()
-        if current_time - last_save_time >= 1:
-            data_to_save = {
-                "focus_score": round(smooth_score, 1),
-                "distractions": distractions,
-                "active": True,
-                "timestamp": current_time
-            }
-            with open(json_path, "w") as f:
-                json.dump(data_to_save, f)
-            last_save_time = current_time
-
-        # --- Display frame ---
-        cv2.putText(frame, f"Focus Score: {int(smooth_score)}%", (30, 50),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 255, 0), 2)
-        cv2.imshow("AI Focus Tracker", frame)
-
-        # Exit on 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            print("🛑 Exiting Focus Session...")
-            break
-
-    # Cleanup
-    cap.release()
-    cv2.destroyAllWindows()
-
-    # Write final status
-    with open(json_path, "w") as f:
-        json.dump({
-            "focus_score": round(smooth_score, 1),
-            "distractions": distractions,
-            "active": False,
-            "timestamp": time.time()
-        }, f)
+    analyzer = snapshot = history = trace = engine = None
+    try:
+        # Initialize all detectors
+        analyzer = create_frame_analyzer(
+            detector=args.detector,
+            target_fps=args.target_fps or target_fps_from_env(),
+            motion_gate=not args.no_motion_gate and os.environ.get("FOCUS_MOTION_GATE", "1") != "0",
+            roi=args.roi or os.environ.get("FOCUS_ROI") == "1",
+            exec_mode=args.exec_mode or exec_mode_from_env(),
+            track=args.track or None,
+            classroom=args.classroom,
+            hands=args.hands or None,
+        )
+
+        print("🎥 AI Focus Tracker Started — Press 'q' to quit.\n")
+
+        # Create JSON file path for focus data
+        # json_path = os.path.join(os.path.dirname(__file__), "focus_data.json")
+        # Always save JSON to backend/focus_data.json (absolute path)
+        json_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "focus_data.json")
+        # The snapshot thread writes the file once a second, outside the frame loop
+        channel = FocusChannel()
+        if snapshot_enabled():
+            snapshot = SnapshotWriter(channel, json_path)
+            snapshot.start()
+            print(f"🟢 Writing focus data to: {json_path}")
+
+        history = open_history()  # per-frame samples + distraction events (FOCUS_HISTORY=0 turns it off)
+        # Scores frames, debounces distraction episodes, alerts, records history, logs once a second
+        engine = FocusEngine("default", history=history, alert=alert_user, log=log_focus_data)
+        trace = open_trace("default", args.trace, meta={"source": str(args.source)})
+        frame_id = 0
+
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                if cap.exhausted:
+                    print("🏁 Frame source finished.")
+                else:
+                    print("⚠️ Frame capture failed. Exiting...")
+                break
+
+            # Run detectors (the scheduler may skip some and carry their last result)
+            detections, frame = analyzer.analyze(frame)
+            if trace is not None:
+                trace.record(detections, analyzer, frame_id)
+            frame_id += 1
+
+            # --- Score the frame and publish the focus state ---
+            state = engine.update(detections)
+            if "people" in detections:
+                state["people"] = detections["people"]
+            channel.publish(state)
+
+            # --- Display frame ---
+            if args.headless:
+                continue
+            if "people" in detections:
+                analyzer.face_tracker.redraw(frame)
+            cv2.putText(frame, f"Focus Score: {int(engine.smooth_score)}%", (30, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 255, 0), 2)
+            cv2.imshow("AI Focus Tracker", frame)
+
+            # Exit on 'q'
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                print("🛑 Exiting Focus Session...")
+                break
+    finally:
+        # Also after an error or Ctrl+C, so buffered trace records and the last history run are kept
+        cap.release()
+        if analyzer is not None:
+            analyzer.close()
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+        shutdown_alerts()
+        close_session_log()
+        if trace is not None:
+            trace.close()
+        if history is not None:
+            history.close()
+
+        # Write final status
+        if snapshot is not None:
+            snapshot.stop(None if engine is None else {
+                "focus_score": round(engine.smooth_score, 1),
+                "distractions": engine.distractions,
+                "active": False,
+                "timestamp": time.time(),
+                "summary": engine.summary(),
+            })
 
     print("✅ Session ended and focus data saved.")
 
@@ -1,21 +1,219 @@
-from plyer import notification
-from playsound import playsound
+import os
+import json
+import queue
 import threading
+import time
+from collections import namedtuple
+
+Alert = namedtuple("Alert", ["reason", "title", "message", "timestamp"])
+
+MESSAGES = {
+    "drowsy": ("Drowsiness Alert 😴", "Eyes closed too long. Take a break!"),
+    "looking_away": ("Attention Alert 👀", "Looking away from your work."),
+    "mobile": ("Distraction Alert 📱", "Mobile detected! Stay focused."),
+    "inactivity": ("Break Alert ✍️", "No writing activity detected."),
+}
+
+# hold: the condition must be reported continuously this long before alerting
+# cooldown: minimum time between two alerts for the same reason
+ALERT_SETTINGS = {
+    "drowsy": dict(hold=1.0, cooldown=30.0),
+    "looking_away": dict(hold=5.0, cooldown=60.0),
+    "mobile": dict(hold=0.5, cooldown=30.0),
+    "inactivity": dict(hold=0.0, cooldown=300.0),
+}
+
 
 def show_notification(title, message):
+    from plyer import notification
+
     notification.notify(
         title=title,
         message=message,
         timeout=4
     )
 
+
 def sound_alert(sound_path="alert.mp3"):
+    from playsound import playsound
+
     threading.Thread(target=lambda: playsound(sound_path)).start()
 
+
+# --- Sinks: anything with send(alert) ------------------------------------------------
+class DesktopSink:
+    def __init__(self, sound_path=None):
+        self.sound_path = sound_path
+
+    def send(self, alert):
+        show_notification(alert.title, alert.message)
+        if self.sound_path:
+            from playsound import playsound
+
+            playsound(self.sound_path)  # already on the dispatcher thread
+
+
+class LogSink:
+    def send(self, alert):
+        print(f"🔔 [{time.strftime('%H:%M:%S', time.localtime(alert.timestamp))}] {alert.title}: {alert.message}")
+
+
+class WebhookSink:
+    """POSTs the alert as JSON. Minimal on purpose: no retries, short timeout."""
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        import urllib.request
+
+        req = urllib.request.Request(self.url, data=json.dumps(alert._asdict()).encode(),
+                                     headers={"Content-Type": "application/json"})
+        urllib.request.urlopen(req, timeout=self.timeout).close()
+
+
+class MemorySink:
+    """Keeps sent alerts in a list; handy for tests and for the API."""
+
+    def __init__(self):
+        self.alerts = []
+
+    def send(self, alert):
+        self.alerts.append(alert)
+
+
+class _ReasonState:
+    __slots__ = ("first_seen", "last_seen", "last_fired", "armed")
+
+    def __init__(self):
+        self.first_seen = None
+        self.last_seen = None
+        self.last_fired = None
+        self.armed = True
+
+
+class AlertDispatcher:
+    """
+    Collects alert signals from the frame loop and delivers them to sinks
+    from one background thread. `signal(reason)` is O(1) and never blocks:
+    when the bounded queue is full the signal is dropped.
+
+    Per reason, a signal only becomes an alert once the condition has been
+    reported for `hold` seconds without a gap longer than `release`; after
+    firing it stays quiet until the condition clears (a `release` gap) and
+    its `cooldown` has passed.
+    """
+
+    def __init__(self, sinks, settings=None, release=2.0, max_queue=256):
+        self.sinks = list(sinks)
+        self.settings = dict(ALERT_SETTINGS, **(settings or {}))
+        self.release = release
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._states = {}
+        self.dropped = 0
+        self.sent = 0
+        self.errors = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="AlertDispatcher")
+        self._thread.start()
+
+    def signal(self, reason, timestamp=None):
+        try:
+            self._queue.put_nowait((reason, timestamp or time.time()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is None:
+                continue
+            alert = self._update(*item)
+            if alert is not None:
+                self._deliver(alert)
+
+    def _update(self, reason, now):
+        """Applies debounce/hysteresis; returns an Alert when one should fire."""
+        settings = self.settings.get(reason, dict(hold=0.0, cooldown=30.0))
+        state = self._states.setdefault(reason, _ReasonState())
+
+        if state.last_seen is None or now - state.last_seen > self.release:
+            # The condition had cleared: a new episode starts
+            state.first_seen = now
+            state.armed = True
+        state.last_seen = now
+
+        if not state.armed or now - state.first_seen < settings["hold"]:
+            return None
+        if state.last_fired is not None and now - state.last_fired < settings["cooldown"]:
+            return None
+        state.armed = False
+        state.last_fired = now
+        title, message = MESSAGES.get(reason, ("Focus Alert", reason))
+        return Alert(reason, title, message, now)
+
+    def _deliver(self, alert):
+        for sink in self.sinks:
+            try:
+                sink.send(alert)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Alert sink {type(sink).__name__} failed: {e}")
+
+    def close(self, timeout=2.0):
+        """Delivers what's queued (up to `timeout`) and stops the worker."""
+        self._running = False
+        try:
+            self._queue.put_nowait(None)  # wake the worker
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "sent": self.sent, "dropped": self.dropped, "errors": self.errors}
+
+
+def sinks_from_env():
+    """$FOCUS_ALERT_SINKS: comma-separated desktop, log, webhook (needs $FOCUS_ALERT_WEBHOOK), memory."""
+    sinks = []
+    for name in os.environ.get("FOCUS_ALERT_SINKS", "desktop").split(","):
+        name = name.strip()
+        if name == "desktop":
+            sinks.append(DesktopSink())
+        elif name == "log":
+            sinks.append(LogSink())
+        elif name == "webhook" and os.environ.get("FOCUS_ALERT_WEBHOOK"):
+            sinks.append(WebhookSink(os.environ["FOCUS_ALERT_WEBHOOK"]))
+        elif name == "memory":
+            sinks.append(MemorySink())
+    return sinks
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AlertDispatcher(sinks_from_env())
+    return _dispatcher
+
+
 def alert_user(reason):
-    if reason == "drowsy":
-        show_notification("Drowsiness Alert 😴", "Eyes closed too long. Take a break!")
-    elif reason == "mobile":
-        show_notification("Distraction Alert 📱", "Mobile detected! Stay focused.")
-    elif reason == "inactivity":
-        show_notification("Break Alert ✍️", "No writing activity detected.")
+    """Called from the frame loop: just hands the signal to the dispatcher."""
+    get_dispatcher().signal(reason)
+
+
+def shutdown_alerts():
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.close()
+        _dispatcher = None
@@ -0,0 +1,256 @@
+import cv2
+import mediapipe as mp
+import numpy as np
+import time
+
+from utils.detections import box_ious
+from utils.landmark_features import faces_to_array, eye_aspect_ratios, gaze_offsets, face_boxes, head_poses
+from utils.timing import timed
+
+
+class PersonTable:
+    """
+    Per-person eye/attention state of everyone in view, one row per person in
+    plain NumPy arrays, so a frame updates all people with a few vectorized
+    operations. Rows are reused once a person has been gone `forget_after`
+    seconds; the table grows by doubling when it is full.
+    Same rules as FaceEyeTracker: EAR calibration, smoothed openness,
+    rolling closure ratio, closed-eyes duration and an EMA focus score.
+    """
+
+    EAR_WINDOW = 5
+    CLOSED_WINDOW = 10
+
+    def __init__(self, capacity=8):
+        self.ids = np.full(capacity, -1, dtype=np.int64)  # -1 = free row
+        self.boxes = np.zeros((capacity, 4), dtype=np.int32)
+        self.first_seen = np.zeros(capacity)
+        self.last_seen = np.zeros(capacity)
+        self.ear_buffer = np.zeros((capacity, self.EAR_WINDOW), dtype=np.float32)
+        self.closed_buffer = np.zeros((capacity, self.CLOSED_WINDOW), dtype=bool)
+        self.frames = np.zeros(capacity, dtype=np.int64)  # frames seen, for ring positions and fill
+        self.min_ear = np.zeros(capacity, dtype=np.float32)
+        self.max_ear = np.zeros(capacity, dtype=np.float32)
+        self.ear_open = np.zeros(capacity, dtype=np.float32)
+        self.ear_closed = np.zeros(capacity, dtype=np.float32)
+        self.eyes_closed = np.zeros(capacity, dtype=bool)
+        self.closed_since = np.full(capacity, np.nan)
+        self.away_count = np.zeros(capacity, dtype=np.int64)
+        self.looking_away = np.zeros(capacity, dtype=bool)
+        self.openness = np.zeros(capacity, dtype=np.float32)
+        self.score = np.zeros(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def active(self):
+        return np.nonzero(self.ids >= 0)[0]
+
+    def add(self, person_id, box, now):
+        free = np.nonzero(self.ids < 0)[0]
+        if len(free) == 0:
+            self._grow()
+            free = np.nonzero(self.ids < 0)[0]
+        row = free[0]
+        self.ids[row] = person_id
+        self.boxes[row] = box
+        self.first_seen[row] = self.last_seen[row] = now
+        self.ear_buffer[row] = 0
+        self.closed_buffer[row] = False
+        self.frames[row] = 0
+        self.min_ear[row], self.max_ear[row] = 0.08, 0.35
+        self.ear_open[row], self.ear_closed[row] = 0.30, 0.18
+        self.eyes_closed[row] = False
+        self.closed_since[row] = np.nan
+        self.away_count[row] = 0
+        self.looking_away[row] = False
+        self.openness[row] = 1.0
+        self.score[row] = 100
+        return row
+
+    def remove(self, rows):
+        self.ids[rows] = -1
+
+    def _grow(self):
+        n = len(self.ids)
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray) and len(value) == n:
+                fill = -1 if name == "ids" else (np.nan if name == "closed_since" else 0)
+                extra = np.full((n,) + value.shape[1:], fill, dtype=value.dtype)
+                setattr(self, name, np.concatenate([value, extra]))
+
+
+class ClassroomTracker:
+    def __init__(self, max_faces=30, away_frames=5, calibration_interval=5, forget_after=3.0,
+                 iou_threshold=0.3, yaw_limit=30.0, pitch_limit=20.0, gaze_limit=0.6, clock=None):
+        """
+        Eye and attention tracking for everyone facing one camera. Faces are
+        matched to people across frames by box overlap, so each person keeps
+        a stable ID and their own calibration, buffers and focus score.
+
+        analyze_frame() returns the same tuple as FaceEyeTracker, summarised
+        over the class (anyone in view, most eyes closed, most looking away,
+        mean score), so it can stand in for it in FrameAnalyzer; the
+        per-person results are in `people`.
+        clock: returns the current time for calibration, closed-eye durations
+        and forgetting people (default time.time; offline runs pass the video
+        time), as in FaceEyeTracker.
+        """
+        self.clock = clock or time.time
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            refine_landmarks=True,
+            max_num_faces=max_faces,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.table = PersonTable()
+        self.away_frames = away_frames
+        self.calibration_interval = calibration_interval
+        self.forget_after = forget_after
+        self.iou_threshold = iou_threshold
+        self.yaw_limit = yaw_limit
+        self.pitch_limit = pitch_limit
+        self.gaze_limit = gaze_limit
+        self.alpha = 0.1  # smoothing factor, as in FaceEyeTracker
+        self._next_id = 1
+
+        # FaceEyeTracker-compatible state
+        self.face_detected = False
+        self.eyes_closed = False
+        self.looking_away = False
+        self.face_box = None  # largest face, used to plan detector ROIs
+        self.features = None
+        self.people = []
+
+    def reset(self):
+        self.table = PersonTable()
+        self.face_detected = self.eyes_closed = self.looking_away = False
+        self.face_box = None
+        self.people = []
+
+    def analyze_frame(self, frame):
+        now = self.clock()
+        with timed("color_convert"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with timed("facemesh"):
+            results = self.face_mesh.process(rgb)
+
+        rows = np.zeros(0, dtype=np.int64)
+        if results.multi_face_landmarks:
+            with timed("face_features"):
+                points = faces_to_array(results.multi_face_landmarks)
+                boxes = face_boxes(points, frame.shape)
+                rows = self._match(boxes, now)
+                self._update(rows, points, frame.shape, now)
+        self._forget(rows, now)
+        return self._summarise(rows)
+
+    # --- per-frame steps ---------------------------------------------------------
+    def _match(self, boxes, now):
+        """Table row of every face, creating people for unmatched faces."""
+        table = self.table
+        active = table.active()
+        rows = np.full(len(boxes), -1, dtype=np.int64)
+        if len(active):
+            iou = box_ious(boxes, table.boxes[active])
+            # Greedy: best overlaps first
+            for flat in np.argsort(-iou, axis=None):
+                f, a = np.unravel_index(flat, iou.shape)
+                if iou[f, a] < self.iou_threshold:
+                    break
+                if rows[f] < 0 and active[a] not in rows:
+                    rows[f] = active[a]
+        for f in np.nonzero(rows < 0)[0]:
+            rows[f] = table.add(self._next_id, boxes[f], now)
+            self._next_id += 1
+        table.boxes[rows] = boxes
+        table.last_seen[rows] = now
+        return rows
+
+    def _update(self, rows, points, frame_shape, now):
+        t = self.table
+        ear = eye_aspect_ratios(points).mean(axis=1)
+
+        # Looking away: head pose or gaze off for `away_frames` frames in a row
+        pose = head_poses(points, frame_shape)
+        gaze_x = gaze_offsets(points)[..., 0].mean(axis=1)
+        away = (np.abs(pose[:, 0]) > self.yaw_limit) | (np.abs(pose[:, 1]) > self.pitch_limit) \
+            | (np.abs(gaze_x) > self.gaze_limit)
+        t.away_count[rows] = np.where(away, t.away_count[rows] + 1, 0)
+        t.looking_away[rows] = t.away_count[rows] >= self.away_frames
+
+        # Calibration: collect min/max EAR at first, then derive the thresholds
+        calibrating = now - t.first_seen[rows] < self.calibration_interval
+        t.min_ear[rows] = np.where(calibrating, np.minimum(t.min_ear[rows], ear), t.min_ear[rows])
+        t.max_ear[rows] = np.where(calibrating, np.maximum(t.max_ear[rows], ear), t.max_ear[rows])
+        recalibrate = ~calibrating & (t.max_ear[rows] - t.min_ear[rows] > 0.05)
+        t.ear_closed[rows] = np.where(recalibrate, t.min_ear[rows] * 1.15, t.ear_closed[rows])
+        t.ear_open[rows] = np.where(recalibrate, t.max_ear[rows], t.ear_open[rows])
+
+        # Smoothed EAR -> openness, over each person's last few frames
+        frames = t.frames[rows]
+        t.ear_buffer[rows, frames % t.EAR_WINDOW] = ear
+        ear_smooth = t.ear_buffer[rows].sum(axis=1) / np.minimum(frames + 1, t.EAR_WINDOW)
+        ear_range = t.ear_open[rows] - t.ear_closed[rows]
+        openness = np.clip((ear_smooth - t.ear_closed[rows]) / (ear_range + 1e-6), 0.0, 1.0)
+        t.openness[rows] = openness
+
+        t.closed_buffer[rows, frames % t.CLOSED_WINDOW] = openness < 0.25
+        closed_ratio = t.closed_buffer[rows].sum(axis=1) / np.minimum(frames + 1, t.CLOSED_WINDOW)
+        t.frames[rows] = frames + 1
+
+        # Eyes closed when most recent frames are; stay closed at least a second
+        was_closed = t.eyes_closed[rows]
+        closing = closed_ratio > 0.7
+        since = np.where(closing & ~was_closed, now, t.closed_since[rows])
+        hold = was_closed & ~closing & (now - since < 1.0)
+        closed = closing | hold
+        t.eyes_closed[rows] = closed
+        t.closed_since[rows] = np.where(closed, since, np.nan)
+
+        # Focus: fixed 25/50 while eyes are closed, else an EMA towards an openness target
+        target = np.select([openness >= 0.9, openness >= 0.4], [100, 75], 50)
+        smoothed = self.alpha * target + (1 - self.alpha) * t.score[rows]
+        closed_score = np.where(now - since > 120, 25, 50)
+        t.score[rows] = np.where(closed, closed_score, smoothed)
+
+    def _forget(self, seen_rows, now):
+        t = self.table
+        active = t.active()
+        missing = active[~np.isin(active, seen_rows)]
+        # People out of view drift towards 0, like FaceEyeTracker with no face
+        t.score[missing] = (1 - self.alpha) * t.score[missing]
+        t.remove(missing[now - t.last_seen[missing] > self.forget_after])
+
+    def _summarise(self, rows):
+        t = self.table
+        self.face_detected = len(rows) > 0
+        if not self.face_detected:
+            self.face_box = None
+            self.eyes_closed = False
+            self.looking_away = True
+            self.people = []
+            return False, False, True, 0.0
+
+        self.people = [
+            {"id": int(t.ids[r]), "box": tuple(int(v) for v in t.boxes[r]),
+             "eyes_closed": bool(t.eyes_closed[r]), "looking_away": bool(t.looking_away[r]),
+             "openness": round(float(t.openness[r]), 2), "focus_score": round(float(t.score[r]), 1)}
+            for r in rows
+        ]
+        areas = (t.boxes[rows, 2] - t.boxes[rows, 0]) * (t.boxes[rows, 3] - t.boxes[rows, 1])
+        self.face_box = tuple(int(v) for v in t.boxes[rows[np.argmax(areas)]])
+        self.eyes_closed = bool(t.eyes_closed[rows].mean() > 0.5)
+        self.looking_away = bool(t.looking_away[rows].mean() > 0.5)
+        return True, self.eyes_closed, self.looking_away, round(float(t.score[rows].mean()), 1)
+
+    def redraw(self, frame):
+        """Box, ID and score for every person in view."""
+        with timed("draw"):
+            for person in self.people:
+                x1, y1, x2, y2 = person["box"]
+                color = (0, 0, 255) if person["eyes_closed"] or person["looking_away"] else (0, 200, 0)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+                cv2.putText(frame, f"#{person['id']} {int(person['focus_score'])}", (x1, max(20, y1 - 8)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        return frame
@@ -1,12 +1,30 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+import os
 import time
 from collections import deque
 
+from utils.landmark_features import LandmarkFeatureEngine, landmarks_to_array
+from utils.timing import timed
+
+
+def print_debug(info):
+    """Debug hook that prints what the old per-frame prints showed."""
+    print(", ".join(f"{k}={round(v, 2) if isinstance(v, float) else v}" for k, v in info.items()))
+
 
 class FaceEyeTracker:
-    def __init__(self):
+    def __init__(self, debug=None, away_frames=5, clock=None):
+        """
+        debug: optional callable receiving a dict of per-frame values
+        (features, openness, score). FOCUS_FACE_DEBUG=1 uses print_debug.
+        away_frames: consecutive frames the head/gaze must be off before
+        `looking_away` is reported.
+        clock: returns the current time for calibration and closed-eye
+        durations (default time.time; offline runs pass the video time).
+        """
+        self.clock = clock or time.time
         self.face_mesh = mp.solutions.face_mesh.FaceMesh(
             refine_landmarks=True,
             max_num_faces=1,
@@ -18,13 +36,14 @@ class FaceEyeTracker:
         self.face_detected = False
         self.eyes_closed = False
         self.looking_away = False
+        self.face_box = None  # (x1, y1, x2, y2) in pixels, used to plan detector ROIs
         self.last_focus_score = 100
         self.alpha = 0.1  # smoothing factor
 
         # EAR calibration
         self.min_ear = 0.08
         self.max_ear = 0.35
-        self.last_calibration = time.time()
+        self.last_calibration = self.clock()
         self.calibration_interval = 5
         self.EAR_FULLY_OPEN = 0.30
         self.EAR_FULLY_CLOSED = 0.18
@@ -35,30 +54,61 @@ class FaceEyeTracker:
 
         # --- NEW: Rolling window for EAR smoothing ---
         self.ear_buffer = deque(maxlen=5)  # averages over last 5 frames
+        self.closed_buffer = deque(maxlen=10)
+
+        # Landmark features (EARs, head pose, gaze) from one array per frame
+        self.features_engine = LandmarkFeatureEngine()
+        self.features = None
+        self.away_frames = away_frames
+        self._away_count = 0
 
-    def calculate_EAR(self, landmarks, indices):
-        p = np.array([[landmarks[i].x, landmarks[i].y] for i in indices])
-        ear = (np.linalg.norm(p[1] - p[5]) + np.linalg.norm(p[2] - p[4])) / (2.0 * np.linalg.norm(p[0] - p[3]))
-        return ear
+        if debug is None and os.environ.get("FOCUS_FACE_DEBUG") == "1":
+            debug = print_debug
+        self.debug = debug
+
+    def reset(self):
+        """Forget per-session state (scores, calibration, buffers); keeps the loaded FaceMesh."""
+        self.face_detected = False
+        self.eyes_closed = False
+        self.looking_away = False
+        self.face_box = None
+        self.features = None
+        self.last_focus_score = 100
+        self.min_ear, self.max_ear = 0.08, 0.35
+        self.last_calibration = self.clock()
+        self.EAR_FULLY_OPEN, self.EAR_FULLY_CLOSED = 0.30, 0.18
+        self.eye_closed_start = None
+        self.ear_buffer.clear()
+        self.closed_buffer.clear()
+        self._away_count = 0
 
     def analyze_frame(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb)
+        with timed("color_convert"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with timed("facemesh"):
+            results = self.face_mesh.process(rgb)
         self.face_detected = results.multi_face_landmarks is not None
 
         if not self.face_detected:
+            self.face_box = None
+            self.features = None
+            self._away_count = 0
             focus_score = self._smooth_score(0)
             return False, False, True, focus_score
 
         for face_landmarks in results.multi_face_landmarks:
-            LEFT_EYE = [33, 160, 158, 133, 153, 144]
-            RIGHT_EYE = [362, 385, 387, 263, 373, 380]
-            left_EAR = self.calculate_EAR(face_landmarks.landmark, LEFT_EYE)
-            right_EAR = self.calculate_EAR(face_landmarks.landmark, RIGHT_EYE)
-            ear = (left_EAR + right_EAR) / 2.0
+            with timed("face_features"):
+                points = landmarks_to_array(face_landmarks.landmark)
+                self.features = features = self.features_engine.compute(points, frame.shape)
+            self.face_box = features["face_box"]
+            ear = features["ear"]
+
+            # Looking away once head pose / gaze stay off for a few frames
+            self._away_count = self._away_count + 1 if features["looking_away"] else 0
+            self.looking_away = self._away_count >= self.away_frames
 
             # Calibration
-            current_time = time.time()
+            current_time = self.clock()
             if current_time - self.last_calibration < self.calibration_interval:
                 self.min_ear = min(self.min_ear, ear)
                 self.max_ear = max(self.max_ear, ear)
@@ -75,31 +125,30 @@ class FaceEyeTracker:
             eye_openness = np.clip((ear_smooth - self.EAR_FULLY_CLOSED) / (ear_range + 1e-6), 0.0, 1.0)
 
             # Rolling closure detection
-            if not hasattr(self, "closed_buffer"):
-                from collections import deque
-                self.closed_buffer = deque(maxlen=10)
             self.closed_buffer.append(eye_openness < 0.25)
             closed_ratio = sum(self.closed_buffer) / len(self.closed_buffer)
 
             # Eyes closed if most recent frames below threshold
             if closed_ratio > 0.7:
                 if not self.eyes_closed:
-                    self.eye_closed_start = time.time()
+                    self.eye_closed_start = current_time
                 self.eyes_closed = True
             else:
                 # Add small delay before declaring "open" again to prevent flicker
-                if self.eyes_closed and time.time() - self.eye_closed_start < 1.0:
+                if self.eyes_closed and current_time - self.eye_closed_start < 1.0:
                     pass  # keep it closed briefly
                 else:
                     self.eyes_closed = False
                     self.eye_closed_start = None
 
-            # Debug print
-            # print(f"Openness: {eye_openness:.2f}, ClosedRatio: {closed_ratio:.2f}, EyesClosed: {self.eyes_closed}")
-
             # Focus logic
             focus_score = self._calculate_focus(eye_openness)
 
+            if self.debug is not None:
+                self.debug(dict(features, openness=float(eye_openness), closed_ratio=closed_ratio,
+                                eyes_closed=self.eyes_closed, looking_away=self.looking_away,
+                                focus=focus_score))
+
         return self.face_detected, self.eyes_closed, self.looking_away, focus_score
 
 
@@ -109,15 +158,13 @@ class FaceEyeTracker:
         if self.eyes_closed:
             duration = 0
             if self.eye_closed_start:
-                duration = time.time() - self.eye_closed_start
+                duration = self.clock() - self.eye_closed_start
 
             if duration > 120:
                 self.last_focus_score = 25
-                print("🟥 Eyes closed >2 min → Focus = 25%")
                 return 25
             else:
                 self.last_focus_score = 50
-                print("🟠 Eyes closed detected → Focus = 50%")
                 return 50
 
         # --- When eyes are open or partially closed ---
@@ -130,7 +177,6 @@ class FaceEyeTracker:
 
         smoothed = self.alpha * target + (1 - self.alpha) * self.last_focus_score
         self.last_focus_score = smoothed
-        print(f"🟢 Focus (Open) = {round(smoothed, 1)}")
         return round(smoothed, 1)
 
 
@@ -138,5 +184,6 @@ class FaceEyeTracker:
         """Applies smoothing only for gradual changes, not hard states."""
         smoothed = self.alpha * new_score + (1 - self.alpha) * self.last_focus_score
         self.last_focus_score = smoothed
-        print(f"Focus Score: {round(smoothed, 1)}")  # 👈 Optional debug print
+        if self.debug is not None:
+            self.debug({"face_detected": False, "focus": round(smoothed, 1)})
         return round(smoothed, 1)
\ No newline at end of file
@@ -0,0 +1,215 @@
+import os
+import time
+
+from utils.scheduler import DetectorScheduler
+
+# Scheduler settings per job: FaceMesh is cheap and drives eyes_closed, so it
+# stays close to every frame; the YOLO jobs can be stretched much further.
+JOB_SETTINGS = {
+    "face": dict(min_every=1, max_every=3, priority=4.0, expire_keys=()),
+    "hands": dict(min_every=1, max_every=3, priority=3.0, expire_keys=("writing",)),
+    "phone": dict(min_every=1, max_every=10, priority=2.0, expire_keys=("phone_detected",)),
+    "pen": dict(min_every=1, max_every=15, priority=1.0, expire_keys=("pen_detected",)),
+    "objects": dict(min_every=1, max_every=10, priority=2.0, expire_keys=("phone_detected", "pen_detected")),
+}
+
+# Object detectors whose last result is reused while the scene is static
+MOTION_GATED_JOBS = ("phone", "pen", "objects")
+
+DEFAULT_RESULT = {
+    "face_detected": False,
+    "eyes_closed": False,
+    "looking_away": False,
+    "base_score": 0,
+    "phone_detected": False,
+    "phone_visible_time": 0.0,  # seconds the current phone has been tracked (detect-then-track mode)
+    "pen_detected": False,
+    "moving": True,
+    "face_box": None,
+}
+
+
+class FrameAnalyzer:
+    """
+    Runs the face tracker and the object detector(s) on a frame and returns
+    one dict of detector states. A DetectorScheduler decides which detectors
+    actually run; skipped ones carry their last result forward and redraw
+    their last boxes so the preview doesn't flicker.
+
+    With a MotionAnalyzer, every result carries the motion state, and when
+    `motion_gate` is on the YOLO jobs are skipped while the scene is static
+    (their last detections still hold). They still re-run at least every
+    `max_static_age` seconds to catch slow changes.
+
+    With a HandActivityTracker, hand landmarks decide whether the person is
+    writing; the pen model only runs while that is ambiguous, and idle_time
+    counts from the last writing motion instead of the last pen sighting.
+
+    With an ROIPlanner, the object detectors only look at the regions derived
+    from the face box (with periodic full-frame passes).
+
+    With a `dispatcher` (ProcessDetectorPool), every job that will run this
+    frame is started up front so they run in parallel worker processes; the
+    ROIs then come from the previous frame's face box.
+
+    `clock` is the time source for the default scheduler (static-scene reuse
+    age, carried-result confidence) and the hand tracker; offline runs pass
+    the video time so results don't depend on how fast they run.
+    """
+
+    def __init__(self, face_tracker, object_detector, scheduler=None, motion=None,
+                 motion_gate=True, max_static_age=2.0, roi_planner=None, dispatcher=None, hand_tracker=None,
+                 clock=None):
+        self.face_tracker = face_tracker
+        self.object_detector = object_detector
+        self.scheduler = scheduler or DetectorScheduler(clock=clock)
+        self.motion = motion
+        self.motion_gate = motion_gate
+        self.max_static_age = max_static_age
+        self.roi_planner = roi_planner
+        self.dispatcher = dispatcher
+        self.hand_tracker = hand_tracker
+        self.clock = clock or time.time
+        self._last_face_box = None
+
+        self.jobs = {"face": (self._run_face, None)}
+        if hand_tracker is not None:
+            self.jobs["hands"] = (self._run_hands, hand_tracker.redraw)  # before "pen", which it gates
+        self.jobs.update(object_detector.jobs())
+        for name in self.jobs:
+            self.scheduler.register(name, **JOB_SETTINGS.get(name, {}))
+
+    def _run_face(self, frame, rois=None):
+        face_detected, eyes_closed, looking_away, base_score = self.face_tracker.analyze_frame(frame)
+        result = {
+            "face_detected": face_detected,
+            "eyes_closed": eyes_closed,
+            "looking_away": looking_away,
+            "base_score": base_score,
+            "face_box": self.face_tracker.face_box,
+        }
+        if hasattr(self.face_tracker, "people"):
+            result["people"] = self.face_tracker.people  # ClassroomTracker: one entry per person
+        return result
+
+    def _run_hands(self, frame, rois=None):
+        state = self.hand_tracker.analyze_frame(frame, self.clock())
+        return {"hand_activity": state, "writing": state == "writing"}
+
+    def analyze(self, frame):
+        """Returns (result dict, frame with boxes drawn)."""
+        self.scheduler.begin_frame()
+        result = dict(DEFAULT_RESULT)
+        if self.motion is not None:
+            result.update(self.motion.analyze(frame))
+
+        rois = None
+        if self.dispatcher is not None:
+            planned = [name for name in self.jobs
+                       if self.scheduler.due(name) and not self._static(name, result)
+                       and not self._hands_settled(name)]
+            if self.roi_planner is not None and any(name != "face" for name in planned):
+                rois = self.roi_planner.plan(frame.shape, self._last_face_box)
+            self.dispatcher.dispatch(frame, planned, rois)
+
+        for name, (run, redraw) in self.jobs.items():
+            if self.scheduler.due(name):
+                if self._static(name, result) or self._hands_settled(name):
+                    result.update(self.scheduler.reuse(name))
+                    redraw(frame)
+                    continue
+                if name != "face" and rois is None and self.roi_planner is not None:
+                    # The face job runs first, so its box is known by now
+                    rois = self.roi_planner.plan(frame.shape, result["face_box"])
+                result.update(self.scheduler.run(name, run, frame, rois))
+            else:
+                result.update(self.scheduler.carried(name))
+                if redraw is not None:
+                    redraw(frame)
+        if self.hand_tracker is not None:
+            if result.get("writing"):
+                result["pen_detected"] = True  # writing strokes imply a pen in hand
+            result["idle_time"] = self.hand_tracker.idle_time(self.clock())
+        else:
+            result["idle_time"] = self.object_detector.pen.idle_time()
+        self._last_face_box = result["face_box"]
+        self.scheduler.end_frame()
+        return result, frame
+
+    def close(self):
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+
+    def _hands_settled(self, name):
+        """The pen model isn't needed while the hands clearly show writing or stillness."""
+        return (
+            self.hand_tracker is not None
+            and name == "pen"
+            and not self.hand_tracker.ambiguous
+            and self.scheduler.has_result(name)
+        )
+
+    def _static(self, name, result):
+        return (
+            self.motion is not None
+            and self.motion_gate
+            and name in MOTION_GATED_JOBS
+            and not result["moving"]
+            and self.scheduler.has_result(name)
+            and self.scheduler.age(name) < self.max_static_age
+        )
+
+
+def create_frame_analyzer(detector=None, target_fps=None, motion_gate=True, roi=False,
+                          exec_mode="thread", engine=None, face_tracker=None, track=None, classroom=None,
+                          hands=None, clock=None):
+    """
+    Builds the FrameAnalyzer used by main.py and CameraWorker.
+    exec_mode="thread" runs the detectors in this process (optionally on the
+    shared batching `engine` and an already warm `face_tracker`); "process"
+    runs each one in a worker process.
+    track: detect-then-track for the object detectors (None -> $FOCUS_TRACK).
+    classroom: track up to this many faces with a ClassroomTracker instead of
+    one FaceEyeTracker (None -> $FOCUS_CLASSROOM, 0 = off); thread mode only.
+    hands: gate the pen model with a HandActivityTracker (None -> $FOCUS_HANDS); thread mode only.
+    clock: time source for the scheduler and every tracker built here (default
+    time.time; offline runs pass the video time); thread mode only.
+    """
+    from utils.motion_utils import MotionAnalyzer
+    from utils.roi import ROIPlanner
+
+    scheduler = DetectorScheduler(target_fps=target_fps, clock=clock)
+    options = dict(motion=MotionAnalyzer(), motion_gate=motion_gate,
+                   roi_planner=ROIPlanner() if roi else None)
+
+    if classroom is None:
+        classroom = int(os.environ.get("FOCUS_CLASSROOM", 0) or 0)
+    if hands is None:
+        hands = os.environ.get("FOCUS_HANDS") == "1"
+
+    if exec_mode == "process":
+        if classroom or hands:
+            raise ValueError("Classroom and hand-activity modes need exec_mode='thread'")
+        from utils.process_pool import ProcessDetectorPool
+
+        pool = ProcessDetectorPool(detector, track=track)
+        return FrameAnalyzer(pool.face_tracker, pool.object_detector, scheduler, dispatcher=pool, **options)
+    if exec_mode != "thread":
+        raise ValueError(f"Unknown exec mode: {exec_mode}")
+
+    from modules.object_detector import build_object_detector
+
+    if face_tracker is None and classroom:
+        from modules.classroom_tracker import ClassroomTracker
+
+        face_tracker = ClassroomTracker(max_faces=classroom, clock=clock)
+    elif face_tracker is None:
+        from modules.face_eye_tracker import FaceEyeTracker
+
+        face_tracker = FaceEyeTracker(clock=clock)
+    if hands:
+        from modules.hand_activity import HandActivityTracker
+
+        options["hand_tracker"] = HandActivityTracker()
+    return FrameAnalyzer(face_tracker, build_object_detector(detector, engine=engine, track=track, clock=clock),
+                         scheduler, clock=clock, **options)
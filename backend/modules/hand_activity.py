@@ -0,0 +1,191 @@
+import cv2
+import numpy as np
+import time
+from collections import deque
+
+from utils.landmark_features import landmarks_to_array
+from utils.timing import timed
+
+WRIST, MIDDLE_MCP = 0, 9
+FINGERTIPS = np.array([4, 8, 12])  # thumb, index and middle finger: the ones holding a pen
+
+WRITING, STILL, AMBIGUOUS = "writing", "still", "ambiguous"
+
+# RMS spread (pixels) of a motionless fingertip relative to the wrist: typical
+# MediaPipe jitter on a webcam. Only the starting point; the floor is learned
+# within these bounds.
+JITTER_PX = 1.0
+MIN_JITTER_PX, MAX_JITTER_PX = 0.3, 1.5
+
+
+class WritingClassifier:
+    def __init__(self, window=1.5, min_frames=6, still_below=0.015, writing_above=0.035, gross_limit=0.5,
+                 still_ratio=1.3, writing_ratio=2.5, jitter_px=JITTER_PX, jitter_fall=2.0, jitter_rise=20.0):
+        """
+        Classifies hand landmarks over the last `window` seconds, per hand:
+        - fine motion: how far the fingertips wander relative to the wrist
+        - gross motion: how far the wrist itself wanders
+        as the RMS spread of the positions, in hand sizes (wrist to middle
+        knuckle), so neither the distance to the camera nor the frame rate
+        matters (frame-to-frame speeds would mostly measure landmark jitter).
+
+        Landmark jitter is roughly constant in pixels, so on small hands it is
+        as large as `still_below`. The jitter floor is learned only from
+        windows already classified still: it follows their fingertip spread
+        (pixels) down within `jitter_fall` seconds and up over `jitter_rise`
+        seconds, capped at MAX_JITTER_PX so slow writing can't be learned as
+        jitter. The thresholds are at least `still_ratio` / `writing_ratio`
+        times it.
+
+        writing:   fine motion above max(`writing_above`, writing_ratio x floor)
+                   while the wrist moves less than `gross_limit`
+        still:     fine motion below max(`still_below`, still_ratio x floor)
+                   for every hand
+        ambiguous: no hands, not enough frames yet, values in between, or the
+                   whole hand moving (reaching, gesturing)
+        """
+        self.window = window
+        self.min_frames = min_frames
+        self.still_below = still_below
+        self.writing_above = writing_above
+        self.gross_limit = gross_limit
+        self.still_ratio = still_ratio
+        self.writing_ratio = writing_ratio
+        self.jitter_fall = jitter_fall
+        self.jitter_rise = jitter_rise
+        self.jitter_px = jitter_px
+        self._history = {}  # hand label -> deque of (t, fingertips rel. to wrist, wrist, hand size)
+        self._last_classify = None
+        self.state = AMBIGUOUS
+        self.fine_motion = 0.0
+        self.last_writing_time = None
+
+    def reset(self, now=None):
+        self._history.clear()
+        self._last_classify = None
+        self.state = AMBIGUOUS
+        self.fine_motion = 0.0
+        self.last_writing_time = time.time() if now is None else now
+
+    def observe(self, label, points, now):
+        """Adds one hand's landmarks (21, 2) in pixels to its window."""
+        history = self._history.setdefault(label, deque())
+        wrist = points[WRIST]
+        size = np.linalg.norm(points[MIDDLE_MCP] - wrist) + 1e-6
+        history.append((now, points[FINGERTIPS] - wrist, wrist, size))
+        while history and now - history[0][0] > self.window:
+            history.popleft()
+
+    def forget_missing(self, seen):
+        for label in list(self._history):
+            if label not in seen:
+                del self._history[label]  # the hand left the view; start its window again
+
+    def motion(self, history):
+        """(fine, gross) spread of one hand over its window in pixels, and the hand size."""
+        tips = np.array([h[1] for h in history])    # (T, 3, 2)
+        wrist = np.array([h[2] for h in history])   # (T, 2)
+        size = float(np.median([h[3] for h in history]))
+        fine = np.sqrt(((tips - tips.mean(axis=0)) ** 2).sum(axis=-1).mean(axis=0)).mean()
+        gross = np.sqrt(((wrist - wrist.mean(axis=0)) ** 2).sum(axis=-1).mean())
+        return float(fine), float(gross), size
+
+    def _learn_jitter(self, fine_px, now):
+        dt = now - self._last_classify if self._last_classify is not None else 0.0
+        rate = self.jitter_fall if fine_px < self.jitter_px else self.jitter_rise
+        self.jitter_px += (fine_px - self.jitter_px) * min(1.0, dt / rate)
+        self.jitter_px = min(MAX_JITTER_PX, max(MIN_JITTER_PX, self.jitter_px))
+
+    def classify(self, now):
+        """Returns "writing", "still" or "ambiguous" from the current windows."""
+        if self.last_writing_time is None:
+            self.last_writing_time = now
+        state = AMBIGUOUS
+        self.fine_motion = 0.0
+        ready = [h for h in self._history.values() if len(h) >= self.min_frames]
+        if ready and len(ready) == len(self._history):
+            writing, still = False, True
+            for fine_px, gross_px, size in (self.motion(h) for h in ready):
+                settled = gross_px / size < self.gross_limit
+                fine = fine_px / size
+                self.fine_motion = max(self.fine_motion, fine)
+                floor = self.jitter_px / size
+                hand_still = settled and fine < max(self.still_below, self.still_ratio * floor)
+                writing |= settled and fine > max(self.writing_above, self.writing_ratio * floor)
+                still &= hand_still
+                if hand_still:
+                    self._learn_jitter(fine_px, now)
+            state = WRITING if writing else STILL if still else AMBIGUOUS
+        self._last_classify = now
+        self.state = state
+        if state == WRITING:
+            self.last_writing_time = now
+        return state
+
+    def idle_time(self, now=None):
+        """Seconds since the last writing motion."""
+        now = time.time() if now is None else now
+        return now - (self.last_writing_time if self.last_writing_time is not None else now)
+
+
+class HandActivityTracker:
+    def __init__(self, max_hands=2, **settings):
+        """
+        Runs MediaPipe Hands on each frame and feeds the landmarks to a
+        WritingClassifier (`settings` are its thresholds). FrameAnalyzer only
+        runs the pen model while the result is ambiguous.
+        """
+        import mediapipe as mp  # only needed here, so WritingClassifier works without it
+
+        self.hands = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_hands,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.classifier = WritingClassifier(**settings)
+        self.hand_boxes = []
+
+    @property
+    def state(self):
+        return self.classifier.state
+
+    @property
+    def ambiguous(self):
+        return self.classifier.state == AMBIGUOUS
+
+    def reset(self):
+        self.classifier.reset()
+        self.hand_boxes = []
+
+    def analyze_frame(self, frame, now=None):
+        """Returns "writing", "still" or "ambiguous"."""
+        now = time.time() if now is None else now
+        with timed("color_convert"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with timed("hands"):
+            results = self.hands.process(rgb)
+
+        h, w = frame.shape[:2]
+        self.hand_boxes = []
+        seen = set()
+        for landmarks, handedness in zip(results.multi_hand_landmarks or (), results.multi_handedness or ()):
+            label = handedness.classification[0].label
+            points = landmarks_to_array(landmarks.landmark)[:, :2] * (w, h)
+            self.hand_boxes.append(tuple(int(v) for v in np.concatenate([points.min(axis=0), points.max(axis=0)])))
+            self.classifier.observe(label, points, now)
+            seen.add(label)
+        self.classifier.forget_missing(seen)
+        return self.classifier.classify(now)
+
+    def idle_time(self, now=None):
+        return self.classifier.idle_time(now)
+
+    def redraw(self, frame):
+        with timed("draw"):
+            color = {WRITING: (0, 200, 0), STILL: (0, 165, 255)}.get(self.state, (200, 200, 200))
+            for x1, y1, x2, y2 in self.hand_boxes:
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 1)
+                cv2.putText(frame, self.state, (x1, max(20, y1 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        return frame
+
@@ -0,0 +1,134 @@
+import os
+
+
+from modules.phone_detector import PhoneDetector
+from modules.pen_tracker import PenTracker
+from utils.detections import run_detector, is_phone, is_pen
+from utils.roi import union_box
+from utils.timing import timed
+from utils.inference_backend import load_yolo
+from utils.tracking import ObjectTracker, tracking_from_env
+
+PHONE_MODEL_PATH = "models/yolov8n.pt"
+PEN_MODEL_PATH = "models/pen_detectorv2.pt"
+FUSED_MODEL_PATH = "models/focus_objects.pt"
+# Class order of the fused model built by train_fused_detector.py
+FUSED_CLASSES = ["book", "marker", "pen", "pencil", "cell phone"]
+
+
+class ObjectDetector:
+    def __init__(self, model_path=FUSED_MODEL_PATH, conf=0.35, idle_threshold=300, model=None, track=False,
+                 clock=None):
+        """
+        One YOLO model trained on COCO "cell phone" + the pen dataset classes.
+        A single forward pass feeds both the phone and the pen logic, so it
+        replaces running PhoneDetector and PenTracker models separately.
+        track: run the model every few frames and track the boxes in between.
+        clock: time source for idle and visible times (default time.time).
+        """
+        self.model = model or load_yolo(model_path)
+        self.conf = conf
+        self.tracker = ObjectTracker(keep=lambda name: is_phone(name) or is_pen(name), clock=clock) if track else None
+        # The shared tracker only gives them visible_time(); detection happens here
+        self.phone = PhoneDetector(model_path=None, tracker=self.tracker)
+        self.pen = PenTracker(model_path=None, idle_threshold=idle_threshold, tracker=self.tracker, clock=clock)
+
+    def detect(self, frame, roi=None):
+        if self.tracker is not None:
+            return self.tracker.step(frame, self._run_model, roi)
+        return self._run_model(frame, roi)
+
+    def _run_model(self, frame, roi=None):
+        with timed("yolo_objects"):
+            return run_detector(self.model, frame, self.conf, roi)
+
+    def analyze_frame(self, frame, rois=None):
+        """
+        rois: optional {"phone": box, "pen": box} from ROIPlanner; the fused
+        model runs once on the union of both regions.
+        Returns:
+            phone_detected (bool), pen_detected (bool), idle_time (float),
+            frame (np.ndarray) with bounding boxes drawn.
+        """
+        roi = union_box(rois.get("phone"), rois.get("pen")) if rois else None
+        detections = self.detect(frame, roi)
+        phone_detected, frame = self.phone.handle_detections(frame, detections)
+        pen_detected, idle_time, frame = self.pen.handle_detections(frame, detections)
+        return phone_detected, pen_detected, idle_time, frame
+
+    def redraw(self, frame):
+        return self.pen.redraw(self.phone.redraw(frame))
+
+    def jobs(self):
+        """Schedulable units for FrameAnalyzer: name -> (run(frame, rois) -> dict, redraw(frame))."""
+        def run_objects(frame, rois=None):
+            phone_detected, pen_detected, _, _ = self.analyze_frame(frame, rois)
+            return {"phone_detected": phone_detected, "pen_detected": pen_detected,
+                    "phone_visible_time": self.phone.visible_time()}
+
+        return {"objects": (run_objects, self.redraw)}
+
+
+class SeparateDetectors:
+    """The original two-model setup behind the same interface as ObjectDetector."""
+
+    def __init__(self, phone_model=PHONE_MODEL_PATH, pen_model=PEN_MODEL_PATH,
+                 conf=0.35, idle_threshold=300, engine=None, track=False, clock=None):
+        self.phone = PhoneDetector(phone_model, conf=conf,
+                                   model=engine.model(phone_model) if engine else None,
+                                   tracker=ObjectTracker(keep=is_phone, clock=clock) if track else None)
+        self.pen = PenTracker(pen_model, idle_threshold=idle_threshold, conf=conf,
+                              model=engine.model(pen_model) if engine else None,
+                              tracker=ObjectTracker(keep=is_pen, clock=clock) if track else None, clock=clock)
+
+    def analyze_frame(self, frame, rois=None):
+        rois = rois or {}
+        phone_detected, frame = self.phone.analyze_frame(frame, rois.get("phone"))
+        pen_detected, idle_time, frame = self.pen.analyze_frame(frame, rois.get("pen"))
+        return phone_detected, pen_detected, idle_time, frame
+
+    def redraw(self, frame):
+        return self.pen.redraw(self.phone.redraw(frame))
+
+    def jobs(self):
+        def run_phone(frame, rois=None):
+            phone_detected = self.phone.analyze_frame(frame, (rois or {}).get("phone"))[0]
+            return {"phone_detected": phone_detected, "phone_visible_time": self.phone.visible_time()}
+
+        def run_pen(frame, rois=None):
+            return {"pen_detected": self.pen.analyze_frame(frame, (rois or {}).get("pen"))[0]}
+
+        return {"phone": (run_phone, self.phone.redraw), "pen": (run_pen, self.pen.redraw)}
+
+
+def _resolve_mode(mode, fused_model):
+    mode = mode or os.environ.get("FOCUS_DETECTOR", "separate")
+    if mode not in ("separate", "fused"):
+        raise ValueError(f"Unknown detector mode: {mode}")
+    if mode == "fused" and not os.path.exists(fused_model):
+        print(f"⚠️ Fused model {fused_model} not found, using separate detectors")
+        return "separate"
+    return mode
+
+
+def model_paths(mode=None, fused_model=FUSED_MODEL_PATH):
+    """Checkpoints build_object_detector() would load for this mode."""
+    if _resolve_mode(mode, fused_model) == "fused":
+        return [fused_model]
+    return [PHONE_MODEL_PATH, PEN_MODEL_PATH]
+
+
+def build_object_detector(mode=None, fused_model=FUSED_MODEL_PATH, engine=None, track=None, clock=None):
+    """
+    mode: "separate" (yolov8n + pen_detectorv2) or "fused" (one model).
+    None reads $FOCUS_DETECTOR. Falls back to separate models when the fused
+    checkpoint hasn't been trained yet.
+    engine: optional BatchInferenceEngine so sessions share loaded models.
+    track: detect-then-track with optical flow between YOLO runs (None -> $FOCUS_TRACK).
+    clock: time source for idle and visible times (default time.time).
+    """
+    track = tracking_from_env() if track is None else track
+    if _resolve_mode(mode, fused_model) == "fused":
+        return ObjectDetector(fused_model, model=engine.model(fused_model) if engine else None, track=track,
+                              clock=clock)
+    return SeparateDetectors(engine=engine, track=track, clock=clock)
@@ -1,38 +1,81 @@
-from ultralytics import YOLO
 import cv2
 import time
 
+from utils.detections import run_detector, is_pen
+from utils.timing import timed
+from utils.inference_backend import load_yolo
+
 class PenTracker:
-    def __init__(self, model_path="models/pen_detectorv2.pt", idle_threshold=300):
+    def __init__(self, model_path="models/pen_detectorv2.pt", idle_threshold=300, conf=0.35, model=None,
+                 tracker=None, clock=None):
         """
         Detect pen presence and track writing activity.
         idle_threshold = seconds before considered 'not writing'
+        model_path=None skips loading a model (detections come from a shared ObjectDetector)
+        model = an already-loaded (or shared engine) model to use instead
+        tracker = optional ObjectTracker that follows pen boxes between YOLO runs
+        clock = returns the current time for the idle timer (default time.time)
         """
-        self.model = YOLO(model_path)
-        self.last_seen_time = time.time()
+        self.clock = clock or time.time
+        self.model = model or (load_yolo(model_path) if model_path else None)
+        self.conf = conf
+        self.tracker = tracker
+        self.last_seen_time = self.clock()
         self.pen_detected = False
         self.idle_threshold = idle_threshold
+        self.last_boxes = []  # pen boxes from the last analyzed frame
+        self.last_detections = []  # the Detections behind last_boxes (for traces)
+
+    def analyze_frame(self, frame, roi=None):
+        return self.handle_detections(frame, self.detect(frame, roi))
+
+    def detect(self, frame, roi=None):
+        if self.tracker is not None:
+            return self.tracker.step(frame, self._run_model, roi)
+        return self._run_model(frame, roi)
+
+    def _run_model(self, frame, roi=None):
+        with timed("yolo_pen"):
+            return run_detector(self.model, frame, self.conf, roi)
 
-    def analyze_frame(self, frame):
-        results = self.model(frame, conf=0.35, verbose=False)
+    def visible_time(self):
+        """Seconds the current pen has been in view (needs a tracker, else 0)."""
+        if self.tracker is None or not self.pen_detected:
+            return 0.0
+        return self.tracker.visible_time(is_pen)
+
+    def handle_detections(self, frame, detections):
+        pen_detected = self.update(detections)
+        return pen_detected, self.idle_time(), self.redraw(frame)
+
+    def update(self, detections):
+        """Update pen state and idle timer from detections without drawing anything."""
         pen_detected_now = False
+        self.last_boxes = []
+        self.last_detections = []
 
-        for r in results:
-            for box in r.boxes:
-                cls_name = self.model.names[int(box.cls)]
-                if "pen" in cls_name.lower():
-                    pen_detected_now = True
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
-                    cv2.putText(frame, "Pen", (x1, max(30, y1 - 10)),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+        for detection in detections:
+            if is_pen(detection.cls_name):
+                pen_detected_now = True
+                self.last_boxes.append(detection.box)
+                self.last_detections.append(detection)
 
         # Update detection logic
         if pen_detected_now:
-            self.last_seen_time = time.time()
+            self.last_seen_time = self.clock()
             self.pen_detected = True
         else:
             self.pen_detected = False
+        return self.pen_detected
+
+    def idle_time(self):
+        return self.clock() - self.last_seen_time
 
-        idle_time = time.time() - self.last_seen_time
-        return self.pen_detected, idle_time, frame
+    def redraw(self, frame):
+        """Draw the boxes from the last detection (used on frames the model skipped)."""
+        with timed("draw"):
+            for x1, y1, x2, y2 in self.last_boxes:
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
+                cv2.putText(frame, "Pen", (x1, max(30, y1 - 10)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+        return frame
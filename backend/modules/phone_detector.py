@@ -1,40 +1,81 @@
-from ultralytics import YOLO
 import cv2
 
+from utils.detections import Detection, run_detector, is_phone
+from utils.timing import timed
+from utils.inference_backend import load_yolo
+
 class PhoneDetector:
-    def __init__(self, model_path="models/yolov8n.pt"):
+    def __init__(self, model_path="models/yolov8n.pt", conf=0.35, model=None, tracker=None):
         """
         Detect mobile phones using a pretrained YOLOv8 model.
+        model_path=None skips loading a model; detections then come from a
+        shared ObjectDetector through handle_detections().
+        model: an already-loaded (or shared engine) model to use instead.
+        tracker: optional ObjectTracker; YOLO then only runs every few frames
+        and phone boxes are tracked in between.
         """
-        self.model = YOLO(model_path)
+        self.model = model or (load_yolo(model_path) if model_path else None)
+        self.conf = conf
+        self.tracker = tracker
+        self.mobile_detected = False
+        self.last_boxes = []  # (label, box) drawn on the last analyzed frame
+        self.last_detections = []  # the Detections behind last_boxes (for traces)
 
-    def analyze_frame(self, frame):
+    def analyze_frame(self, frame, roi=None):
         """
-        Run phone detection on a frame.
+        Run phone detection on a frame (or only inside `roi`, x1/y1/x2/y2).
         Returns:
             mobile_detected (bool): True if a phone is seen.
             frame (np.ndarray): Frame with bounding boxes drawn.
         """
-        results = self.model(frame, conf=0.35, verbose=False)
-        mobile_detected = False
+        return self.handle_detections(frame, self.detect(frame, roi))
+
+    def detect(self, frame, roi=None):
+        if self.tracker is not None:
+            return self.tracker.step(frame, self._run_model, roi)
+        return self._run_model(frame, roi)
+
+    def _run_model(self, frame, roi=None):
+        with timed("yolo_phone"):
+            return run_detector(self.model, frame, self.conf, roi)
 
-        for r in results:
-            for box in r.boxes:
-                cls_name = self.model.names[int(box.cls)]
-                conf = float(box.conf)
+    def visible_time(self):
+        """Seconds the current phone has been in view (needs a tracker, else 0)."""
+        if self.tracker is None or not self.mobile_detected:
+            return 0.0
+        return self.tracker.visible_time(is_phone)
+
+    def handle_detections(self, frame, detections):
+        """Same as analyze_frame() but for detections produced elsewhere."""
+        mobile_detected = self.update(detections)
+        return mobile_detected, self.redraw(frame)
+
+    def update(self, detections):
+        """Update phone state from detections without drawing anything."""
+        mobile_detected = False
+        self.last_boxes = []
+        self.last_detections = []
 
-                if "cell phone" in cls_name.lower() or "mobile" in cls_name.lower():
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    width, height = x2 - x1, y2 - y1
+        for cls_name, conf, (x1, y1, x2, y2) in detections:
+            if is_phone(cls_name):
+                width, height = x2 - x1, y2 - y1
 
-                    # Ignore small detections (likely pen)
-                    if width < 80 and height < 80:
-                        continue
+                # Ignore small detections (likely pen)
+                if width < 80 and height < 80:
+                    continue
 
-                    mobile_detected = True
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
-                    cv2.putText(frame, f"{cls_name} {conf:.2f}", (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                mobile_detected = True
+                self.last_boxes.append((f"{cls_name} {conf:.2f}", (x1, y1, x2, y2)))
+                self.last_detections.append(Detection(cls_name, conf, (x1, y1, x2, y2)))
 
+        self.mobile_detected = mobile_detected
+        return mobile_detected
 
-        return mobile_detected, frame
+    def redraw(self, frame):
+        """Draw the boxes from the last detection (used on frames the model skipped)."""
+        with timed("draw"):
+            for label, (x1, y1, x2, y2) in self.last_boxes:
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+                cv2.putText(frame, label, (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        return frame
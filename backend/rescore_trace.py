@@ -0,0 +1,129 @@
+"""
+Re-score recorded detection traces (utils/trace.py) without running any model.
+
+    python rescore_trace.py traces/*.ftrace
+    python rescore_trace.py traces/default-20260101-090000.ftrace --phone-penalty 30 --ear-threshold 0.2 \
+        --timeline timeline.csv
+
+Each trace is replayed through the same FocusEngine the live app uses, with
+the scoring knobs given here: score weights, phone penalty, EMA smoothing,
+episode debouncing, and optionally an EAR threshold that re-derives
+eyes_closed from the recorded eye aspect ratios. Several traces are scored in
+parallel (--jobs).
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.focus_engine import FocusEngine, EPISODE_SETTINGS, PHONE_PENALTY, SMOOTHING
+from utils.focus_score import DEFAULT_WEIGHTS
+from utils.trace import load_trace
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-score detection traces with different scoring settings")
+    parser.add_argument("traces", nargs="+")
+    parser.add_argument("--weights", default=None,
+                        help="score deductions, e.g. no_face=40,eyes_closed=30,looking_away=15,phone=20,no_pen=10")
+    parser.add_argument("--phone-penalty", type=float, default=PHONE_PENALTY)
+    parser.add_argument("--smoothing", type=float, default=SMOOTHING, help="weight of each new frame in the EMA")
+    parser.add_argument("--episodes", default=None,
+                        help='JSON episode debouncing, e.g. \'{"mobile": {"start": 2, "end": 3}}\'')
+    parser.add_argument("--ear-threshold", type=float, default=None,
+                        help="re-derive eyes_closed as mean EAR below this (default: use the recorded flag)")
+    parser.add_argument("--timeline", default=None, help="write a per-second CSV timeline (one trace only)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default=None, help="save the summaries as JSON")
+    return parser.parse_args()
+
+
+def parse_weights(text):
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in filter(None, (text or "").split(",")):
+        key, value = part.split("=")
+        if key not in weights:
+            raise ValueError(f"Unknown weight {key}; expected one of {', '.join(weights)}")
+        weights[key] = float(value)
+    return weights
+
+
+def frame_flags(records, ear_threshold=None):
+    """Columns FocusEngine needs, as plain Python lists (much faster to iterate than records)."""
+    face = records["face"].astype(bool)
+    eyes_closed = records["eyes_closed"].astype(bool)
+    if ear_threshold is not None:
+        ear = (records["ear_left"] + records["ear_right"]) / 2
+        eyes_closed = face & ~np.isnan(ear) & (ear < ear_threshold)
+    return {
+        "t": records["t"].tolist(),
+        "face_detected": face.tolist(),
+        "eyes_closed": eyes_closed.tolist(),
+        "looking_away": records["looking_away"].astype(bool).tolist(),
+        "phone_detected": records["phone"].astype(bool).tolist(),
+        "pen_detected": records["pen"].astype(bool).tolist(),
+        "idle_time": records["idle_time"].tolist(),
+        "moving": records["moving"].astype(bool).tolist(),
+    }
+
+
+def rescore(path, settings, timeline=False):
+    header, records = load_trace(path)
+    start = time.perf_counter()
+    engine = FocusEngine(header["meta"].get("session", "default"), weights=settings["weights"],
+                         phone_penalty=settings["phone_penalty"], smoothing=settings["smoothing"],
+                         episode_settings=settings["episodes"])
+    cols = frame_flags(records, settings["ear_threshold"])
+    keys = [k for k in cols if k != "t"]
+    seconds = []
+    last_second = None
+    for i, t in enumerate(cols["t"]):
+        state = engine.update({k: cols[k][i] for k in keys}, t)
+        if timeline and int(t) != last_second:
+            last_second = int(t)
+            seconds.append((last_second, state["focus_score"], state["distractions"],
+                            int(cols["phone_detected"][i]), int(cols["eyes_closed"][i])))
+    end = cols["t"][-1] if cols["t"] else None
+    summary = engine.summary(end)
+    summary.update(trace=path, frames=len(records), rescore_seconds=round(time.perf_counter() - start, 3))
+    return summary, seconds
+
+
+def main():
+    args = parse_args()
+    episodes = dict(EPISODE_SETTINGS)
+    for kind, s in json.loads(args.episodes or "{}").items():
+        episodes[kind] = dict(episodes.get(kind, {}), **s)
+    settings = {"weights": parse_weights(args.weights), "phone_penalty": args.phone_penalty,
+                "smoothing": args.smoothing, "episodes": episodes, "ear_threshold": args.ear_threshold}
+
+    if args.timeline:
+        if len(args.traces) != 1:
+            print("❌ --timeline needs exactly one trace")
+            return
+        summary, seconds = rescore(args.traces[0], settings, timeline=True)
+        with open(args.timeline, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["second", "focus_score", "distractions", "phone", "eyes_closed"])
+            writer.writerows(seconds)
+        summaries = [summary]
+    else:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(args.traces)))) as pool:
+            summaries = [s for s, _ in pool.map(rescore, args.traces, [settings] * len(args.traces))]
+
+    print(f"{'trace':<40}{'frames':>9}{'minutes':>9}{'avg':>7}{'distr.':>7}{'phone s':>9}{'eyes s':>8}{'secs':>7}")
+    for s in summaries:
+        print(f"{os.path.basename(s['trace']):<40}{s['frames']:>9}{s['duration'] / 60:>9.1f}{s['average_focus'] or 0:>7.1f}"
+              f"{s['distractions']:>7}{s['phone_time']:>9.1f}{s['eyes_closed_time']:>8.1f}{s['rescore_seconds']:>7.2f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"settings": settings, "summaries": summaries}, f, indent=2)
+        print(f"💾 Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Accuracy-vs-latency sweep for the detector settings.
+
+    python sweep_detectors.py                                  # defaults below
+    python sweep_detectors.py --models models/pen_detectorv2.pt --imgsz 320 480 640 --conf 0.25 0.35 0.5
+
+For every model, backend (PyTorch plus whatever export_models.py produced)
+and input size, each dataset split is predicted once at a very low
+confidence and the raw predictions and median per-frame CPU latency are
+cached in sweep_cache/. Truth is the dataset labels, plus the .pt model's
+own detections for classes the dataset doesn't have (like export_models.py).
+
+Each (model, backend, imgsz) is one point: mAP@0.5 over the whole PR curve
+against latency. The confidence threshold doesn't change either (raising it
+only cuts the curve short), so it is chosen separately: every --conf value
+is scored from the cache with precision, recall and F1, and each point
+reports the threshold with the best F1. Adding thresholds costs no inference.
+
+The Pareto frontier (no other setting of the same model is both faster and
+more accurate) is printed per model and split, with the best-F1 threshold of
+each point, and saved with all points to sweep_results.json.
+"""
+import argparse
+import json
+import os
+import time
+
+from export_models import DEFAULT_MODELS, load_split_images, predict_all, build_truths, merge_truths
+from utils.detections import Detection, mean_average_precision, threshold_metrics
+from utils.inference_backend import BACKENDS, BACKEND_TORCH, backend_available, exported_path, model_key
+
+CACHE_DIR = "sweep_cache"
+RAW_CONF = 0.001  # low enough that every useful threshold can be applied afterwards
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sweep model / backend / imgsz / conf for mAP vs CPU latency")
+    parser.add_argument("--models", nargs="+", default=None)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=None,
+                        help="default: torch plus every exported backend whose runtime is installed")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 416, 512, 640])
+    parser.add_argument("--conf", nargs="+", type=float, default=[round(0.05 * i, 2) for i in range(1, 19)],
+                        help="thresholds scored for precision/recall/F1 (default 0.05 ... 0.9)")
+    parser.add_argument("--splits", nargs="+", default=["valid", "test"])
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N images of each split")
+    parser.add_argument("--truth-conf", type=float, default=0.35,
+                        help="confidence of the .pt detections used as truth for non-dataset models")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached predictions")
+    parser.add_argument("--out", default="sweep_results.json")
+    return parser.parse_args()
+
+
+# --- cached raw predictions --------------------------------------------------------------
+def _cache_path(model_path, backend, imgsz, split, limit):
+    suffix = f"_n{limit}" if limit else ""
+    return os.path.join(CACHE_DIR, f"{model_key(model_path)}_{backend}_{imgsz}_{split}{suffix}.json")
+
+
+def raw_predictions(model_path, backend, imgsz, split, images, limit, refresh=False):
+    """Returns {"names", "latency_ms", "predictions"} for one config, from the cache if possible."""
+    path = _cache_path(model_path, backend, imgsz, split, limit)
+    if not refresh and os.path.exists(path) and os.path.getmtime(path) >= _source_mtime(model_path, backend):
+        with open(path) as f:
+            entry = json.load(f)
+        if entry["images"] == [name for name, _, _ in images]:  # same split contents as when cached
+            entry["predictions"] = [[Detection(c, conf, tuple(box)) for c, conf, box in preds]
+                                    for preds in entry["predictions"]]
+            return entry
+
+    from ultralytics import YOLO
+
+    source = model_path if backend == BACKEND_TORCH else exported_path(model_path, backend)
+    model = YOLO(source) if backend == BACKEND_TORCH else YOLO(source, task="detect")
+    print(f"🔎 {model_key(model_path)} {backend} imgsz={imgsz} on {split} ({len(images)} images)")
+    predictions, latency = predict_all(model, images, imgsz, conf=RAW_CONF)
+    entry = {"names": list(model.names.values()), "latency_ms": latency, "images": [name for name, _, _ in images],
+             "created": time.time(), "predictions": predictions}
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(dict(entry, predictions=[[[d.cls_name, round(d.conf, 4), list(d.box)] for d in preds]
+                                           for preds in predictions]), f)
+    return entry
+
+
+def _source_mtime(model_path, backend):
+    """Re-run a config when its checkpoint or export changed after it was cached."""
+    path = model_path if backend == BACKEND_TORCH else exported_path(model_path, backend)
+    return os.path.getmtime(path) if os.path.exists(path) else 0
+
+
+def available_backends(model_path, requested):
+    backends = requested or BACKENDS
+    usable = []
+    for backend in backends:
+        if backend == BACKEND_TORCH:
+            usable.append(backend)
+        elif backend_available(backend) and os.path.exists(exported_path(model_path, backend)):
+            usable.append(backend)
+        elif requested:
+            print(f"⚠️ {model_key(model_path)} {backend}: not exported or runtime missing, skipped")
+    return usable
+
+
+# --- scoring -----------------------------------------------------------------------------
+def pareto_frontier(points):
+    """Points (dicts with latency_ms and map50) not beaten on both axes, fastest first."""
+    frontier = []
+    best_map = -1.0
+    for point in sorted(points, key=lambda p: (p["latency_ms"], -p["map50"])):
+        if point["map50"] > best_map:
+            frontier.append(point)
+            best_map = point["map50"]
+    return frontier
+
+
+def sweep_model(model_path, args):
+    results = []
+    backends = available_backends(model_path, args.backends)
+    for split in args.splits:
+        images = load_split_images(split, args.limit)
+        if not images:
+            print(f"⚠️ No images in {split}, skipped")
+            continue
+        # Truth comes from the labels, or from the .pt model at 640 for COCO-only models
+        reference = raw_predictions(model_path, BACKEND_TORCH, 640, split, images, args.limit, args.refresh)
+        checks = build_truths(reference["names"], images, reference["predictions"], args.truth_conf)
+        truths, truth_source = merge_truths(checks), "+".join(checks)
+
+        for backend in backends:
+            for imgsz in args.imgsz:
+                raw = raw_predictions(model_path, backend, imgsz, split, images, args.limit, args.refresh)
+                map50, per_class = mean_average_precision(raw["predictions"], truths)
+                thresholds = threshold_metrics(raw["predictions"], truths, args.conf)
+                best = max(thresholds, key=lambda row: row["f1"])
+                results.append({
+                    "model": model_key(model_path), "backend": backend, "imgsz": imgsz,
+                    "split": split, "map50": round(map50, 4), "latency_ms": raw["latency_ms"],
+                    "per_class": {name: round(ap, 4) for name, ap in per_class.items()},
+                    "best_conf": best["conf"], "best_f1": best["f1"], "thresholds": thresholds,
+                    "truth": truth_source,
+                })
+    return results
+
+
+def print_frontier(model, split, frontier):
+    print(f"\n🏁 {model} on {split}: Pareto frontier")
+    print(f"{'backend':<15}{'imgsz':>6}{'mAP50':>8}{'ms':>9}{'conf':>7}{'P':>7}{'R':>7}{'F1':>7}")
+    for p in frontier:
+        best = next(row for row in p["thresholds"] if row["conf"] == p["best_conf"])
+        print(f"{p['backend']:<15}{p['imgsz']:>6}{p['map50']:>8.4f}{p['latency_ms']:>9.2f}"
+              f"{best['conf']:>7.2f}{best['precision']:>7.3f}{best['recall']:>7.3f}{best['f1']:>7.3f}")
+
+
+def main():
+    args = parse_args()
+    models = args.models or [m for m in DEFAULT_MODELS if os.path.exists(m)]
+    if not models:
+        print("❌ No model checkpoints found")
+        return
+
+    points = []
+    for model_path in models:
+        points.extend(sweep_model(model_path, args))
+
+    frontiers = {}
+    for model in sorted({p["model"] for p in points}):
+        for split in args.splits:
+            group = [p for p in points if p["model"] == model and p["split"] == split and p["latency_ms"]]
+            if group:
+                frontiers[f"{model}/{split}"] = pareto_frontier(group)
+                print_frontier(model, split, frontiers[f"{model}/{split}"])
+
+    with open(args.out, "w") as f:
+        json.dump({"points": points, "frontiers": frontiers,
+                   "settings": {"imgsz": args.imgsz, "conf": args.conf, "splits": args.splits,
+                                "limit": args.limit, "raw_conf": RAW_CONF}}, f, indent=2)
+    print(f"\n💾 Saved {len(points)} points to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Build, train and check the fused phone + pen YOLO model used by
+modules/object_detector.py (--detector fused).
+
+    python train_fused_detector.py build  [--coco path/to/coco] [--coco-limit 3000]
+    python train_fused_detector.py train  [--epochs 60] [--imgsz 640]
+    python train_fused_detector.py parity [--out fused_parity_report.json]
+
+build   merges dataset/ (book, marker, pen, pencil) with COCO "cell phone"
+        images, and pseudo-labels phones in the pen images with yolov8n so
+        they aren't treated as phone-free negatives.
+train   fine-tunes yolov8n on the merged set and copies best.pt to
+        models/focus_objects.pt.
+parity  runs the fused model and the two separate models over dataset/valid
+        and compares per-image decisions, pen box precision/recall and latency.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import cv2
+
+from modules.object_detector import FUSED_CLASSES, FUSED_MODEL_PATH
+from utils.detections import parse_detections, is_pen, is_phone, box_iou
+from utils.dataset import (BACKEND_DIR, DATASET_DIR, DATASET_NAMES, list_images, label_path_for,
+                           read_labels, ground_truth)
+
+FUSED_DATASET_DIR = os.path.join(BACKEND_DIR, "fused_dataset")
+SPLITS = ("train", "valid", "test")
+PHONE_CLASS = FUSED_CLASSES.index("cell phone")
+COCO_PHONE_CLASS = 67
+# COCO classes that are also fused classes; their boxes are kept so they aren't negatives
+COCO_TO_FUSED = {COCO_PHONE_CLASS: PHONE_CLASS, 73: FUSED_CLASSES.index("book")}
+
+
+def write_labels(path, rows):
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(" ".join(str(v) for v in row) + "\n")
+
+
+# --- build -----------------------------------------------------------------------
+def pseudo_label_phones(teacher, image_path, conf=0.5):
+    """Phone boxes from the COCO teacher, as YOLO label rows for the fused class id."""
+    img = cv2.imread(image_path)
+    if img is None:
+        return []
+    h, w = img.shape[:2]
+    rows = []
+    for r in teacher(img, conf=conf, verbose=False):
+        for box in r.boxes:
+            if int(box.cls) != COCO_PHONE_CLASS:
+                continue
+            x1, y1, x2, y2 = (float(v) for v in box.xyxy[0])
+            rows.append([PHONE_CLASS, round((x1 + x2) / 2 / w, 6), round((y1 + y2) / 2 / h, 6),
+                         round((x2 - x1) / w, 6), round((y2 - y1) / h, 6)])
+    return rows
+
+
+def copy_pen_dataset(out_dir, teacher=None):
+    count = 0
+    for split in SPLITS:
+        src_images = os.path.join(DATASET_DIR, split, "images")
+        dst_images = os.path.join(out_dir, split, "images")
+        dst_labels = os.path.join(out_dir, split, "labels")
+        os.makedirs(dst_images, exist_ok=True)
+        os.makedirs(dst_labels, exist_ok=True)
+        for name in list_images(src_images):
+            src = os.path.join(src_images, name)
+            shutil.copy2(src, os.path.join(dst_images, name))
+            rows = read_labels(label_path_for(src_images, name))
+            if teacher is not None:
+                rows += pseudo_label_phones(teacher, src)
+            write_labels(os.path.join(dst_labels, os.path.splitext(name)[0] + ".txt"), rows)
+            count += 1
+    return count
+
+
+def copy_coco_phones(coco_dir, out_dir, limit):
+    """Copy COCO images that contain a cell phone, keeping the phone and book boxes."""
+    count = 0
+    for coco_split, split in (("train2017", "train"), ("val2017", "valid")):
+        src_images = os.path.join(coco_dir, "images", coco_split)
+        src_labels = os.path.join(coco_dir, "labels", coco_split)
+        split_limit = limit if split == "train" else max(1, limit // 10)
+        taken = 0
+        for name in list_images(src_images):
+            if taken >= split_limit:
+                break
+            rows = read_labels(os.path.join(src_labels, os.path.splitext(name)[0] + ".txt"))
+            if not any(int(row[0]) == COCO_PHONE_CLASS for row in rows):
+                continue
+            kept = [[COCO_TO_FUSED[int(row[0])]] + row[1:] for row in rows if int(row[0]) in COCO_TO_FUSED]
+            shutil.copy2(os.path.join(src_images, name), os.path.join(out_dir, split, "images", "coco_" + name))
+            write_labels(os.path.join(out_dir, split, "labels", "coco_" + os.path.splitext(name)[0] + ".txt"), kept)
+            taken += 1
+        count += taken
+    return count
+
+
+def write_data_yaml(out_dir):
+    path = os.path.join(out_dir, "data.yaml")
+    with open(path, "w") as f:
+        f.write(f"path: {os.path.abspath(out_dir)}\n")
+        f.write("train: train/images\nval: valid/images\ntest: test/images\n\n")
+        f.write(f"nc: {len(FUSED_CLASSES)}\n")
+        f.write(f"names: {FUSED_CLASSES}\n")
+    return path
+
+
+def build(args):
+    from ultralytics import YOLO
+
+    teacher = None if args.no_pseudo_label else YOLO(args.teacher)
+    n_pen = copy_pen_dataset(args.out_dir, teacher)
+    n_coco = copy_coco_phones(args.coco, args.out_dir, args.coco_limit) if args.coco else 0
+    yaml_path = write_data_yaml(args.out_dir)
+    print(f"✅ Fused dataset: {n_pen} pen images + {n_coco} COCO phone images -> {yaml_path}")
+    if not args.coco:
+        print("⚠️ No --coco given: phone examples only come from pseudo-labels")
+
+
+# --- train -----------------------------------------------------------------------
+def train(args):
+    from ultralytics import YOLO
+
+    yaml_path = os.path.join(args.out_dir, "data.yaml")
+    if not os.path.exists(yaml_path):
+        print(f"❌ {yaml_path} not found, run 'build' first")
+        return
+    model = YOLO(args.base)
+    model.train(data=yaml_path, epochs=args.epochs, imgsz=args.imgsz,
+                project=os.path.join(BACKEND_DIR, "runs", "detect"), name="focus_objects", exist_ok=True)
+    best = os.path.join(BACKEND_DIR, "runs", "detect", "focus_objects", "weights", "best.pt")
+    os.makedirs(os.path.dirname(args.model), exist_ok=True)
+    shutil.copy2(best, args.model)
+    print(f"✅ Fused model saved to {args.model}")
+
+
+# --- parity ----------------------------------------------------------------------
+def ground_truth_pens(label_file, names, w, h):
+    return [box for cls_name, box in ground_truth(label_file, names, w, h) if is_pen(cls_name)]
+
+
+def match_boxes(pred, truth, threshold=0.5):
+    """Greedy IoU matching -> (true positives, false positives, false negatives)."""
+    unmatched = list(truth)
+    tp = 0
+    for box in pred:
+        best = max(unmatched, key=lambda t: box_iou(box, t), default=None)
+        if best is not None and box_iou(box, best) >= threshold:
+            unmatched.remove(best)
+            tp += 1
+    return tp, len(pred) - tp, len(unmatched)
+
+
+def run_model(model, frame, conf):
+    start = time.perf_counter()
+    results = model(frame, conf=conf, verbose=False)
+    elapsed = time.perf_counter() - start
+    return parse_detections(results, model.names), elapsed
+
+
+def summarize(stats, n):
+    tp, fp, fn = stats["tp"], stats["fp"], stats["fn"]
+    return {
+        "pen_precision": round(tp / (tp + fp), 4) if tp + fp else None,
+        "pen_recall": round(tp / (tp + fn), 4) if tp + fn else None,
+        "phone_images": stats["phone_images"],
+        "mean_latency_ms": round(1000 * stats["time"] / n, 2) if n else None,
+    }
+
+
+def phone_boxes(detections):
+    # Same size filter as PhoneDetector.handle_detections
+    return [d for d in detections if is_phone(d.cls_name)
+            and not (d.box[2] - d.box[0] < 80 and d.box[3] - d.box[1] < 80)]
+
+
+def parity(args):
+    from ultralytics import YOLO
+
+    if not os.path.exists(args.model):
+        print(f"❌ Fused model {args.model} not found, run 'train' first")
+        return
+
+    fused = YOLO(args.model)
+    phone_model = YOLO(args.phone_model)
+    pen_model = YOLO(args.pen_model)
+    dataset_names = DATASET_NAMES
+
+    images_dir = os.path.join(DATASET_DIR, "valid", "images")
+    separate = {"tp": 0, "fp": 0, "fn": 0, "phone_images": 0, "time": 0.0}
+    fused_stats = {"tp": 0, "fp": 0, "fn": 0, "phone_images": 0, "time": 0.0}
+    agree_pen = agree_phone = n = 0
+
+    for name in list_images(images_dir):
+        frame = cv2.imread(os.path.join(images_dir, name))
+        if frame is None:
+            continue
+        h, w = frame.shape[:2]
+        truth = ground_truth_pens(label_path_for(images_dir, name), dataset_names, w, h)
+
+        phone_dets, t_phone = run_model(phone_model, frame, args.conf)
+        pen_dets, t_pen = run_model(pen_model, frame, args.conf)
+        fused_dets, t_fused = run_model(fused, frame, args.conf)
+        separate["time"] += t_phone + t_pen
+        fused_stats["time"] += t_fused
+
+        for stats, pens, phones in ((separate, pen_dets, phone_dets), (fused_stats, fused_dets, fused_dets)):
+            pen_pred = [d.box for d in pens if is_pen(d.cls_name)]
+            tp, fp, fn = match_boxes(pen_pred, truth)
+            stats["tp"] += tp
+            stats["fp"] += fp
+            stats["fn"] += fn
+            stats["phone_images"] += bool(phone_boxes(phones))
+
+        agree_pen += any(is_pen(d.cls_name) for d in pen_dets) == any(is_pen(d.cls_name) for d in fused_dets)
+        agree_phone += bool(phone_boxes(phone_dets)) == bool(phone_boxes(fused_dets))
+        n += 1
+
+    report = {
+        "images": n,
+        "conf": args.conf,
+        "separate": summarize(separate, n),
+        "fused": summarize(fused_stats, n),
+        "pen_decision_agreement": round(agree_pen / n, 4) if n else None,
+        "phone_decision_agreement": round(agree_phone / n, 4) if n else None,
+    }
+    if separate["time"]:
+        report["speedup"] = round(separate["time"] / fused_stats["time"], 2)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"✅ Parity report written to {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fused phone + pen detector")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="merge dataset/ with COCO phones")
+    p.add_argument("--coco", default=None, help="YOLO-format COCO root (images/train2017, labels/train2017)")
+    p.add_argument("--coco-limit", type=int, default=3000, help="max COCO phone images for train")
+    p.add_argument("--teacher", default="models/yolov8n.pt", help="COCO model used to pseudo-label phones")
+    p.add_argument("--no-pseudo-label", action="store_true")
+    p.add_argument("--out-dir", default=FUSED_DATASET_DIR)
+    p.set_defaults(func=build)
+
+    p = sub.add_parser("train", help="train the fused model")
+    p.add_argument("--base", default="models/yolov8n.pt")
+    p.add_argument("--epochs", type=int, default=60)
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--out-dir", default=FUSED_DATASET_DIR)
+    p.add_argument("--model", default=FUSED_MODEL_PATH)
+    p.set_defaults(func=train)
+
+    p = sub.add_parser("parity", help="compare fused vs separate models on dataset/valid")
+    p.add_argument("--model", default=FUSED_MODEL_PATH)
+    p.add_argument("--phone-model", default="models/yolov8n.pt")
+    p.add_argument("--pen-model", default="models/pen_detectorv2.pt")
+    p.add_argument("--conf", type=float, default=0.35)
+    p.add_argument("--out", default="fused_parity_report.json")
+    p.set_defaults(func=parity)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
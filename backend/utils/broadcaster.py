@@ -0,0 +1,145 @@
+import threading
+import time
+
+import cv2
+
+from utils.timing import timed
+
+# Named stream tiers: (JPEG quality, output width or None for full size)
+STREAM_TIERS = {
+    "high": (90, None),
+    "medium": (75, 640),
+    "low": (50, 320),
+}
+
+
+class FrameBroadcaster:
+    """
+    Fan-out for one camera's annotated frames. The worker publishes raw
+    frames (cheap: just a reference and a sequence number); JPEG encoding
+    only happens when a subscriber asks for a frame, once per frame and
+    tier no matter how many clients share that tier. Clients always get the
+    newest frame, so a slow client skips frames instead of queueing them.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._closed = False
+        self._encoded = {}       # (quality, width) -> (seq, jpeg bytes)
+        self._encode_locks = {}  # (quality, width) -> Lock
+        self.subscribers = 0
+        self.published = 0
+        self.encoded = 0
+
+    def publish(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self.published += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def subscribe(self, fps=None, quality=None, width=None, tier=None):
+        """Returns a Subscriber; iterate it for JPEG bytes."""
+        tier_quality, tier_width = STREAM_TIERS.get(tier, STREAM_TIERS["high"])
+        return Subscriber(self, fps=fps, quality=quality or tier_quality, width=width or tier_width)
+
+    def wait(self, after_seq, timeout=1.0):
+        """Block until a frame newer than `after_seq` exists; returns (seq, frame) or (None, None)."""
+        with self._cond:
+            if self._seq <= after_seq and not self._closed:
+                self._cond.wait(timeout)
+            if self._seq <= after_seq or self._frame is None:
+                return None, None
+            return self._seq, self._frame
+
+    def jpeg(self, seq, frame, quality, width):
+        """JPEG for this frame and tier, encoded at most once."""
+        key = (quality, width)
+        cached = self._encoded.get(key)
+        if cached is not None and cached[0] >= seq:
+            return cached[1]
+
+        lock = self._encode_locks.setdefault(key, threading.Lock())
+        with lock:
+            cached = self._encoded.get(key)
+            if cached is not None and cached[0] >= seq:
+                return cached[1]
+            with timed("jpeg_encode"):
+                if width and frame.shape[1] > width:
+                    height = int(frame.shape[0] * width / frame.shape[1])
+                    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            if not ok:
+                return None
+            data = buf.tobytes()
+            self._encoded[key] = (seq, data)
+            self.encoded += 1
+            return data
+
+    def stats(self):
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "encoded": self.encoded,
+            "tiers": len(self._encoded),
+        }
+
+
+class Subscriber:
+    """One client's view of a FrameBroadcaster, with its own FPS cap and tier."""
+
+    def __init__(self, broadcaster, fps=None, quality=90, width=None):
+        self.broadcaster = broadcaster
+        self.interval = 1.0 / fps if fps else 0
+        self.quality = quality
+        self.width = width
+        self.last_seq = 0
+        self.sent = 0
+        self.skipped = 0
+        self._next_time = 0
+        with broadcaster._cond:
+            broadcaster.subscribers += 1
+        self._active = True
+
+    def __iter__(self):
+        try:
+            while not self.broadcaster.closed:
+                jpeg = self.next_jpeg()
+                if jpeg is not None:
+                    yield jpeg
+        finally:
+            self.close()
+
+    def next_jpeg(self, timeout=1.0):
+        """Newest frame's JPEG once the FPS cap allows it; None on timeout."""
+        delay = self._next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        seq, frame = self.broadcaster.wait(self.last_seq, timeout)
+        if seq is None:
+            return None
+        if self.last_seq:
+            self.skipped += seq - self.last_seq - 1
+        self.last_seq = seq
+        jpeg = self.broadcaster.jpeg(seq, frame, self.quality, self.width)
+        if jpeg is not None:
+            self.sent += 1
+            self._next_time = time.monotonic() + self.interval
+        return jpeg
+
+    def close(self):
+        if self._active:
+            self._active = False
+            with self.broadcaster._cond:
+                self.broadcaster.subscribers -= 1
@@ -0,0 +1,39 @@
+"""Helpers for the YOLO-format dataset in ../dataset (images/ + labels/ per split)."""
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_DIR = os.path.join(BACKEND_DIR, "..", "dataset")
+DATASET_NAMES = ["book", "marker", "pen", "pencil"]  # class order of dataset/data.yaml
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def split_images_dir(split, dataset_dir=DATASET_DIR):
+    return os.path.join(dataset_dir, split, "images")
+
+
+def list_images(folder):
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def label_path_for(images_dir, image_name):
+    labels_dir = os.path.join(os.path.dirname(images_dir), "labels")
+    return os.path.join(labels_dir, os.path.splitext(image_name)[0] + ".txt")
+
+
+def read_labels(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def ground_truth(label_file, names, w, h):
+    """Labels of one image as [(class name, (x1, y1, x2, y2) in pixels)]."""
+    boxes = []
+    for row in read_labels(label_file):
+        cx, cy, bw, bh = (float(v) for v in row[1:5])
+        boxes.append((names[int(row[0])], (int((cx - bw / 2) * w), int((cy - bh / 2) * h),
+                                           int((cx + bw / 2) * w), int((cy + bh / 2) * h))))
+    return boxes
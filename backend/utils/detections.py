@@ -0,0 +1,156 @@
+from collections import namedtuple
+
+import numpy as np
+
+from utils.roi import round_up_imgsz
+
+# One detected object: class name, confidence and (x1, y1, x2, y2) in frame pixels
+Detection = namedtuple("Detection", ["cls_name", "conf", "box"])
+
+
+def parse_detections(results, names):
+    """Flatten ultralytics results into a list of Detection tuples."""
+    detections = []
+    for r in results:
+        for box in r.boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            detections.append(Detection(names[int(box.cls)], float(box.conf), (x1, y1, x2, y2)))
+    return detections
+
+
+def offset_detections(detections, dx, dy):
+    """Shift detections from crop coordinates back into frame coordinates."""
+    return [Detection(d.cls_name, d.conf, (d.box[0] + dx, d.box[1] + dy, d.box[2] + dx, d.box[3] + dy))
+            for d in detections]
+
+
+def run_detector(model, frame, conf, roi=None, max_imgsz=1280):
+    """
+    Run a YOLO model on the full frame, or only on an (x1, y1, x2, y2) region
+    at its native resolution. Boxes always come back in frame coordinates.
+    """
+    if roi is None:
+        return parse_detections(model(frame, conf=conf, verbose=False), model.names)
+    x1, y1, x2, y2 = roi
+    crop = frame[y1:y2, x1:x2]
+    imgsz = round_up_imgsz(x2 - x1, y2 - y1, max_imgsz)
+    results = model(crop, conf=conf, imgsz=imgsz, verbose=False)
+    return offset_detections(parse_detections(results, model.names), x1, y1)
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def box_ious(a, b):
+    """IoU of every box in `a` (N, 4) with every box in `b` (M, 4) -> array (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(1, -1, 4)
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    union = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1]) + (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1]) - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def average_precision(predictions, truths, cls_name, iou_threshold=0.5):
+    """
+    AP of one class over a set of images (all-point interpolation).
+    predictions: per image, a list of Detection; truths: per image, a list of (cls_name, box).
+    """
+    scored = []
+    gt = []
+    for i, (preds, truth) in enumerate(zip(predictions, truths)):
+        gt.append([box for name, box in truth if name == cls_name])
+        scored.extend((d.conf, i, d.box) for d in preds if d.cls_name == cls_name)
+    n_gt = sum(len(boxes) for boxes in gt)
+    if n_gt == 0:
+        return None
+    scored.sort(key=lambda item: -item[0])
+
+    used = [set() for _ in gt]
+    tp = 0
+    precisions, recalls = [], []
+    for rank, (_, i, box) in enumerate(scored, start=1):
+        best, best_iou = None, iou_threshold
+        for j, truth_box in enumerate(gt[i]):
+            if j not in used[i]:
+                overlap = box_iou(box, truth_box)
+                if overlap >= best_iou:
+                    best, best_iou = j, overlap
+        if best is not None:
+            used[i].add(best)
+            tp += 1
+        precisions.append(tp / rank)
+        recalls.append(tp / n_gt)
+
+    # Area under the precision envelope
+    ap, prev_recall = 0.0, 0.0
+    for k in range(len(precisions)):
+        if recalls[k] > prev_recall:
+            ap += (recalls[k] - prev_recall) * max(precisions[k:])
+            prev_recall = recalls[k]
+    return ap
+
+
+def mean_average_precision(predictions, truths, iou_threshold=0.5):
+    """mAP over every class that has ground truth; also returns per-class APs."""
+    classes = sorted({name for truth in truths for name, _ in truth})
+    per_class = {name: average_precision(predictions, truths, name, iou_threshold) for name in classes}
+    per_class = {name: ap for name, ap in per_class.items() if ap is not None}
+    return (sum(per_class.values()) / len(per_class) if per_class else 0.0), per_class
+
+
+def match_predictions(predictions, truths, iou_threshold=0.5):
+    """
+    Greedy matching of every prediction to the truth boxes of its class,
+    highest confidence first (as in average_precision), over the classes that
+    have ground truth. Returns (confidences, is_tp, number of truth boxes);
+    since a match only depends on higher-confidence predictions, the result
+    holds for every confidence threshold.
+    """
+    classes = {name for truth in truths for name, _ in truth}
+    confs, hits = [], []
+    for preds, truth in zip(predictions, truths):
+        used = set()
+        for d in sorted((d for d in preds if d.cls_name in classes), key=lambda d: -d.conf):
+            best, best_iou = None, iou_threshold
+            for j, (name, box) in enumerate(truth):
+                if j not in used and name == d.cls_name:
+                    overlap = box_iou(d.box, box)
+                    if overlap >= best_iou:
+                        best, best_iou = j, overlap
+            if best is not None:
+                used.add(best)
+            confs.append(d.conf)
+            hits.append(best is not None)
+    return np.array(confs, dtype=np.float32), np.array(hits, dtype=bool), sum(len(t) for t in truths)
+
+
+def threshold_metrics(predictions, truths, thresholds, iou_threshold=0.5):
+    """Precision, recall and F1 (over all classes) at each confidence threshold."""
+    confs, hits, n_gt = match_predictions(predictions, truths, iou_threshold)
+    rows = []
+    for conf in thresholds:
+        kept = confs >= conf
+        tp = int(hits[kept].sum())
+        fp = int(kept.sum()) - tp
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / n_gt if n_gt else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        rows.append({"conf": conf, "precision": round(precision, 4), "recall": round(recall, 4),
+                     "f1": round(f1, 4), "tp": tp, "fp": fp, "fn": n_gt - tp})
+    return rows
+
+
+def is_phone(cls_name):
+    name = cls_name.lower()
+    return "cell phone" in name or "mobile" in name
+
+
+def is_pen(cls_name):
+    return "pen" in cls_name.lower()
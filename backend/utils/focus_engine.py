@@ -0,0 +1,260 @@
+"""
+Streaming focus scoring shared by main.py and the server's CameraWorker.
+
+FocusEngine.update(detections) is called once per frame with the
+FrameAnalyzer result and returns the state to publish. Per frame it
+- scores the frame (calculate_focus_score, plus the phone penalty) and
+  smooths it with the same 0.85/0.15 EMA as before
+- turns the raw flags into debounced episodes: a phone, closed eyes,
+  looking away or pen inactivity has to last `start` seconds to open an episode, and be gone
+  for `end` seconds to close it. Distractions count phone episodes, not
+  frames, and history events are written once per episode
+- adds the frame's duration to rolling 1/5/30 minute windows (average
+  focus, seconds on the phone, with eyes closed and looking away)
+
+Everything is constant time and memory per frame: the windows are rings of
+60 buckets with running totals, and only the last `keep_episodes` finished
+episodes are kept.
+"""
+import time
+from collections import deque
+
+from utils.focus_score import calculate_focus_score
+
+PHONE_PENALTY = 20
+SMOOTHING = 0.15  # weight of the new frame in the score EMA
+MAX_FRAME_GAP = 1.0  # longer gaps between frames (stalls, pauses) count as this many seconds
+INACTIVITY_IDLE_SECONDS = 300
+
+# seconds a condition must hold to start an episode / be gone to end it
+EPISODE_SETTINGS = {
+    "mobile": dict(start=1.0, end=2.0),
+    "drowsy": dict(start=1.5, end=1.0),
+    "looking_away": dict(start=3.0, end=1.0),
+    "inactivity": dict(start=0.0, end=5.0),
+}
+
+WINDOWS = {"1m": 60, "5m": 300, "30m": 1800}
+
+# Indexes into the per-bucket sums
+_SECONDS, _SCORE, _PHONE, _EYES_CLOSED, _LOOKING_AWAY = range(5)
+
+
+class Episode:
+    __slots__ = ("kind", "start", "end")
+
+    def __init__(self, kind, start, end=None):
+        self.kind = kind
+        self.start = start
+        self.end = end
+
+    def duration(self, now=None):
+        return (self.end if self.end is not None else now) - self.start
+
+    def as_dict(self, now=None):
+        return {"kind": self.kind, "start": self.start, "end": self.end,
+                "duration": round(self.duration(now), 2)}
+
+
+class EpisodeTracker:
+    """
+    Debounces one on/off condition into episodes (start, end, duration).
+    Dropouts shorter than `gap` (detector flicker) don't restart the start timer.
+    """
+
+    def __init__(self, kind, start=1.0, end=1.0, gap=0.5):
+        self.kind = kind
+        self.start_after = start
+        self.end_after = end
+        self.gap = gap
+        self.current = None  # open Episode
+        self._on_since = None
+        self._last_on = None
+
+    def update(self, on, now):
+        """Returns ("started" | "ended", Episode) when an episode opens or closes, else None."""
+        if on:
+            if self._on_since is None or now - self._last_on > self.gap:
+                self._on_since = now
+            self._last_on = now
+            if self.current is None and now - self._on_since >= self.start_after:
+                self.current = Episode(self.kind, self._on_since)
+                return "started", self.current
+            return None
+
+        if self.current is not None and now - self._last_on >= self.end_after:
+            episode, self.current = self.current, None
+            episode.end = self._last_on
+            return "ended", episode
+        return None
+
+
+class RollingWindow:
+    """Time-weighted sums over the last `seconds`, kept in a ring of `buckets` slots."""
+
+    def __init__(self, seconds, buckets=60, fields=5):
+        self.seconds = seconds
+        self.bucket_seconds = seconds / float(buckets)
+        self.slots = [[0.0] * fields for _ in range(buckets)]
+        self.totals = [0.0] * fields
+        self._index = None  # absolute bucket number of the newest slot
+
+    def add(self, now, values):
+        index = int(now // self.bucket_seconds)
+        if self._index is None:
+            self._index = index
+        elif index > self._index:
+            # Evict the slots we moved past (at most the whole ring)
+            for step in range(1, min(index - self._index, len(self.slots)) + 1):
+                slot = self.slots[(self._index + step) % len(self.slots)]
+                for i, v in enumerate(slot):
+                    self.totals[i] -= v
+                    slot[i] = 0.0
+            self._index = index
+        slot = self.slots[self._index % len(self.slots)]
+        for i, v in enumerate(values):
+            slot[i] += v
+            self.totals[i] += v
+
+    def summary(self):
+        seconds = max(0.0, self.totals[_SECONDS])
+        return {
+            "focus": round(self.totals[_SCORE] / seconds, 1) if seconds > 0 else None,
+            "phone_s": round(max(0.0, self.totals[_PHONE]), 1),
+            "eyes_closed_s": round(max(0.0, self.totals[_EYES_CLOSED]), 1),
+            "looking_away_s": round(max(0.0, self.totals[_LOOKING_AWAY]), 1),
+            "tracked_s": round(seconds, 1),
+        }
+
+
+class FocusEngine:
+    def __init__(self, session_id="default", history=None, alert=None, log=None, log_interval=1.0,
+                 episode_settings=None, windows=None, keep_episodes=100, weights=None,
+                 phone_penalty=PHONE_PENALTY, smoothing=SMOOTHING):
+        """
+        history: optional FocusHistory; every frame becomes a sample and every
+        episode start an event, tagged with this engine's run (its start time).
+        alert: optional callable(reason), called on every frame a raw flag is
+        on (the alert dispatcher does its own debouncing).
+        log: optional log_focus_data-style callable, called every `log_interval` seconds.
+        weights / phone_penalty / smoothing: scoring knobs (defaults match the live app),
+        mostly for re-scoring recorded traces.
+        """
+        self.session_id = session_id
+        self.history = history
+        self.alert = alert
+        self.log = log
+        self.log_interval = log_interval
+        self.weights = weights
+        self.phone_penalty = phone_penalty
+        self.smoothing = smoothing
+        settings = episode_settings or EPISODE_SETTINGS
+        self.episodes = {kind: EpisodeTracker(kind, **s) for kind, s in settings.items()}
+        self.windows = {name: RollingWindow(seconds) for name, seconds in (windows or WINDOWS).items()}
+        self.finished = deque(maxlen=keep_episodes)
+        self.counts = {kind: 0 for kind in self.episodes}
+        self.smooth_score = 100
+        self.phone_time = 0.0
+        self.eyes_closed_time = 0.0
+        self.looking_away_time = 0.0
+        self.tracked_time = 0.0
+        self._score_time = 0.0  # smoothed score integrated over time, for the session average
+        self.started_at = None
+        self._last_time = None
+        self._last_log = 0
+
+    @property
+    def distractions(self):
+        return self.counts.get("mobile", 0)
+
+    def update(self, d, now=None):
+        """d: FrameAnalyzer result dict. Returns the focus state to publish."""
+        now = time.time() if now is None else now
+        if self.started_at is None:
+            self.started_at = now
+        dt = min(MAX_FRAME_GAP, now - self._last_time) if self._last_time is not None else 0.0
+        self._last_time = now
+
+        phone, eyes_closed = d["phone_detected"], d["eyes_closed"]
+        # Without a face the trackers report looking away too; that is already no_face
+        looking_away = d["face_detected"] and d.get("looking_away", False)
+        inactive = d["pen_detected"] and d.get("idle_time", 0) > INACTIVITY_IDLE_SECONDS
+
+        score = calculate_focus_score(d["face_detected"], eyes_closed, phone, d["pen_detected"], self.weights,
+                                      looking_away=looking_away)
+        if phone:
+            score -= self.phone_penalty
+        self.smooth_score = (1 - self.smoothing) * self.smooth_score + self.smoothing * score
+        self.smooth_score = max(0, min(100, self.smooth_score))
+        focus_score = round(self.smooth_score, 1)
+
+        flags = {"mobile": phone, "drowsy": eyes_closed, "looking_away": looking_away, "inactivity": inactive}
+        for kind, on in flags.items():
+            if on and self.alert is not None:
+                try:
+                    self.alert(kind)
+                except Exception:
+                    pass
+            tracker = self.episodes.get(kind)
+            change = tracker.update(on, now) if tracker is not None else None
+            if change is None:
+                continue
+            what, episode = change
+            if what == "started":
+                self.counts[kind] += 1
+                if self.history is not None:
+                    self.history.event(self.session_id, episode.start, kind, run=self.started_at)
+            else:
+                self.finished.append(episode)
+
+        self.tracked_time += dt
+        self._score_time += self.smooth_score * dt
+        if phone:
+            self.phone_time += dt
+        if eyes_closed:
+            self.eyes_closed_time += dt
+        if looking_away:
+            self.looking_away_time += dt
+        values = (dt, self.smooth_score * dt, dt if phone else 0.0, dt if eyes_closed else 0.0,
+                  dt if looking_away else 0.0)
+        for window in self.windows.values():
+            window.add(now, values)
+
+        if self.history is not None:
+            self.history.record(self.session_id, now, focus_score, d["face_detected"], eyes_closed,
+                                phone, d["pen_detected"], d["moving"], run=self.started_at)
+        if self.log is not None and now - self._last_log >= self.log_interval:
+            try:
+                self.log(focus_score, d["face_detected"], eyes_closed, phone, d["pen_detected"], d["moving"])
+            except Exception:
+                pass
+            self._last_log = now
+
+        return {
+            "focus_score": focus_score,
+            "distractions": self.distractions,
+            "active": True,
+            "timestamp": now,
+            "phone_time": round(self.phone_time, 1),
+            "eyes_closed_time": round(self.eyes_closed_time, 1),
+            "looking_away_time": round(self.looking_away_time, 1),
+            "episodes": {kind: t.current is not None for kind, t in self.episodes.items()},
+            "windows": {name: w.summary() for name, w in self.windows.items()},
+        }
+
+    def summary(self, now=None):
+        """Session totals and recent episodes (for reports and the final state)."""
+        now = time.time() if now is None else now
+        return {
+            "duration": round(now - self.started_at, 1) if self.started_at is not None else 0.0,
+            "focus_score": round(self.smooth_score, 1),
+            "average_focus": round(self._score_time / self.tracked_time, 1) if self.tracked_time else None,
+            "distractions": self.distractions,
+            "episode_counts": dict(self.counts),
+            "phone_time": round(self.phone_time, 1),
+            "eyes_closed_time": round(self.eyes_closed_time, 1),
+            "looking_away_time": round(self.looking_away_time, 1),
+            "open_episodes": [t.current.as_dict(now) for t in self.episodes.values() if t.current is not None],
+            "recent_episodes": [e.as_dict() for e in self.finished],
+            "windows": {name: w.summary() for name, w in self.windows.items()},
+        }
@@ -1,13 +1,21 @@
-def calculate_focus_score(face_detected, eyes_closed, mobile_detected, pen_detected):
+# Points taken off a perfect 100 for each condition
+DEFAULT_WEIGHTS = {"no_face": 40, "eyes_closed": 30, "looking_away": 15, "phone": 20, "no_pen": 10}
+
+
+def calculate_focus_score(face_detected, eyes_closed, mobile_detected, pen_detected, weights=None,
+                          looking_away=False):
+    w = weights or DEFAULT_WEIGHTS
     score = 100
 
     if not face_detected:
-        score -= 40
+        score -= w["no_face"]
+    elif looking_away:
+        score -= w.get("looking_away", 0)  # no face already costs no_face
     if eyes_closed:
-        score -= 30
+        score -= w["eyes_closed"]
     if mobile_detected:
-        score -= 20
+        score -= w["phone"]
     if not pen_detected:
-        score -= 10
+        score -= w["no_pen"]
 
     return max(0, min(100, score))
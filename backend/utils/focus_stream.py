@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+
+
+class FocusChannel:
+    """
+    Latest focus state of one session, with a version number so readers can
+    wait for changes. Publishing replaces the state instead of queueing it,
+    so a slow reader only ever sees the newest values.
+    """
+
+    def __init__(self, initial=None):
+        self._cond = threading.Condition()
+        self._state = dict(initial or {})
+        self._seq = 0
+        self._closed = False
+
+    def publish(self, state):
+        with self._cond:
+            self._state = state
+            self._seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def latest(self):
+        return self._state
+
+    def wait(self, after_seq, timeout=1.0):
+        """Returns (seq, state) once newer than `after_seq`, or (None, None) on timeout/close."""
+        with self._cond:
+            if self._seq <= after_seq and not self._closed:
+                self._cond.wait(timeout)
+            if self._seq <= after_seq:
+                return None, None
+            return self._seq, self._state
+
+    def deltas(self, max_rate=None, keepalive=15.0):
+        """
+        Yields only the keys that changed since this reader's previous update
+        (the first update is the full state), at most `max_rate` times per
+        second. Yields None every `keepalive` seconds without changes.
+        """
+        interval = 1.0 / max_rate if max_rate else 0
+        sent = {}
+        last_seq = 0
+        last_yield = time.monotonic()
+        while not self._closed:
+            seq, state = self.wait(last_seq)
+            if seq is None:
+                if time.monotonic() - last_yield >= keepalive:
+                    last_yield = time.monotonic()
+                    yield None
+                continue
+            last_seq = seq
+            delta = {k: v for k, v in state.items() if sent.get(k, object()) != v}
+            if delta:
+                sent.update(delta)
+                last_yield = time.monotonic()
+                yield delta
+            if interval:
+                time.sleep(interval)  # later updates coalesce while we sleep
+
+
+class SnapshotWriter(threading.Thread):
+    """
+    Mirrors a FocusChannel to a JSON file every `interval` seconds from its
+    own thread, so file I/O stays out of the frame loop. Writes go through a
+    temp file + rename so readers never see a half-written file.
+    """
+
+    def __init__(self, channel, path, interval=1.0):
+        super().__init__(daemon=True, name="SnapshotWriter")
+        self.channel = channel
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._written_seq = 0
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.channel.seq != self._written_seq:
+                self._written_seq = self.channel.seq
+                self.write(self.channel.latest())
+
+    def write(self, state):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("⚠️ Could not write focus snapshot:", e)
+
+    def stop(self, final_state=None):
+        """Stops the thread; writes `final_state` (or the latest state) one last time."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=2)
+        self.write(final_state if final_state is not None else self.channel.latest())
+
+
+def snapshot_enabled():
+    return os.environ.get("FOCUS_SNAPSHOT", "1") != "0"
@@ -0,0 +1,283 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Pacing modes
+PACING_REALTIME = "realtime"  # play back at the source's native rate
+PACING_FAST = "fast"          # hand out frames as fast as the consumer asks
+PACING_FIXED = "fixed"        # hand out frames at a fixed `fps`
+PACING_MODES = (PACING_REALTIME, PACING_FAST, PACING_FIXED)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    """
+    Base class for everything the detector loop can read frames from.
+    read() mirrors cv2.VideoCapture.read() so it drops into existing loops.
+    """
+
+    def __init__(self, pacing=PACING_REALTIME, fps=None):
+        if pacing not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode: {pacing} (expected one of {PACING_MODES})")
+        if pacing == PACING_FIXED and not fps:
+            raise ValueError("Fixed pacing needs an fps value")
+        self.pacing = pacing
+        self.fps = fps
+        self.frame_index = -1
+        self.timestamp = None  # media time (seconds) of the last frame
+        self.exhausted = False  # True once a finite source has no frames left
+        self._next_due = None
+
+    # --- to be implemented by sources ---
+    def open(self):
+        return True
+
+    def _read_raw(self):
+        raise NotImplementedError
+
+    def native_fps(self):
+        return None
+
+    def release(self):
+        pass
+
+    # --- shared logic ---
+    def isOpened(self):
+        return self.open()
+
+    def _frame_interval(self):
+        if self.pacing == PACING_FAST:
+            return 0
+        if self.pacing == PACING_FIXED:
+            return 1.0 / self.fps
+        fps = self.native_fps() or self.fps
+        return 1.0 / fps if fps else 0
+
+    def _wait_for_slot(self):
+        interval = self._frame_interval()
+        if interval <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_due is None:
+            self._next_due = now
+        delay = self._next_due - now
+        if delay > 0:
+            time.sleep(delay)
+        # Don't try to "catch up" after a slow consumer, just keep the cadence
+        self._next_due = max(self._next_due, now) + interval
+
+    def read(self):
+        if self.exhausted:
+            return False, None
+        self._wait_for_slot()
+        ret, frame = self._read_raw()
+        if not ret:
+            return False, None
+        self.frame_index += 1
+        # Offline sources get a media clock so replays are reproducible
+        fps = self.native_fps() or self.fps
+        if fps:
+            self.timestamp = self.frame_index / fps
+        else:
+            self.timestamp = time.time()
+        return True, frame
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                if self.exhausted:
+                    return
+                continue
+            yield frame
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class WebcamSource(FrameSource):
+    def __init__(self, index=0, width=None, height=None, pacing=PACING_REALTIME, fps=None):
+        super().__init__(pacing=pacing, fps=fps)
+        self.index = index
+        self.width = width
+        self.height = height
+        self.cap = None
+
+    def open(self):
+        if self.cap is None:
+            self.cap = cv2.VideoCapture(self.index)
+            if self.width:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            if self.height:
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return self.cap.isOpened()
+
+    def _frame_interval(self):
+        # A live camera already blocks until the next frame arrives
+        if self.pacing == PACING_REALTIME:
+            return 0
+        return super()._frame_interval()
+
+    def _read_raw(self):
+        if self.cap is None and not self.open():
+            return False, None
+        return self.cap.read()
+
+    def read(self):
+        ret, frame = super().read()
+        if ret:
+            self.timestamp = time.time()
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, loop=False, pacing=PACING_REALTIME, fps=None):
+        super().__init__(pacing=pacing, fps=fps)
+        self.path = path
+        self.loop = loop
+        self.cap = None
+        self._fps = None
+
+    def open(self):
+        if self.cap is None:
+            if not os.path.isfile(self.path):
+                return False
+            self.cap = cv2.VideoCapture(self.path)
+            self._fps = self.cap.get(cv2.CAP_PROP_FPS) or None
+        return self.cap.isOpened()
+
+    def native_fps(self):
+        return self._fps
+
+    def _read_raw(self):
+        if self.cap is None and not self.open():
+            self.exhausted = True
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            self.exhausted = True
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirectorySource(FrameSource):
+    """Replays a folder of images (e.g. dataset/test/images) in sorted order."""
+
+    def __init__(self, path, loop=False, pacing=PACING_REALTIME, fps=30, size=None):
+        super().__init__(pacing=pacing, fps=fps)
+        self.path = path
+        self.loop = loop
+        self.size = size  # optional (width, height) so every frame has the same shape
+        self.files = None
+        self._pos = 0
+
+    def open(self):
+        if self.files is None:
+            if not os.path.isdir(self.path):
+                return False
+            self.files = sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        return len(self.files) > 0
+
+    def _read_raw(self):
+        if not self.open():
+            self.exhausted = True
+            return False, None
+        while True:
+            if self._pos >= len(self.files):
+                if not self.loop:
+                    self.exhausted = True
+                    return False, None
+                self._pos = 0
+            frame = cv2.imread(self.files[self._pos])
+            self._pos += 1
+            if frame is None:
+                continue  # skip unreadable files
+            if self.size:
+                frame = cv2.resize(frame, self.size)
+            return True, frame
+
+
+class SyntheticSource(FrameSource):
+    """
+    In-memory generator for load tests: a fixed noisy background with a
+    moving block, fully determined by `seed` so runs are reproducible.
+    """
+
+    def __init__(self, width=640, height=480, count=None, seed=0, pacing=PACING_FAST, fps=30):
+        super().__init__(pacing=pacing, fps=fps)
+        self.width = width
+        self.height = height
+        self.count = count  # None = endless
+        self.seed = seed
+        self._background = None
+
+    def open(self):
+        if self._background is None:
+            rng = np.random.default_rng(self.seed)
+            self._background = rng.integers(0, 256, (self.height, self.width, 3), dtype=np.uint8)
+        return True
+
+    def _read_raw(self):
+        self.open()
+        n = self.frame_index + 1
+        if self.count is not None and n >= self.count:
+            self.exhausted = True
+            return False, None
+        frame = self._background.copy()
+        size = max(20, min(self.width, self.height) // 6)
+        x = (n * 7) % max(1, self.width - size)
+        y = (n * 3) % max(1, self.height - size)
+        frame[y:y + size, x:x + size] = (40, 200, 40)
+        return True, frame
+
+
+def open_frame_source(spec=None, pacing=None, fps=None, loop=False):
+    """
+    Build a frame source from a config string:
+        "0", "webcam", "webcam:1"      -> WebcamSource
+        "synthetic", "synthetic:WxH"   -> SyntheticSource
+        path to a directory            -> ImageDirectorySource
+        path to a file                 -> VideoFileSource
+    Unset arguments fall back to FOCUS_SOURCE / FOCUS_PACING / FOCUS_FPS.
+    """
+    spec = str(spec if spec is not None else os.environ.get("FOCUS_SOURCE", "0"))
+    pacing = pacing or os.environ.get("FOCUS_PACING")
+    if fps is None and os.environ.get("FOCUS_FPS"):
+        fps = float(os.environ["FOCUS_FPS"])
+
+    if spec.isdigit() or spec.startswith("webcam"):
+        index = int(spec.split(":", 1)[1]) if ":" in spec else int(spec) if spec.isdigit() else 0
+        return WebcamSource(index, pacing=pacing or PACING_REALTIME, fps=fps)
+
+    if spec.startswith("synthetic"):
+        width, height = 640, 480
+        if ":" in spec:
+            width, height = (int(v) for v in spec.split(":", 1)[1].lower().split("x"))
+        return SyntheticSource(width, height, pacing=pacing or PACING_FAST, fps=fps or 30)
+
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, loop=loop, pacing=pacing or PACING_REALTIME, fps=fps or 30)
+
+    return VideoFileSource(spec, loop=loop, pacing=pacing or PACING_REALTIME, fps=fps)
@@ -0,0 +1,205 @@
+"""
+Append-only focus history in SQLite (WAL mode). Samples and events are
+queued in memory and inserted in batches by a background thread; range
+queries downsample on the server into min/max/avg buckets so a dashboard
+can chart hours of data from a few hundred rows.
+
+Every row also carries its run: the start time of the FocusEngine that wrote
+it. Restarting main.py or a server session keeps the session id but starts a
+new run, so runs can be told apart.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "focus_history.db"))
+
+SAMPLE_FIELDS = ("face", "eyes_closed", "phone", "pen", "moving")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    session TEXT NOT NULL,
+    ts REAL NOT NULL,
+    score REAL NOT NULL,
+    face INTEGER, eyes_closed INTEGER, phone INTEGER, pen INTEGER, moving INTEGER,
+    run REAL
+);
+CREATE INDEX IF NOT EXISTS samples_session_ts ON samples (session, ts);
+CREATE TABLE IF NOT EXISTS events (
+    session TEXT NOT NULL,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    run REAL
+);
+CREATE INDEX IF NOT EXISTS events_session_ts ON events (session, ts);
+"""
+
+# Index on run, created after _migrate() so databases from before runs get it too
+_RUN_INDEX = "CREATE INDEX IF NOT EXISTS samples_session_run ON samples (session, run);"
+
+
+class FocusHistory:
+    def __init__(self, path=DEFAULT_PATH, flush_interval=1.0, batch_size=500, max_queue=100000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._migrate(conn)
+            conn.executescript(_RUN_INDEX)
+        finally:
+            conn.close()
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="FocusHistory")
+        self._thread.start()
+
+    def _migrate(self, conn):
+        # Databases written before runs existed: add the column (old rows get NULL)
+        for table in ("samples", "events"):
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if "run" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN run REAL")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- writing (called from the frame loop; never touches the database) --------------
+    def record(self, session, ts, score, face, eyes_closed, phone, pen, moving, run=None):
+        self._put(("samples", (session, ts, score, int(face), int(eyes_closed), int(phone), int(pen), int(moving),
+                               run)))
+
+    def event(self, session, ts, kind, run=None):
+        self._put(("events", (session, ts, kind, run)))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        conn = self._connect()
+        try:
+            while not self._stop_event.is_set() or not self._queue.empty():
+                self._stop_event.wait(self.flush_interval)
+                self._flush(conn)
+        finally:
+            conn.close()
+
+    def _flush(self, conn):
+        while True:
+            rows = {"samples": [], "events": []}
+            for _ in range(self.batch_size):
+                try:
+                    table, row = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                rows[table].append(row)
+            if not rows["samples"] and not rows["events"]:
+                return
+            with conn:
+                if rows["samples"]:
+                    conn.executemany("INSERT INTO samples (session, ts, score, face, eyes_closed, phone, pen, moving, run) "
+                                       "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows["samples"])
+                if rows["events"]:
+                    conn.executemany("INSERT INTO events (session, ts, kind, run) VALUES (?, ?, ?, ?)", rows["events"])
+            self.written += len(rows["samples"]) + len(rows["events"])
+
+    def close(self):
+        """Flushes everything still queued and stops the writer."""
+        self._stop_event.set()
+        self._thread.join(timeout=10)
+
+    # --- reading ---------------------------------------------------------------------
+    def latest_run(self, session):
+        """Start time of the session's most recent run (None if it has none)."""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT MAX(run) FROM samples WHERE session = ?", (session,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def runs(self, session):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT DISTINCT run FROM samples WHERE session = ? AND run IS NOT NULL ORDER BY run",
+                                (session,)).fetchall()
+        finally:
+            conn.close()
+        return [run for (run,) in rows]
+
+    def query(self, session, start=None, end=None, buckets=300, run=None):
+        """
+        Samples of `session` between `start` and `end` (unix seconds), grouped
+        into at most `buckets` equal time buckets. Each bucket has the score's
+        min/max/avg and the fraction of samples with each detector flag set.
+        run: only samples of that run (see latest_run()).
+        """
+        where, args = _where(session, run)
+        conn = self._connect()
+        try:
+            if start is None or end is None:
+                lo, hi = conn.execute(f"SELECT MIN(ts), MAX(ts) FROM samples WHERE {where}", args).fetchone()
+                if lo is None:
+                    return []
+                start = lo if start is None else start
+                end = hi if end is None else end
+            width = max((end - start) / max(1, buckets), 1e-6)
+            flags = ", ".join(f"AVG({name})" for name in SAMPLE_FIELDS)
+            rows = conn.execute(
+                f"""SELECT MIN(CAST((ts - ?) / ? AS INTEGER), ?) AS bucket,
+                           COUNT(*), MIN(score), MAX(score), AVG(score), {flags}
+                    FROM samples WHERE {where} AND ts >= ? AND ts <= ?
+                    GROUP BY bucket ORDER BY bucket""",
+                (start, width, max(1, buckets) - 1) + args + (start, end),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        out = []
+        for bucket, count, lo, hi, avg, *fractions in rows:
+            item = {"t": start + bucket * width, "count": count,
+                    "min": lo, "max": hi, "avg": round(avg, 2)}
+            item.update({name: round(f, 3) for name, f in zip(SAMPLE_FIELDS, fractions)})
+            out.append(item)
+        return out
+
+    def events(self, session, start=None, end=None, run=None):
+        where, args = _where(session, run)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT ts, kind FROM events WHERE {where} AND ts >= ? AND ts <= ? ORDER BY ts",
+                args + (start if start is not None else 0, end if end is not None else time.time() + 1),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{"t": ts, "kind": kind} for ts, kind in rows]
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+def _where(session, run):
+    if run is None:
+        return "session = ?", (session,)
+    return "session = ? AND run = ?", (session, run)
+
+
+def open_history(path=None):
+    """FocusHistory at $FOCUS_HISTORY (default backend/focus_history.db); None if FOCUS_HISTORY=0."""
+    path = path or os.environ.get("FOCUS_HISTORY", DEFAULT_PATH)
+    if path == "0":
+        return None
+    return FocusHistory(path)
@@ -0,0 +1,111 @@
+"""
+Picks how each YOLO checkpoint runs on CPU: PyTorch (the .pt file), ONNX
+Runtime or OpenVINO, in FP32 or INT8. Exported models and their parity
+results live in models/exported/ and are produced by export_models.py.
+
+At load time `load_yolo("models/yolov8n.pt")` returns an ultralytics YOLO
+object for the chosen backend, so the detectors don't care which one runs:
+- FOCUS_BACKEND=auto (default): the fastest exported backend that passed
+  the mAP parity check, is installed, and beat PyTorch; else PyTorch
+- FOCUS_BACKEND=<name>: that backend, unless it failed parity or is
+  missing, in which case PyTorch is used and a warning printed
+"""
+import importlib.util
+import json
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPORT_DIR = os.path.join(BACKEND_DIR, "models", "exported")
+REPORT_PATH = os.path.join(EXPORT_DIR, "backends.json")
+
+BACKEND_TORCH = "torch"
+BACKENDS = (BACKEND_TORCH, "onnx", "onnx-int8", "openvino", "openvino-int8")
+
+
+def model_key(model_path):
+    """Report key for a checkpoint: its file name without extension."""
+    return os.path.splitext(os.path.basename(model_path))[0]
+
+
+def exported_path(model_path, backend):
+    stem = model_key(model_path)
+    names = {
+        "onnx": f"{stem}.onnx",
+        "onnx-int8": f"{stem}_int8.onnx",
+        "openvino": f"{stem}_openvino_model",
+        "openvino-int8": f"{stem}_int8_openvino_model",
+    }
+    return os.path.join(EXPORT_DIR, names[backend])
+
+
+def backend_available(backend):
+    if backend == BACKEND_TORCH:
+        return True
+    runtime = "onnxruntime" if backend.startswith("onnx") else "openvino"
+    return importlib.util.find_spec(runtime) is not None
+
+
+def load_report(path=REPORT_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report, path=REPORT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def _usable(model_path, backend, entry):
+    return (
+        entry is not None
+        and entry.get("passed")
+        and backend_available(backend)
+        and os.path.exists(exported_path(model_path, backend))
+    )
+
+
+def choose_backend(model_path, requested=None, report=None):
+    """Returns (backend, path to load) for one checkpoint."""
+    requested = requested or os.environ.get("FOCUS_BACKEND", "auto")
+    if requested == BACKEND_TORCH:
+        return BACKEND_TORCH, model_path
+    if requested != "auto" and requested not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {requested}")
+
+    report = load_report() if report is None else report
+    entries = report.get(model_key(model_path), {})
+
+    if requested != "auto":
+        entry = entries.get(requested)
+        if not _usable(model_path, requested, entry):
+            reason = "failed the mAP parity check" if entry and not entry.get("passed") else "is not exported/installed"
+            print(f"⚠️ {requested} backend for {model_key(model_path)} {reason}; using PyTorch")
+            return BACKEND_TORCH, model_path
+        return requested, exported_path(model_path, requested)
+
+    torch_latency = entries.get(BACKEND_TORCH, {}).get("latency_ms")
+    best, best_latency = BACKEND_TORCH, torch_latency
+    for backend in BACKENDS[1:]:
+        entry = entries.get(backend)
+        if not _usable(model_path, backend, entry):
+            continue
+        latency = entry.get("latency_ms")
+        if latency is not None and (best_latency is None or latency < best_latency):
+            best, best_latency = backend, latency
+    if best == BACKEND_TORCH:
+        return BACKEND_TORCH, model_path
+    return best, exported_path(model_path, best)
+
+
+def load_yolo(model_path, backend=None):
+    """ultralytics YOLO for `model_path`, running on the chosen backend."""
+    from ultralytics import YOLO
+
+    backend, path = choose_backend(model_path, backend)
+    if backend == BACKEND_TORCH:
+        return YOLO(path)
+    print(f"🧠 {model_key(model_path)}: using {backend} ({os.path.relpath(path, BACKEND_DIR)})")
+    return YOLO(path, task="detect")
@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+
+
+class _Request:
+    __slots__ = ("frame", "kwargs", "done", "result", "error")
+
+    def __init__(self, frame, kwargs):
+        self.frame = frame
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _BatchWorker(threading.Thread):
+    """Owns one loaded model and runs it on micro-batches of queued frames."""
+
+    def __init__(self, model, max_batch, max_wait, timeout=30.0):
+        super().__init__(daemon=True)
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.requests = queue.Queue()
+        self.running = True
+        self.batches = 0
+        self.frames = 0
+
+    def run(self):
+        while self.running:
+            try:
+                first = self.requests.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = [first]
+            # Wait at most max_wait for more frames to share the forward pass
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+        self._fail_pending()
+
+    def _run_batch(self, batch):
+        # Frames can only share a forward pass when they use the same settings
+        groups = {}
+        for req in batch:
+            groups.setdefault(tuple(sorted(req.kwargs.items())), []).append(req)
+
+        for kwargs, reqs in groups.items():
+            try:
+                results = self.model([r.frame for r in reqs], verbose=False, **dict(kwargs))
+                for req, res in zip(reqs, results):
+                    req.result = [res]
+            except Exception as e:
+                for req in reqs:
+                    req.error = e
+            finally:
+                for req in reqs:
+                    req.done.set()
+            self.batches += 1
+            self.frames += len(reqs)
+
+    def _fail_pending(self):
+        """Fail every queued request, so no caller waits on a stopped worker."""
+        while True:
+            try:
+                req = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            req.error = RuntimeError("Inference engine was shut down")
+            req.done.set()
+
+    def stop(self):
+        self.running = False
+        self._fail_pending()
+
+    def submit(self, frame, kwargs):
+        if not self.running:
+            raise RuntimeError("Inference engine was shut down")
+        req = _Request(frame, kwargs)
+        self.requests.put(req)
+        deadline = time.perf_counter() + self.timeout
+        # Poll, so a shutdown while the request is queued fails it instead of hanging
+        while not req.done.wait(0.5):
+            if not self.running:
+                self._fail_pending()
+            elif time.perf_counter() > deadline:
+                raise TimeoutError(f"No inference result after {self.timeout}s")
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+
+class SharedModel:
+    """
+    Stand-in for an ultralytics YOLO object whose calls go through the shared
+    engine. Supports what the detectors use: model(frame, **kwargs) and .names.
+    """
+
+    def __init__(self, worker):
+        self._worker = worker
+        self.names = worker.model.names
+
+    def __call__(self, frame, verbose=False, **kwargs):
+        return self._worker.submit(frame, kwargs)
+
+
+class BatchInferenceEngine:
+    """
+    Loads each YOLO checkpoint once for the whole server and batches frames
+    from every session: a batch runs when `max_batch` frames are queued or
+    the oldest one has waited `max_wait` seconds.
+    """
+
+    def __init__(self, max_batch=None, max_wait=None, timeout=30.0):
+        """timeout: seconds a caller waits for its result before TimeoutError."""
+        self.timeout = timeout
+        self.max_batch = max_batch or int(os.environ.get("FOCUS_BATCH_SIZE", 8))
+        self.max_wait = max_wait if max_wait is not None else float(os.environ.get("FOCUS_BATCH_WAIT_MS", 10)) / 1000
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_path):
+        with self._lock:
+            worker = self._workers.get(model_path)
+            if worker is None:
+                from utils.inference_backend import load_yolo
+
+                worker = _BatchWorker(load_yolo(model_path), self.max_batch, self.max_wait, self.timeout)
+                worker.start()
+                self._workers[model_path] = worker
+        return SharedModel(worker)
+
+    def stats(self):
+        return {
+            path: {
+                "batches": w.batches,
+                "frames": w.frames,
+                "avg_batch": round(w.frames / w.batches, 2) if w.batches else 0,
+                "queued": w.requests.qsize(),
+            }
+            for path, w in self._workers.items()
+        }
+
+    def shutdown(self):
+        """Stops the workers and fails any queued requests."""
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.stop()
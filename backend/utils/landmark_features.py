@@ -0,0 +1,148 @@
+"""
+Face features from MediaPipe FaceMesh landmarks, computed with NumPy on one
+(478, 3) array per face instead of per-landmark Python loops. Functions take
+`points[..., 478, 3]`, so a stack of faces works the same way as one face.
+"""
+import cv2
+import numpy as np
+
+# EAR points per eye: corner, top, top, corner, bottom, bottom
+EYE_INDICES = np.array([
+    [33, 160, 158, 133, 153, 144],   # image-left eye
+    [362, 385, 387, 263, 373, 380],  # image-right eye
+])
+# Outer corner, inner corner, upper lid, lower lid and iris centre per eye (refine_landmarks=True)
+EYE_CORNERS = np.array([[33, 133], [263, 362]])
+EYE_LIDS = np.array([[159, 145], [386, 374]])
+IRIS_CENTERS = np.array([468, 473])
+NUM_LANDMARKS = 478
+
+# Generic 3D face model (mm) for solvePnP: nose tip, chin, eye outer corners, mouth corners
+POSE_INDICES = np.array([1, 152, 33, 263, 61, 291])
+POSE_MODEL = np.array([
+    [0.0, 0.0, 0.0],
+    [0.0, -63.6, -12.5],
+    [-43.3, 32.7, -26.0],
+    [43.3, 32.7, -26.0],
+    [-28.9, -28.9, -24.1],
+    [28.9, -28.9, -24.1],
+], dtype=np.float64)
+
+
+def landmarks_to_array(landmarks):
+    """One FaceMesh landmark list -> float32 array of shape (N, 3), normalized coordinates."""
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+
+
+def faces_to_array(multi_face_landmarks):
+    """All faces of one FaceMesh result -> float32 array of shape (F, N, 3)."""
+    return np.stack([landmarks_to_array(face.landmark) for face in multi_face_landmarks])
+
+
+def eye_aspect_ratios(points):
+    """EAR of both eyes from normalized x/y: shape (..., 2)."""
+    p = points[..., EYE_INDICES, :2]  # (..., 2 eyes, 6 points, 2)
+    vertical = np.linalg.norm(p[..., 1, :] - p[..., 5, :], axis=-1) + np.linalg.norm(p[..., 2, :] - p[..., 4, :], axis=-1)
+    horizontal = np.linalg.norm(p[..., 0, :] - p[..., 3, :], axis=-1)
+    return vertical / (2.0 * horizontal + 1e-9)
+
+
+def gaze_offsets(points):
+    """
+    Iris position inside each eye, shape (..., 2 eyes, 2): x from -1 (towards
+    the image left) to 1, y from -1 (up) to 1; 0 is centred.
+    """
+    xy = points[..., :2]
+    corners = xy[..., EYE_CORNERS, :]   # (..., 2, 2, 2)
+    lids = xy[..., EYE_LIDS, :]
+    iris = xy[..., IRIS_CENTERS, :]     # (..., 2, 2)
+
+    left = np.minimum(corners[..., 0, 0], corners[..., 1, 0])
+    right = np.maximum(corners[..., 0, 0], corners[..., 1, 0])
+    gx = (iris[..., 0] - left) / (right - left + 1e-9) * 2 - 1
+
+    top, bottom = lids[..., 0, 1], lids[..., 1, 1]
+    gy = (iris[..., 1] - top) / (bottom - top + 1e-9) * 2 - 1
+    return np.stack([gx, gy], axis=-1)
+
+
+def face_box(points, frame_shape):
+    """Pixel bounding box (x1, y1, x2, y2) of one face."""
+    h, w = frame_shape[:2]
+    lo = points[:, :2].min(axis=0)
+    hi = points[:, :2].max(axis=0)
+    return (int(lo[0] * w), int(lo[1] * h), int(hi[0] * w), int(hi[1] * h))
+
+
+def face_boxes(points, frame_shape):
+    """Pixel boxes of a stack of faces (F, N, 3) -> int array (F, 4)."""
+    h, w = frame_shape[:2]
+    lo = points[..., :2].min(axis=-2)
+    hi = points[..., :2].max(axis=-2)
+    return (np.concatenate([lo, hi], axis=-1) * (w, h, w, h)).astype(np.int32)
+
+
+def head_pose(points, frame_shape):
+    """(yaw, pitch, roll) in degrees for one face; 0/0/0 is facing the camera."""
+    h, w = frame_shape[:2]
+    image_points = (points[POSE_INDICES, :2] * (w, h)).astype(np.float64)
+    camera = np.array([[w, 0, w / 2], [0, w, h / 2], [0, 0, 1]], dtype=np.float64)
+    # Image y grows downwards, the model's y grows upwards
+    model = POSE_MODEL * (1, -1, -1)
+    ok, rvec, _ = cv2.solvePnP(model, image_points, camera, None, flags=cv2.SOLVEPNP_EPNP)
+    if not ok:
+        return 0.0, 0.0, 0.0
+    rotation, _ = cv2.Rodrigues(rvec)
+    pitch, yaw, roll = cv2.RQDecomp3x3(rotation)[0]
+    return float(yaw), float(_wrap(pitch)), float(_wrap(roll))
+
+
+def _wrap(angle):
+    # RQDecomp3x3 can report a face looking at the camera as ~±180°
+    if angle > 90:
+        return angle - 180
+    if angle < -90:
+        return angle + 180
+    return angle
+
+
+def head_poses(points, frame_shape):
+    """(yaw, pitch) in degrees per face for a stack of faces -> array (F, 2)."""
+    return np.array([head_pose(face, frame_shape)[:2] for face in points], dtype=np.float32).reshape(-1, 2)
+
+
+class LandmarkFeatureEngine:
+    """
+    Turns one face's landmarks into the features FaceEyeTracker needs.
+    `looking_away` is set when the head turns past `yaw_limit`/`pitch_limit`
+    degrees or the irises sit more than `gaze_limit` off-centre.
+    """
+
+    def __init__(self, yaw_limit=30.0, pitch_limit=20.0, gaze_limit=0.6):
+        self.yaw_limit = yaw_limit
+        self.pitch_limit = pitch_limit
+        self.gaze_limit = gaze_limit
+
+    def compute(self, points, frame_shape):
+        ears = eye_aspect_ratios(points)
+        yaw, pitch, roll = head_pose(points, frame_shape)
+        features = {
+            "ear_left": float(ears[0]),
+            "ear_right": float(ears[1]),
+            "ear": float(ears.mean()),
+            "yaw": yaw,
+            "pitch": pitch,
+            "roll": roll,
+            "gaze_x": 0.0,
+            "gaze_y": 0.0,
+            "face_box": face_box(points, frame_shape),
+        }
+        if len(points) >= NUM_LANDMARKS:
+            gaze = gaze_offsets(points).mean(axis=0)
+            features["gaze_x"], features["gaze_y"] = float(gaze[0]), float(gaze[1])
+        features["looking_away"] = bool(
+            abs(yaw) > self.yaw_limit
+            or abs(pitch) > self.pitch_limit
+            or abs(features["gaze_x"]) > self.gaze_limit
+        )
+        return features
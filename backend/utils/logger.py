@@ -1,9 +1,170 @@
-import csv, time
+import atexit, csv, os, struct, threading, time
+
+import numpy as np
+
+FORMAT_CSV = "csv"
+FORMAT_COLUMNAR = "columnar"
+
+# Columnar blocks: magic, row count, then one contiguous array per column
+_BLOCK_MAGIC = b"FLB1"
+_FLAG_NAMES = ("face", "eyes", "phone", "pen", "moving")
+
+
+class SessionLogger:
+    """
+    Buffers focus log rows in memory and writes them in batches from a
+    background thread: when `flush_rows` rows are waiting or every
+    `flush_interval` seconds. Files rotate at `max_bytes` (path -> path.1 ->
+    ... -> path.<backups>).
+
+    format="csv" appends the same rows the old logger wrote;
+    format="columnar" appends compact binary blocks (float64 timestamps,
+    float32 scores, one flag byte per row) readable with read_columnar().
+    """
+
+    def __init__(self, path="focus_log.csv", format=FORMAT_CSV, flush_rows=256, flush_interval=5.0,
+                 max_bytes=10 * 1024 * 1024, backups=5):
+        if format not in (FORMAT_CSV, FORMAT_COLUMNAR):
+            raise ValueError(f"Unknown log format: {format}")
+        self.path = path
+        self.format = format
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rows_written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="SessionLogger")
+        self._thread.start()
+
+    def log(self, score, face, eyes, phone, pen, moving, timestamp=None):
+        with self._lock:
+            self._buffer.append((timestamp or time.time(), score, face, eyes, phone, pen, moving))
+            full = len(self._buffer) >= self.flush_rows
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        # The write lock keeps batches in order; log() only ever waits on the
+        # (short) buffer swap, never on file I/O
+        with self._write_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            try:
+                self._rotate_if_needed()
+                if self.format == FORMAT_CSV:
+                    self._write_csv(rows)
+                else:
+                    self._write_columnar(rows)
+                self.rows_written += len(rows)
+            except OSError as e:
+                print("⚠️ Could not write focus log:", e)
+
+    def _write_csv(self, rows):
+        with open(self.path, "a", newline="") as f:
+            writer = csv.writer(f)
+            for ts, *values in rows:
+                writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))] + values)
+
+    def _write_columnar(self, rows):
+        columns = list(zip(*rows))
+        timestamps = np.asarray(columns[0], dtype="<f8")
+        scores = np.asarray(columns[1], dtype="<f4")
+        flags = np.zeros(len(rows), dtype=np.uint8)
+        for bit, values in enumerate(columns[2:]):
+            flags |= np.asarray(values, dtype=bool).astype(np.uint8) << bit
+        with open(self.path, "ab") as f:
+            f.write(_BLOCK_MAGIC + struct.pack("<I", len(rows)))
+            f.write(timestamps.tobytes())
+            f.write(scores.tobytes())
+            f.write(flags.tobytes())
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout=2)
+        self.flush()
+
+
+def read_columnar(path):
+    """Loads a columnar log into NumPy arrays: timestamp, score and one bool array per flag."""
+    with open(path, "rb") as f:
+        data = f.read()
+    parts = {"timestamp": [], "score": [], "flags": []}
+    pos = 0
+    while pos + 8 <= len(data):
+        if data[pos:pos + 4] != _BLOCK_MAGIC:
+            raise ValueError(f"Corrupt columnar log at byte {pos}")
+        (n,) = struct.unpack_from("<I", data, pos + 4)
+        pos += 8
+        parts["timestamp"].append(np.frombuffer(data, "<f8", n, pos))
+        pos += 8 * n
+        parts["score"].append(np.frombuffer(data, "<f4", n, pos))
+        pos += 4 * n
+        parts["flags"].append(np.frombuffer(data, np.uint8, n, pos))
+        pos += n
+
+    out = {name: np.concatenate(chunks) if chunks else np.zeros(0) for name, chunks in parts.items()}
+    flags = out.pop("flags").astype(np.uint8)
+    for bit, name in enumerate(_FLAG_NAMES):
+        out[name] = (flags >> bit) & 1 == 1
+    return out
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_session_logger():
+    """Process-wide logger configured by $FOCUS_LOG_PATH and $FOCUS_LOG_FORMAT (csv or columnar)."""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                fmt = os.environ.get("FOCUS_LOG_FORMAT", FORMAT_CSV)
+                default_path = "focus_log.bin" if fmt == FORMAT_COLUMNAR else "focus_log.csv"
+                _logger = SessionLogger(os.environ.get("FOCUS_LOG_PATH", default_path), format=fmt)
+                atexit.register(close_session_log)  # also covers Ctrl+C in main.py
+    return _logger
+
 
 def log_focus_data(score, face, eyes, phone, pen, moving):
-    with open("focus_log.csv", "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            time.strftime("%Y-%m-%d %H:%M:%S"),
-            score, face, eyes, phone, pen, moving
-        ])
+    get_session_logger().log(score, face, eyes, phone, pen, moving)
+
+
+def flush_session_log():
+    if _logger is not None:
+        _logger.flush()
+
+
+def close_session_log():
+    global _logger
+    if _logger is not None:
+        _logger.close()
+        _logger = None
@@ -0,0 +1,140 @@
+"""
+Minimal Prometheus text-format metrics, without the client library.
+
+Stage timings arrive through utils.timing (MetricsRegistry is a timing
+recorder) and go into fixed-bucket histograms. Everything else (frames,
+drops, skips, queue depths, stream clients, process stats) is pulled from
+the existing stats() methods by collectors at scrape time, so the frame
+loop pays nothing for it. Timing histograms are only attached once the
+first scrape arrives (or with FOCUS_METRICS=1), so an unscraped server
+keeps timed() a no-op.
+"""
+import os
+import threading
+from bisect import bisect_left
+
+from utils import timing
+
+# Seconds; covers cheap stages (drawing, scoring) up to slow YOLO runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # No lock: a lost increment under contention is fine for monitoring
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    """
+    add_collector(fn): fn() yields (name, type, help, [(labels dict, value), ...])
+    and is called on every scrape.
+    """
+
+    def __init__(self, prefix="focus_"):
+        self.prefix = prefix
+        self.stage_seconds = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            timing.add_recorder(self)
+
+    def disable(self):
+        self.enabled = False
+        timing.remove_recorder(self)
+
+    def record(self, name, seconds):
+        hist = self.stage_seconds.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.stage_seconds.setdefault(name, Histogram())
+        hist.observe(seconds)
+
+    def add_collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        self.enable()
+        lines = []
+        name = self.prefix + "stage_seconds"
+        lines.append(f"# HELP {name} Time spent per frame in each processing stage.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, hist in sorted(self.stage_seconds.items()):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels({"stage": stage, "le": bound})} {cumulative}')
+            lines.append(f'{name}_bucket{_labels({"stage": stage, "le": "+Inf"})} {hist.count}')
+            lines.append(f'{name}_sum{_labels({"stage": stage})} {hist.sum:.6f}')
+            lines.append(f'{name}_count{_labels({"stage": stage})} {hist.count}')
+
+        for collector in self._collectors:
+            try:
+                metrics = list(collector())
+            except Exception as e:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {e!r}")
+                continue
+            for metric, kind, help_text, samples in metrics:
+                metric = self.prefix + metric
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{metric}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_process = None
+
+
+def process_collector():
+    """CPU, memory and thread count of this process (needs psutil)."""
+    global _process
+    try:
+        import psutil
+    except ImportError:
+        return
+    if _process is None:
+        _process = psutil.Process(os.getpid())  # kept so cpu_percent() measures between scrapes
+    proc = _process
+    with proc.oneshot():
+        cpu = proc.cpu_times()
+        mem = proc.memory_info()
+        threads = proc.num_threads()
+    yield "process_cpu_seconds_total", "counter", "User + system CPU time.", [({}, cpu.user + cpu.system)]
+    yield "process_resident_memory_bytes", "gauge", "Resident set size.", [({}, mem.rss)]
+    yield "process_threads", "gauge", "OS threads in this process.", [({}, threads)]
+    yield "process_cpu_percent", "gauge", "CPU use since the previous scrape (100 = one core).", \
+        [({}, proc.cpu_percent(None))]
+    yield "system_cpu_percent", "gauge", "Machine-wide CPU use since the previous scrape.", \
+        [({}, psutil.cpu_percent(None))]
+
+
+def metrics_enabled_at_start():
+    return os.environ.get("FOCUS_METRICS") == "1"
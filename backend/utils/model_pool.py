@@ -0,0 +1,176 @@
+"""
+Warm model pool for the server.
+
+Loading the YOLO checkpoints and building a FaceMesh graph, plus their first
+(slow) inference, used to happen inside every new session. ModelPool does it
+once in a background thread after the server starts:
+- each YOLO checkpoint build_object_detector() would use is loaded into the
+  shared BatchInferenceEngine and run once on a blank frame
+- FOCUS_POOL_FACES (default 2) FaceEyeTrackers are built and warmed the
+  same way, ready to be borrowed by new sessions and given back afterwards
+
+Nothing heavy (mediapipe, ultralytics, torch) is imported until then;
+runtime_available() only checks that the packages are installed.
+"""
+import importlib.util
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+RUNTIME_PACKAGES = ("cv2", "mediapipe", "ultralytics")
+
+
+def runtime_available():
+    """True if the in-process detectors can run, without importing them."""
+    return all(importlib.util.find_spec(name) is not None for name in RUNTIME_PACKAGES)
+
+
+def preload_enabled():
+    return os.environ.get("FOCUS_PRELOAD", "1") != "0"
+
+
+class ModelPool:
+    def __init__(self, detector=None, faces=None, warm_shape=(480, 640, 3)):
+        """
+        detector: "separate" or "fused" (None -> $FOCUS_DETECTOR), decides
+        which checkpoints are preloaded.
+        faces: warm FaceEyeTrackers to keep ready (None -> $FOCUS_POOL_FACES).
+        """
+        self.detector = detector
+        self.faces = faces if faces is not None else int(os.environ.get("FOCUS_POOL_FACES", 2))
+        self.warm_shape = warm_shape
+        self._engine = None
+        self._idle_faces = []
+        self._lock = threading.Lock()
+        self._filling = False
+        self.ready = threading.Event()
+        self.loading = False
+        self.error = None
+        self.models = {}  # checkpoint -> {"load_s", "warm_s"} or {"missing": True}
+        self.face_build_s = None
+        self.faces_built = 0
+        self.faces_borrowed = 0
+        self.cold_starts = 0
+        self.started_at = time.time()
+        self.ready_after = None
+        self.first_frames = deque(maxlen=100)  # (session, seconds from start to first frame)
+
+    @property
+    def engine(self):
+        """Shared BatchInferenceEngine, created on first use."""
+        with self._lock:
+            if self._engine is None:
+                from utils.inference_engine import BatchInferenceEngine
+
+                self._engine = BatchInferenceEngine()
+            return self._engine
+
+    def engine_if_loaded(self):
+        return self._engine
+
+    # --- Preloading ------------------------------------------------------------
+    def preload_async(self):
+        thread = threading.Thread(target=self.preload, daemon=True, name="ModelPool")
+        thread.start()
+        return thread
+
+    def preload(self):
+        self.loading = True
+        start = time.perf_counter()
+        try:
+            from modules.object_detector import model_paths
+
+            for path in model_paths(self.detector):
+                if not os.path.exists(path):
+                    self.models[path] = {"missing": True}
+                    continue
+                t0 = time.perf_counter()
+                model = self.engine.model(path)
+                t1 = time.perf_counter()
+                model(self._blank())  # first inference allocates and compiles
+                self.models[path] = {"load_s": round(t1 - t0, 3), "warm_s": round(time.perf_counter() - t1, 3)}
+            self._fill_faces()
+            print(f"🔥 Models warm in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self.error = repr(e)
+            print("⚠️ Model preload failed:", e)
+        finally:
+            self.loading = False
+            self.ready_after = round(time.time() - self.started_at, 3)
+            self.ready.set()
+
+    def _blank(self):
+        return np.zeros(self.warm_shape, dtype=np.uint8)
+
+    def _build_face(self):
+        from modules.face_eye_tracker import FaceEyeTracker
+
+        start = time.perf_counter()
+        tracker = FaceEyeTracker()
+        tracker.analyze_frame(self._blank())
+        tracker.reset()
+        self.face_build_s = round(time.perf_counter() - start, 3)
+        self.faces_built += 1
+        return tracker
+
+    def _fill_faces(self):
+        with self._lock:
+            if self._filling:
+                return
+            self._filling = True
+        try:
+            while len(self._idle_faces) < self.faces:
+                tracker = self._build_face()
+                with self._lock:
+                    self._idle_faces.append(tracker)
+        finally:
+            self._filling = False
+
+    # --- Sessions ----------------------------------------------------------------
+    def borrow_face_tracker(self):
+        """A warm FaceEyeTracker if one is idle, else a freshly built one."""
+        with self._lock:
+            tracker = self._idle_faces.pop() if self._idle_faces else None
+            self.faces_borrowed += 1
+        if tracker is None:
+            self.cold_starts += 1
+            tracker = self._build_face()
+        if self.faces > 0:
+            threading.Thread(target=self._fill_faces, daemon=True, name="ModelPool-refill").start()
+        return tracker
+
+    def give_back(self, tracker):
+        """Returns a borrowed tracker to the pool, or closes it if the pool is full."""
+        tracker.reset()
+        with self._lock:
+            if len(self._idle_faces) < self.faces:
+                self._idle_faces.append(tracker)
+                return
+        tracker.face_mesh.close()
+
+    def record_first_frame(self, session_id, seconds):
+        self.first_frames.append((session_id, seconds))
+
+    def status(self):
+        first = sorted(s for _, s in self.first_frames)
+        return {
+            "ready": self.ready.is_set(),
+            "loading": self.loading,
+            "error": self.error,
+            "ready_after_s": self.ready_after,
+            "models": dict(self.models),
+            "faces_idle": len(self._idle_faces),
+            "faces_built": self.faces_built,
+            "faces_borrowed": self.faces_borrowed,
+            "face_build_s": self.face_build_s,
+            "cold_starts": self.cold_starts,
+            "first_frame_s": {
+                "last": round(self.first_frames[-1][1], 3) if first else None,
+                "p50": round(first[len(first) // 2], 3) if first else None,
+                "max": round(first[-1], 3) if first else None,
+                "count": len(first),
+            },
+        }
@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+
+
+class MotionAnalyzer:
+    """
+    Cheap motion detector on a downscaled grayscale copy of the frame.
+
+    method="diff" compares against the previous frame, method="background"
+    against a running-average background (steadier under sensor noise).
+    Motion energy is the fraction of pixels whose intensity changed by more
+    than `pixel_threshold`, for the whole frame and for each cell of a
+    `grid` of regions.
+    """
+
+    def __init__(self, width=160, method="diff", pixel_threshold=25, motion_threshold=0.01,
+                 grid=(3, 3), bg_alpha=0.05, hold_frames=5):
+        if method not in ("diff", "background"):
+            raise ValueError(f"Unknown motion method: {method}")
+        self.width = width
+        self.method = method
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.grid = grid
+        self.bg_alpha = bg_alpha
+        self.hold_frames = hold_frames  # stay "moving" this many frames after motion stops
+
+        self.reference = None  # previous frame or background (float32)
+        self.mask = None       # last changed-pixel mask (downscaled)
+        self.scale = None      # downscaled / original width
+        self.moving = False
+        self.energy = 0.0
+        self.regions = np.zeros(grid, dtype=np.float32)
+        self._still_frames = 0
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        self.scale = self.width / float(w)
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+    def analyze(self, frame):
+        """Returns {"moving", "motion_energy", "motion_regions"} for this frame."""
+        gray = self._prepare(frame)
+        if self.reference is None or self.reference.shape != gray.shape:
+            self.reference = gray
+            self.mask = np.zeros(gray.shape, dtype=bool)
+            # No history yet: assume motion so callers don't skip the first detections
+            self.moving = True
+            self.energy = 1.0
+            self.regions = np.ones(self.grid, dtype=np.float32)
+            return self.result()
+
+        self.mask = np.abs(gray - self.reference) > self.pixel_threshold
+        if self.method == "diff":
+            self.reference = gray
+        else:
+            cv2.accumulateWeighted(gray, self.reference, self.bg_alpha)
+
+        self.energy = float(self.mask.mean())
+        self.regions = self._region_energy(self.mask)
+
+        if self.energy > self.motion_threshold:
+            self._still_frames = 0
+            self.moving = True
+        else:
+            self._still_frames += 1
+            self.moving = self._still_frames <= self.hold_frames
+        return self.result()
+
+    def _region_energy(self, mask):
+        rows, cols = self.grid
+        h, w = mask.shape
+        # Crop to a multiple of the grid so it reshapes into equal cells
+        cell_h, cell_w = h // rows, w // cols
+        cells = mask[:cell_h * rows, :cell_w * cols].reshape(rows, cell_h, cols, cell_w)
+        return cells.mean(axis=(1, 3)).astype(np.float32)
+
+    def box_energy(self, box):
+        """Motion energy inside an (x1, y1, x2, y2) box given in full-frame pixels."""
+        if self.mask is None or self.scale is None:
+            return 1.0
+        x1, y1, x2, y2 = (int(round(v * self.scale)) for v in box)
+        h, w = self.mask.shape
+        x1, x2 = max(0, x1), min(w, max(x2, x1 + 1))
+        y1, y2 = max(0, y1), min(h, max(y2, y1 + 1))
+        if x1 >= w or y1 >= h:
+            return 0.0
+        return float(self.mask[y1:y2, x1:x2].mean())
+
+    def result(self):
+        return {
+            "moving": self.moving,
+            "motion_energy": round(self.energy, 4),
+            "motion_regions": self.regions.round(4).tolist(),
+        }
+
+    def reset(self):
+        self.reference = None
+        self.mask = None
+        self._still_frames = 0
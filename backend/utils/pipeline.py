@@ -0,0 +1,202 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+from utils.timing import record
+
+
+class FramePacket:
+    """A frame travelling through the pipeline, plus whatever each stage adds to it."""
+
+    __slots__ = ("frame_id", "timestamp", "frame", "data")
+
+    def __init__(self, frame_id, frame, timestamp=None):
+        self.frame_id = frame_id
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.frame = frame
+        self.data = {}
+
+    def age(self):
+        return time.time() - self.timestamp
+
+
+class DropOldestQueue:
+    """
+    Bounded queue that never blocks the producer by default: when full, the
+    oldest item is thrown away so the consumer always sees the freshest frame.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self.put_count = 0
+
+    def put(self, item, block=False, timeout=None):
+        """
+        block=False drops the oldest item when full (live sources).
+        block=True waits for room instead (lossless offline replay).
+        Returns False if the queue was closed or the wait timed out.
+        """
+        with self._cond:
+            if block:
+                ok = self._cond.wait_for(lambda: self._closed or len(self._items) < self.maxsize, timeout)
+                if not ok:
+                    return False
+            if self._closed:
+                return False
+            while len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Returns the next item, or None on timeout / once closed and empty."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self._items, timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Stage(threading.Thread):
+    """
+    One pipeline stage on its own thread. `fn(packet)` returns the packet to
+    hand downstream, or None to stop it here. The first stage has no input
+    queue and `fn()` produces packets itself; it raises StopIteration at the
+    end of the stream, after which downstream stages drain and exit.
+    """
+
+    def __init__(self, name, fn, in_queue=None, out_queue=None, stop_event=None,
+                 max_age=None, block_output=False):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event or threading.Event()
+        self.max_age = max_age  # skip packets older than this (seconds)
+        self.block_output = block_output
+        self.processed = 0
+        self.skipped_stale = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.timing_name = f"pipeline_{name}"
+
+    def run(self):
+        try:
+            self._loop()
+        finally:
+            if self.out_queue is not None:
+                self.out_queue.close()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            if self.in_queue is not None:
+                packet = self.in_queue.get(timeout=0.1)
+                if packet is None:
+                    if self.in_queue.closed:
+                        return  # upstream finished and everything is drained
+                    continue
+                if self.max_age is not None and packet.age() > self.max_age:
+                    self.skipped_stale += 1
+                    continue
+                args = (packet,)
+            else:
+                args = ()
+
+            start = time.perf_counter()
+            try:
+                result = self.fn(*args)
+            except StopIteration:
+                return
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Pipeline stage '{self.stage_name}' error:", e)
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                self.busy_time += elapsed
+                record(self.timing_name, elapsed)
+
+            self.processed += 1
+            if result is None:
+                continue
+            if self.out_queue is not None:
+                while not self.out_queue.put(result, block=self.block_output, timeout=0.1):
+                    if self.stop_event.is_set():
+                        return
+
+
+class Pipeline:
+    """
+    Chains stages with bounded drop-oldest queues:
+        Pipeline([("capture", read_fn), ("inference", infer_fn), ...])
+    The first callable produces packets, the rest transform them.
+    """
+
+    def __init__(self, stages, queue_size=1, max_age=None, lossless=False):
+        self.stop_event = threading.Event()
+        self.queues = [DropOldestQueue(queue_size) for _ in stages[1:]]
+        self.stages = []
+        for i, (name, fn) in enumerate(stages):
+            in_q = self.queues[i - 1] if i > 0 else None
+            out_q = self.queues[i] if i < len(self.queues) else None
+            self.stages.append(Stage(
+                name, fn, in_q, out_q, self.stop_event,
+                max_age=max_age if i > 0 else None,
+                block_output=lossless,
+            ))
+        self._ids = itertools.count()
+
+    def next_frame_id(self):
+        return next(self._ids)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for q in self.queues:
+            q.close()
+
+    def join(self, timeout=None):
+        for stage in self.stages:
+            stage.join(timeout)
+
+    def is_running(self):
+        return not self.stop_event.is_set() and any(stage.is_alive() for stage in self.stages)
+
+    def stats(self):
+        return {
+            stage.stage_name: {
+                "processed": stage.processed,
+                "errors": stage.errors,
+                "skipped_stale": stage.skipped_stale,
+                "busy_time": round(stage.busy_time, 3),
+                "dropped": self.queues[i - 1].dropped if i > 0 else 0,
+                "queue_depth": len(self.queues[i - 1]) if i > 0 else 0,
+            }
+            for i, stage in enumerate(self.stages)
+        }
@@ -0,0 +1,336 @@
+"""
+Process-pool execution mode: every detector runs in its own worker process,
+so MediaPipe, YOLO pre/post-processing and the per-box Python loops no
+longer share one interpreter (and one GIL) with the capture/scoring threads.
+
+Frames are copied once into a multiprocessing.shared_memory ring buffer;
+workers map the slot as a NumPy view, so no pixel data is pickled. Only
+small result dicts (flags, boxes) travel back over the result queues.
+
+Compare against the in-process mode on this machine with:
+    python -m utils.process_pool --source ../dataset/test/images --frames 200
+"""
+import os
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """Fixed number of frame-sized slots in one shared memory block."""
+
+    def __init__(self, shape, slots=2):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.slot_bytes = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        self._next = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def fits(self, frame):
+        return frame.dtype == np.uint8 and frame.nbytes <= self.slot_bytes
+
+    def write(self, frame):
+        """Copy a frame into the next slot; returns its byte offset."""
+        offset = self._next * self.slot_bytes
+        self._next = (self._next + 1) % self.slots
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+        view[...] = frame
+        return offset
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# --- worker process side -------------------------------------------------------------
+def _build_job(job, config):
+    """Returns run(frame, rois) -> compact result dict for one detector."""
+    if job == "face":
+        from modules.face_eye_tracker import FaceEyeTracker
+
+        tracker = FaceEyeTracker()
+
+        def run(frame, rois):
+            face_detected, eyes_closed, looking_away, base_score = tracker.analyze_frame(frame)
+            return {"face_detected": face_detected, "eyes_closed": eyes_closed, "looking_away": looking_away,
+                    "base_score": base_score, "face_box": tracker.face_box}
+        return run
+
+    from utils.detections import is_phone, is_pen
+    from utils.roi import union_box
+    from utils.tracking import ObjectTracker
+
+    track = config["track"]
+
+    if job == "phone":
+        from modules.phone_detector import PhoneDetector
+
+        phone = PhoneDetector(config["phone_model"], tracker=ObjectTracker(keep=is_phone) if track else None)
+
+        def run(frame, rois):
+            phone.update(phone.detect(frame, (rois or {}).get("phone")))
+            return {"phone_detected": phone.mobile_detected, "phone_boxes": phone.last_boxes,
+                    "phone_visible_time": phone.visible_time()}
+        return run
+
+    if job == "pen":
+        from modules.pen_tracker import PenTracker
+
+        pen = PenTracker(config["pen_model"], tracker=ObjectTracker(keep=is_pen) if track else None)
+
+        def run(frame, rois):
+            pen.update(pen.detect(frame, (rois or {}).get("pen")))
+            return {"pen_detected": pen.pen_detected, "pen_boxes": pen.last_boxes,
+                    "pen_last_seen": pen.last_seen_time}
+        return run
+
+    if job == "objects":
+        from modules.object_detector import ObjectDetector
+
+        detector = ObjectDetector(config["fused_model"], track=track)
+
+        def run(frame, rois):
+            roi = union_box(rois.get("phone"), rois.get("pen")) if rois else None
+            detections = detector.detect(frame, roi)
+            detector.phone.update(detections)
+            detector.pen.update(detections)
+            return {"phone_detected": detector.phone.mobile_detected, "phone_boxes": detector.phone.last_boxes,
+                    "phone_visible_time": detector.phone.visible_time(),
+                    "pen_detected": detector.pen.pen_detected, "pen_boxes": detector.pen.last_boxes,
+                    "pen_last_seen": detector.pen.last_seen_time}
+        return run
+
+    raise ValueError(f"Unknown job: {job}")
+
+
+def _worker_main(job, config, requests, responses):
+    try:
+        run = _build_job(job, config)
+    except Exception as e:
+        responses.put(("error", None, repr(e)))
+        return
+    responses.put(("ready", None, None))
+
+    shm = None
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+        seq, shm_name, offset, shape, rois = msg
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=shm_name)
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        try:
+            responses.put((seq, run(frame, rois), None))
+        except Exception as e:
+            responses.put((seq, None, repr(e)))
+        del frame
+    if shm is not None:
+        shm.close()
+
+
+# --- parent side ---------------------------------------------------------------------
+class ProcessDetectorPool:
+    """
+    Starts one worker process per detector job and hands frames to them via
+    SharedFrameRing. Plugs into FrameAnalyzer through `face_tracker`,
+    `object_detector` and itself as the `dispatcher`:
+
+        pool = ProcessDetectorPool()
+        analyzer = FrameAnalyzer(pool.face_tracker, pool.object_detector, dispatcher=pool)
+    """
+
+    def __init__(self, detector_mode=None, phone_model="models/yolov8n.pt",
+                 pen_model="models/pen_detectorv2.pt", fused_model=None, slots=2, startup_timeout=120,
+                 track=None):
+        from modules.object_detector import FUSED_MODEL_PATH
+        from utils.tracking import tracking_from_env
+
+        fused_model = fused_model or FUSED_MODEL_PATH
+        mode = detector_mode or os.environ.get("FOCUS_DETECTOR", "separate")
+        object_jobs = ["objects"] if mode == "fused" and os.path.exists(fused_model) else ["phone", "pen"]
+        config = {"phone_model": phone_model, "pen_model": pen_model, "fused_model": fused_model,
+                  "track": tracking_from_env() if track is None else track}
+
+        # spawn: forking a process that already runs threads (CameraWorker) isn't safe
+        ctx = mp.get_context("spawn")
+        self.slots = slots
+        self.ring = None
+        self._seq = 0
+        self._requests = {}
+        self._responses = {}
+        self._procs = {}
+        for job in ["face"] + object_jobs:
+            self._requests[job] = ctx.Queue()
+            self._responses[job] = ctx.Queue()
+            proc = ctx.Process(target=_worker_main, name=f"detector-{job}",
+                               args=(job, config, self._requests[job], self._responses[job]), daemon=True)
+            proc.start()
+            self._procs[job] = proc
+
+        for job in self._procs:
+            status, _, error = self._responses[job].get(timeout=startup_timeout)
+            if status != "ready":
+                self.close()
+                raise RuntimeError(f"Detector process '{job}' failed to start: {error}")
+
+        self.face_tracker = _FaceProxy(self)
+        self.object_detector = _ObjectsProxy(self, object_jobs)
+
+    def dispatch(self, frame, jobs, rois=None):
+        """Copy the frame into shared memory once and start every listed job on it."""
+        jobs = [job for job in jobs if job in self._procs]
+        if not jobs:
+            return
+        if not frame.flags["C_CONTIGUOUS"]:
+            frame = np.ascontiguousarray(frame)
+        if self.ring is None or not self.ring.fits(frame):
+            old = self.ring
+            self.ring = SharedFrameRing(frame.shape, self.slots)
+            if old is not None:
+                old.close()
+        self._seq += 1
+        offset = self.ring.write(frame)
+        for job in jobs:
+            self._requests[job].put((self._seq, self.ring.name, offset, frame.shape, rois))
+
+    def collect(self, job, timeout=30):
+        while True:
+            seq, result, error = self._responses[job].get(timeout=timeout)
+            if seq != self._seq:
+                continue  # leftover from an older frame
+            if error is not None:
+                raise RuntimeError(f"Detector process '{job}' error: {error}")
+            return result
+
+    def close(self):
+        for job, proc in self._procs.items():
+            try:
+                self._requests[job].put(None)
+            except Exception:
+                pass
+        for proc in self._procs.values():
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+class _FaceProxy:
+    """Looks like FaceEyeTracker to FrameAnalyzer; the work happens in the face process."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.face_box = None
+
+    def analyze_frame(self, frame):
+        r = self.pool.collect("face")
+        self.face_box = r["face_box"]
+        return r["face_detected"], r["eyes_closed"], r["looking_away"], r["base_score"]
+
+
+class _ObjectsProxy:
+    """Looks like ObjectDetector / SeparateDetectors; keeps local copies of the boxes for drawing."""
+
+    def __init__(self, pool, job_names):
+        from modules.phone_detector import PhoneDetector
+        from modules.pen_tracker import PenTracker
+
+        self.pool = pool
+        self.job_names = job_names
+        self.phone = PhoneDetector(model_path=None)
+        self.pen = PenTracker(model_path=None)
+
+    def _apply(self, r):
+        out = {}
+        if "phone_detected" in r:
+            self.phone.mobile_detected = r["phone_detected"]
+            self.phone.last_boxes = r["phone_boxes"]
+            out["phone_detected"] = r["phone_detected"]
+            out["phone_visible_time"] = r["phone_visible_time"]
+        if "pen_detected" in r:
+            self.pen.pen_detected = r["pen_detected"]
+            self.pen.last_boxes = r["pen_boxes"]
+            self.pen.last_seen_time = r["pen_last_seen"]
+            out["pen_detected"] = r["pen_detected"]
+        return out
+
+    def redraw(self, frame):
+        return self.pen.redraw(self.phone.redraw(frame))
+
+    def jobs(self):
+        def make(job, redraw):
+            def run(frame, rois=None):
+                out = self._apply(self.pool.collect(job))
+                redraw(frame)
+                return out
+            return run, redraw
+
+        redraws = {"phone": self.phone.redraw, "pen": self.pen.redraw, "objects": self.redraw}
+        return {job: make(job, redraws[job]) for job in self.job_names}
+
+
+def exec_mode_from_env():
+    return os.environ.get("FOCUS_EXEC", "thread")
+
+
+def _compare(args):
+    from modules.frame_analyzer import create_frame_analyzer
+    from utils.frame_source import open_frame_source
+
+    # Preload frames so both modes measure detector throughput, not disk reads
+    source = open_frame_source(args.source, pacing="fast", loop=True)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(frame)
+    source.release()
+    if not frames:
+        print("❌ No frames read from", args.source)
+        return
+
+    def measure(exec_mode):
+        # No motion gating, so every detector runs on every frame in both modes
+        analyzer = create_frame_analyzer(args.detector, motion_gate=False, exec_mode=exec_mode)
+        try:
+            for frame in frames[:5]:  # warm-up
+                analyzer.analyze(frame.copy())
+            start = time.perf_counter()
+            for frame in frames:
+                analyzer.analyze(frame.copy())
+            return len(frames) / (time.perf_counter() - start)
+        finally:
+            analyzer.close()
+
+    thread_fps = measure("thread")
+    process_fps = measure("process")
+
+    print(f"🖥️  CPUs: {os.cpu_count()}  frames: {len(frames)}  size: {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"🧵 thread mode:  {thread_fps:.1f} FPS")
+    print(f"⚙️  process mode: {process_fps:.1f} FPS")
+    print(f"🚀 speedup: {process_fps / thread_fps:.2f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare in-process vs process-pool detector execution")
+    parser.add_argument("--source", default="synthetic:640x480")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--detector", choices=("separate", "fused"), default=None)
+    _compare(parser.parse_args())
@@ -0,0 +1,75 @@
+def _clip(box, width, height):
+    x1, y1, x2, y2 = box
+    return (max(0, int(x1)), max(0, int(y1)), min(width, int(x2)), min(height, int(y2)))
+
+
+def _area(box):
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+
+def union_box(a, b):
+    """Smallest box covering both; None (full frame) wins."""
+    if a is None or b is None:
+        return None
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def round_up_imgsz(width, height, max_imgsz=1280, stride=32):
+    """YOLO input size that keeps a crop at (roughly) native resolution."""
+    size = max(width, height)
+    size = ((size + stride - 1) // stride) * stride
+    return max(stride, min(max_imgsz, size))
+
+
+class ROIPlanner:
+    """
+    Derives detector regions from the face bounding box found by FaceEyeTracker:
+      "pen"   -> hands/desk area below and around the face
+      "phone" -> a wider area from just above the face down to the desk
+    A region of None means "run on the full frame". The planner also returns
+    None every `full_frame_every` frames, and whenever there's no face, so
+    objects outside the ROIs are still found.
+    """
+
+    def __init__(self, full_frame_every=10, min_size=256, max_coverage=0.8,
+                 pen_width=5.0, phone_width=6.0):
+        self.full_frame_every = full_frame_every
+        self.min_size = min_size          # never crop smaller than this (pixels)
+        self.max_coverage = max_coverage  # above this fraction of the frame, just use the full frame
+        self.pen_width = pen_width        # region widths in face widths
+        self.phone_width = phone_width
+        self._calls = 0
+
+    def plan(self, frame_shape, face_box):
+        """Returns {"phone": box or None, "pen": box or None}."""
+        self._calls += 1
+        full = {"phone": None, "pen": None}
+        if face_box is None or self._calls % self.full_frame_every == 0:
+            return full
+
+        height, width = frame_shape[:2]
+        fx1, fy1, fx2, fy2 = face_box
+        fw, fh = max(1, fx2 - fx1), max(1, fy2 - fy1)
+        cx = (fx1 + fx2) / 2
+
+        pen = (cx - fw * self.pen_width / 2, fy2 - fh * 0.25, cx + fw * self.pen_width / 2, height)
+        phone = (cx - fw * self.phone_width / 2, fy1 - fh * 0.5, cx + fw * self.phone_width / 2, height)
+
+        return {
+            "pen": self._finish(pen, width, height),
+            "phone": self._finish(phone, width, height),
+        }
+
+    def _finish(self, box, width, height):
+        x1, y1, x2, y2 = _clip(box, width, height)
+        # Grow tiny regions around their centre so YOLO still has context
+        if x2 - x1 < self.min_size:
+            cx = (x1 + x2) / 2
+            x1, x2 = cx - self.min_size / 2, cx + self.min_size / 2
+        if y2 - y1 < self.min_size:
+            cy = (y1 + y2) / 2
+            y1, y2 = cy - self.min_size / 2, cy + self.min_size / 2
+        box = _clip((x1, y1, x2, y2), width, height)
+        if _area(box) >= self.max_coverage * width * height:
+            return None
+        return box
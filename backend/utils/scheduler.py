@@ -0,0 +1,190 @@
+import math
+import os
+import time
+
+
+class _Job:
+    __slots__ = ("name", "min_every", "max_every", "priority", "expire_keys",
+                 "half_life", "every", "cost", "last_run_frame", "last_run_time", "last_valid_time",
+                 "result", "runs", "skips", "reused")
+
+    def __init__(self, name, min_every, max_every, priority, expire_keys, half_life):
+        self.name = name
+        self.min_every = min_every
+        self.max_every = max_every
+        self.priority = priority
+        self.expire_keys = expire_keys
+        self.half_life = half_life
+        self.every = min_every
+        self.cost = None  # EMA of run time (seconds)
+        self.last_run_frame = None
+        self.last_run_time = None
+        self.last_valid_time = None  # last run, or last time the result was confirmed still valid
+        self.result = {}
+        self.runs = 0
+        self.skips = 0
+        self.reused = 0
+
+
+class DetectorScheduler:
+    """
+    Decides per frame which detectors run so the loop holds `target_fps`.
+
+    Each detector's cost is measured while it runs. Every `adapt_every` frames
+    the cadences are recomputed: start from every detector at its `min_every`
+    and keep stretching the one whose skip saves the most time (scaled down by
+    its priority) until the estimated per-frame cost fits the budget.
+
+    Skipped detectors hand back their last result. Its confidence halves every
+    `half_life` seconds; once it drops below `min_confidence` the job's
+    `expire_keys` (e.g. phone_detected) fall back to False. With a target FPS
+    each job's half-life is stretched so a result carried over its longest
+    gap between runs (`max_every` frames at `target_fps`, times `gap_margin`)
+    is still valid, else positives would flicker off between runs.
+
+    target_fps=None disables adaptation and runs every detector every frame.
+    clock: returns the current time for ages and confidence (default
+    time.time; offline runs pass the video time). Costs always use the real
+    elapsed time.
+    """
+
+    def __init__(self, target_fps=None, adapt_every=15, cost_alpha=0.2, half_life=1.0, min_confidence=0.5,
+                 gap_margin=1.5, clock=None):
+        self.clock = clock or time.time
+        self.target_fps = target_fps
+        self.adapt_every = adapt_every
+        self.cost_alpha = cost_alpha
+        self.half_life = half_life
+        self.min_confidence = min_confidence
+        self.gap_margin = gap_margin
+        self.jobs = {}
+        self.frame_index = -1
+        self.overhead = 0.0  # EMA of per-frame time spent outside detectors
+        self._frame_start = None
+        self._frame_job_time = 0.0
+
+    def register(self, name, min_every=1, max_every=10, priority=1.0, expire_keys=(), half_life=None):
+        """half_life: seconds for this job's carried result (None -> derived from max_every, see above)."""
+        if half_life is None:
+            half_life = self._half_life(max_every)
+        self.jobs[name] = _Job(name, min_every, max_every, priority, tuple(expire_keys), half_life)
+
+    def _half_life(self, max_every):
+        if not self.target_fps or not 0 < self.min_confidence < 1:
+            return self.half_life
+        # Confidence reaches min_confidence only after gap_margin x the longest gap
+        gap = self.gap_margin * max_every / self.target_fps
+        return max(self.half_life, gap * math.log(0.5) / math.log(self.min_confidence))
+
+    # --- per-frame API -----------------------------------------------------------
+    def begin_frame(self):
+        self.frame_index += 1
+        self._frame_start = time.perf_counter()
+        self._frame_job_time = 0.0
+        return self.frame_index
+
+    def due(self, name):
+        job = self.jobs[name]
+        return job.last_run_frame is None or self.frame_index - job.last_run_frame >= job.every
+
+    def run(self, name, fn, *args):
+        """Run a detector, timing it and keeping its result for later frames."""
+        job = self.jobs[name]
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        self._frame_job_time += elapsed
+        job.cost = elapsed if job.cost is None else (1 - self.cost_alpha) * job.cost + self.cost_alpha * elapsed
+        job.last_run_frame = self.frame_index
+        job.last_run_time = job.last_valid_time = self.clock()
+        job.result = result
+        job.runs += 1
+        return result
+
+    def has_result(self, name):
+        return self.jobs[name].last_run_time is not None
+
+    def age(self, name):
+        """Seconds since the detector last actually ran."""
+        job = self.jobs[name]
+        return self.clock() - job.last_run_time if job.last_run_time is not None else float("inf")
+
+    def confidence(self, name):
+        job = self.jobs[name]
+        if job.last_valid_time is None:
+            return 0.0
+        age = self.clock() - job.last_valid_time
+        return 0.5 ** (age / job.half_life) if job.half_life else 1.0
+
+    def carried(self, name):
+        """Last result of a skipped detector, with expired positives cleared."""
+        job = self.jobs[name]
+        job.skips += 1
+        result = dict(job.result)
+        if self.confidence(name) < self.min_confidence:
+            for key in job.expire_keys:
+                if key in result:
+                    result[key] = False
+        return result
+
+    def reuse(self, name):
+        """
+        Reuse the last result of a due detector because the caller knows it is
+        still valid (e.g. nothing moved). Unlike carried(), this refreshes the
+        result's confidence and doesn't count as a cadence skip.
+        """
+        job = self.jobs[name]
+        job.reused += 1
+        job.last_valid_time = self.clock()
+        return dict(job.result)
+
+    def end_frame(self):
+        if self._frame_start is not None:
+            outside = time.perf_counter() - self._frame_start - self._frame_job_time
+            self.overhead = (1 - self.cost_alpha) * self.overhead + self.cost_alpha * max(0.0, outside)
+        if self.target_fps and self.frame_index % self.adapt_every == self.adapt_every - 1:
+            self.adapt()
+
+    # --- adaptation --------------------------------------------------------------
+    def _load(self, every):
+        return sum(job.cost / every[job.name] for job in self.jobs.values() if job.cost is not None)
+
+    def adapt(self):
+        budget = 1.0 / self.target_fps - self.overhead
+        every = {job.name: job.min_every for job in self.jobs.values()}
+
+        while self._load(every) > budget:
+            candidates = [job for job in self.jobs.values()
+                          if job.cost is not None and every[job.name] < job.max_every]
+            if not candidates:
+                break
+
+            def saving(job):
+                n = every[job.name]
+                return (job.cost / n - job.cost / (n + 1)) / job.priority
+
+            every[max(candidates, key=saving).name] += 1
+
+        for job in self.jobs.values():
+            job.every = every[job.name]
+
+    def stats(self):
+        return {
+            "target_fps": self.target_fps,
+            "jobs": {
+                job.name: {
+                    "every": job.every,
+                    "half_life": round(job.half_life, 2) if job.half_life else job.half_life,
+                    "cost_ms": round(job.cost * 1000, 2) if job.cost is not None else None,
+                    "runs": job.runs,
+                    "skips": job.skips,
+                    "reused": job.reused,
+                }
+                for job in self.jobs.values()
+            },
+        }
+
+
+def target_fps_from_env():
+    value = os.environ.get("FOCUS_TARGET_FPS")
+    return float(value) if value else None
@@ -0,0 +1,106 @@
+"""
+Per-stage timing hooks for the hot paths. Code wraps a stage in
+`with timed("facemesh"):`; the durations go to every registered recorder
+(the benchmark, the /metrics endpoint). With no recorder registered,
+`timed()` returns a shared no-op context manager, so the cost is a global
+lookup and two empty method calls.
+"""
+import threading
+import time
+
+import numpy as np
+
+_recorders = ()
+_lock = threading.Lock()
+
+
+class _NoOp:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoOp()
+
+
+class _Timed:
+    __slots__ = ("name", "recorders", "start")
+
+    def __init__(self, name, recorders):
+        self.name = name
+        self.recorders = recorders
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        for recorder in self.recorders:
+            recorder.record(self.name, elapsed)
+        return False
+
+
+def timed(name):
+    recorders = _recorders
+    if not recorders:
+        return _NOOP
+    return _Timed(name, recorders)
+
+
+def record(name, seconds):
+    """For durations measured elsewhere (e.g. a pipeline stage's busy time)."""
+    for recorder in _recorders:
+        recorder.record(name, seconds)
+
+
+def add_recorder(recorder):
+    global _recorders
+    with _lock:
+        if recorder not in _recorders:
+            _recorders = _recorders + (recorder,)
+    return recorder
+
+
+def remove_recorder(recorder):
+    global _recorders
+    with _lock:
+        _recorders = tuple(r for r in _recorders if r is not recorder)
+
+
+class SampleRecorder:
+    """Keeps every sample; for benchmarks, where percentiles must be exact."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+    def summary(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        out = {}
+        with self._lock:
+            items = list(self.samples.items())
+        for name, values in items:
+            ms = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            out[name] = {
+                "count": len(ms),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return out
@@ -0,0 +1,191 @@
+"""
+Detection traces: the per-frame detector outputs of a session in a compact
+binary file, so scoring experiments can be re-run without the models.
+
+File layout (little-endian):
+    8 bytes   magic b"FOCUSTRC"
+    4 bytes   format version
+    4 bytes   header length
+    header    JSON: class names, record dtype, metadata, data offset
+    padding   up to `data_offset` (a multiple of 64)
+    records   fixed-size TRACE_DTYPE records, one per frame
+
+Because records are fixed-size the data part maps straight onto a NumPy
+structured array (load_trace() uses np.memmap), and a trace cut short by a
+crash is still readable up to the last whole record.
+
+FOCUS_TRACE=<dir> makes every session write <dir>/<session>-<time>.ftrace;
+a value ending in .ftrace is used as the file name.
+"""
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from utils.dataset import DATASET_NAMES
+
+MAGIC = b"FOCUSTRC"
+VERSION = 1
+EXTENSION = ".ftrace"
+MAX_BOXES = 8  # per frame; more are dropped (lowest confidence first)
+CLASSES = ["cell phone"] + DATASET_NAMES
+UNKNOWN_CLASS = 255
+_CLASS_IDS = {name: i for i, name in enumerate(CLASSES)}
+
+TRACE_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("frame_id", "<i8"),
+    ("face", "u1"),
+    ("eyes_closed", "u1"),
+    ("looking_away", "u1"),
+    ("phone", "u1"),
+    ("pen", "u1"),
+    ("moving", "u1"),
+    ("ear_left", "<f4"),  # NaN when no face features were computed
+    ("ear_right", "<f4"),
+    ("yaw", "<f4"),
+    ("pitch", "<f4"),
+    ("gaze_x", "<f4"),
+    ("gaze_y", "<f4"),
+    ("base_score", "<f4"),
+    ("idle_time", "<f4"),
+    ("phone_visible_time", "<f4"),
+    ("face_box", "<i2", (4,)),  # -1 when there is no face
+    ("n_boxes", "u1"),
+    ("box_cls", "u1", (MAX_BOXES,)),
+    ("box_conf", "<f4", (MAX_BOXES,)),
+    ("boxes", "<i2", (MAX_BOXES, 4)),
+])
+
+_FEATURES = ("ear_left", "ear_right", "yaw", "pitch", "gaze_x", "gaze_y")
+
+
+class TraceWriter:
+    def __init__(self, path, meta=None, buffer_frames=1024):
+        """Records are buffered and written `buffer_frames` at a time."""
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._buffer = np.zeros(buffer_frames, dtype=TRACE_DTYPE)
+        self._count = 0
+        self.frames = 0
+        self._file = open(path, "wb")
+        self._write_header(meta or {})
+
+    def _write_header(self, meta):
+        header = {"classes": CLASSES, "dtype": TRACE_DTYPE.descr, "max_boxes": MAX_BOXES,
+                  "created": time.time(), "meta": meta}
+        # data_offset is part of the header, so size it with a placeholder first
+        header["data_offset"] = 0
+        size = 16 + len(json.dumps(header)) + 16
+        header["data_offset"] = -(-size // 64) * 64
+        raw = json.dumps(header).encode()
+        self._file.write(MAGIC + struct.pack("<II", VERSION, len(raw)) + raw)
+        self._file.write(b"\0" * (header["data_offset"] - self._file.tell()))
+
+    def record(self, result, analyzer=None, frame_id=0, now=None):
+        """
+        result: FrameAnalyzer result dict. analyzer: the FrameAnalyzer, for
+        the face features and the boxes behind the flags (not available from
+        worker processes in exec_mode="process").
+        """
+        fill_record(self._buffer[self._count], result, analyzer, frame_id, now)
+        self._count += 1
+        self.frames += 1
+        if self._count == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        if self._count:
+            self._file.write(self._buffer[:self._count].tobytes())
+            self._file.flush()
+            self._buffer[:self._count] = 0
+            self._count = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def fill_record(rec, result, analyzer=None, frame_id=0, now=None):
+    """Writes one frame into `rec`, a TRACE_DTYPE record (e.g. an element of a buffer array)."""
+    rec["t"] = time.time() if now is None else now
+    rec["frame_id"] = frame_id
+    rec["face"] = result["face_detected"]
+    rec["eyes_closed"] = result["eyes_closed"]
+    rec["looking_away"] = result.get("looking_away", False)
+    rec["phone"] = result["phone_detected"]
+    rec["pen"] = result["pen_detected"]
+    rec["moving"] = result.get("moving", True)
+    rec["base_score"] = result.get("base_score", 0)
+    rec["idle_time"] = result.get("idle_time", 0)
+    rec["phone_visible_time"] = result.get("phone_visible_time", 0)
+    rec["face_box"] = result.get("face_box") or (-1, -1, -1, -1)
+
+    features = getattr(getattr(analyzer, "face_tracker", None), "features", None) if result["face_detected"] else None
+    for name in _FEATURES:
+        rec[name] = features[name] if features else np.nan
+
+    detections = []
+    detector = getattr(analyzer, "object_detector", None)
+    for part in ("phone", "pen"):
+        detections.extend(getattr(getattr(detector, part, None), "last_detections", ()))
+    detections = sorted(detections, key=lambda d: -d.conf)[:MAX_BOXES]
+    rec["n_boxes"] = len(detections)
+    for i, d in enumerate(detections):
+        rec["box_cls"][i] = _CLASS_IDS.get(d.cls_name, UNKNOWN_CLASS)
+        rec["box_conf"][i] = d.conf
+        rec["boxes"][i] = d.box
+
+
+def write_trace(path, records, meta=None):
+    """Writes a whole array of records as a trace file (e.g. merged offline results)."""
+    writer = TraceWriter(path, meta=meta, buffer_frames=1)
+    writer._file.write(np.ascontiguousarray(records, dtype=TRACE_DTYPE).tobytes())
+    writer.frames = len(records)
+    writer.close()
+    return path
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(8) != MAGIC:
+            raise ValueError(f"{path} is not a focus trace")
+        version, size = struct.unpack("<II", f.read(8))
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version} in {path}")
+        return json.loads(f.read(size))
+
+
+def load_trace(path, mmap=True):
+    """Returns (header dict, structured array of records); mmap=False reads it into memory."""
+    header = read_header(path)
+    dtype = np.dtype([tuple(field) for field in header["dtype"]])
+    count = (os.path.getsize(path) - header["data_offset"]) // dtype.itemsize
+    if count <= 0:
+        return header, np.zeros(0, dtype=dtype)
+    if mmap:
+        return header, np.memmap(path, dtype=dtype, mode="r", offset=header["data_offset"], shape=(count,))
+    with open(path, "rb") as f:
+        f.seek(header["data_offset"])
+        return header, np.fromfile(f, dtype=dtype, count=count)
+
+
+def trace_path(session_id, target=None):
+    """File to write for a session, from `target` or $FOCUS_TRACE; None if tracing is off."""
+    target = target or os.environ.get("FOCUS_TRACE")
+    if not target or target == "0":
+        return None
+    if target.endswith(EXTENSION):
+        return target
+    return os.path.join(target, f"{session_id}-{time.strftime('%Y%m%d-%H%M%S')}{EXTENSION}")
+
+
+def open_trace(session_id, target=None, meta=None):
+    path = trace_path(session_id, target)
+    if path is None:
+        return None
+    print(f"📼 Recording detection trace to {path}")
+    return TraceWriter(path, meta=dict(meta or {}, session=session_id))
@@ -0,0 +1,244 @@
+"""
+Detect-then-track: run YOLO every few frames and move its boxes with
+Lucas-Kanade optical flow in between.
+
+Each YOLO box becomes a track with an ID. Between detections a handful of
+corner points inside each box are followed with cv2.calcOpticalFlowPyrLK and
+the box is shifted/scaled by their median motion. A track's quality is the
+share of points that survived a forward-backward check; when any track falls
+below `min_quality`, or `detect_every` frames have passed, the detector runs
+again and its boxes are matched to the tracks by IoU, so IDs (and how long an
+object has been visible) stay stable across detections.
+
+FOCUS_TRACK=1 turns it on for the phone/pen detectors; FOCUS_TRACK_EVERY sets
+the detection interval (default 10 frames).
+"""
+import itertools
+import os
+import time
+
+import cv2
+import numpy as np
+
+from utils.detections import Detection, box_iou
+from utils.timing import timed
+
+
+def tracking_from_env():
+    return os.environ.get("FOCUS_TRACK") == "1"
+
+
+def track_every_from_env():
+    return int(os.environ.get("FOCUS_TRACK_EVERY", 10))
+
+
+class Track:
+    __slots__ = ("track_id", "cls_name", "conf", "box", "points", "quality",
+                 "first_seen", "last_seen", "misses")
+
+    def __init__(self, track_id, detection, now):
+        self.track_id = track_id
+        self.cls_name = detection.cls_name
+        self.conf = detection.conf
+        self.box = tuple(float(v) for v in detection.box)  # sub-pixel, so flow steps don't truncate
+        self.points = None
+        self.quality = 1.0
+        self.first_seen = now
+        self.last_seen = now
+        self.misses = 0  # detections in a row that didn't confirm this track
+
+    def visible_for(self):
+        return self.last_seen - self.first_seen
+
+    def detection(self):
+        return Detection(self.cls_name, self.conf, tuple(int(round(v)) for v in self.box))
+
+
+class ObjectTracker:
+    def __init__(self, detect_every=None, min_quality=0.5, iou_threshold=0.3, max_misses=1,
+                 keep=None, max_points=20, flow_width=320, clock=None):
+        """
+        detect_every: run the detector at least every N frames (None -> $FOCUS_TRACK_EVERY).
+        keep: optional predicate on class names; other detections aren't tracked.
+        max_misses: detections a track may be missing from before it is dropped
+        (it isn't reported meanwhile, but keeps its ID and start time if it reappears).
+        flow_width: frames are downscaled to this width for optical flow.
+        clock: returns the current time for visible times (default time.time).
+        """
+        self.clock = clock or time.time
+        self.detect_every = detect_every or track_every_from_env()
+        self.min_quality = min_quality
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.keep = keep
+        self.max_points = max_points
+        self.flow_width = flow_width
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._prev_gray = None
+        self._scale = 1.0
+        self._since_detect = None
+        self.detections_run = 0
+        self.frames_tracked = 0
+
+    # --- public API --------------------------------------------------------------
+    def step(self, frame, detect, roi=None):
+        """
+        Returns this frame's detections: from detect(frame, roi) when a
+        detection is due, otherwise the tracked boxes moved by optical flow.
+        """
+        gray = self._gray(frame)
+        if self._due():
+            detections = detect(frame, roi)
+            if self.keep is not None:
+                detections = [d for d in detections if self.keep(d.cls_name)]
+            self._associate(detections, roi)
+            self._since_detect = 0
+            self.detections_run += 1
+        else:
+            with timed("track_flow"):
+                self._propagate(gray)
+            self._since_detect += 1
+            self.frames_tracked += 1
+        with timed("track_flow"):
+            self._refresh_points(gray)
+        self._prev_gray = gray
+        return [t.detection() for t in self.active()]
+
+    def active(self):
+        """Tracks confirmed by the last detection (the ones being reported)."""
+        return [t for t in self.tracks if t.misses == 0]
+
+    def visible_time(self, predicate=None):
+        """Longest time any reported object (matching `predicate`) has been visible, in seconds."""
+        return max((t.visible_for() for t in self.active() if predicate is None or predicate(t.cls_name)),
+                   default=0.0)
+
+    def reset(self):
+        self.tracks = []
+        self._prev_gray = None
+        self._since_detect = None
+
+    def stats(self):
+        total = self.detections_run + self.frames_tracked
+        return {
+            "tracks": len(self.active()),
+            "detections": self.detections_run,
+            "tracked_frames": self.frames_tracked,
+            "detect_ratio": round(self.detections_run / total, 3) if total else None,
+        }
+
+    # --- internals ---------------------------------------------------------------
+    def _due(self):
+        if self._since_detect is None or self._since_detect + 1 >= self.detect_every:
+            return True
+        return any(t.quality < self.min_quality for t in self.active())
+
+    def _gray(self, frame):
+        h, w = frame.shape[:2]
+        self._scale = min(1.0, self.flow_width / float(w))
+        if self._scale < 1.0:
+            frame = cv2.resize(frame, (self.flow_width, int(h * self._scale)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def _associate(self, detections, roi):
+        now = self.clock()
+        candidates = sorted(
+            ((box_iou(t.box, d.box), ti, di)
+             for ti, t in enumerate(self.tracks) for di, d in enumerate(detections)
+             if t.cls_name == d.cls_name),
+            reverse=True)
+        matched_tracks, matched_dets = set(), set()
+        for iou, ti, di in candidates:
+            if iou < self.iou_threshold:
+                break
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track, det = self.tracks[ti], detections[di]
+            track.box, track.conf = tuple(float(v) for v in det.box), det.conf
+            track.last_seen = now
+            track.misses = 0
+            track.quality = 1.0
+            track.points = None
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks and _inside(track.box, roi):
+                # Only a detection that looked where the track is can miss it
+                track.misses += 1
+                track.points = None
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        for di, det in enumerate(detections):
+            if di not in matched_dets:
+                survivors.append(Track(next(self._ids), det, now))
+        self.tracks = survivors
+
+    def _refresh_points(self, gray):
+        """Picks corners inside boxes that have none (new, re-detected or lost)."""
+        for track in self.active():
+            if track.points is not None and len(track.points) >= 4:
+                continue
+            x1, y1, x2, y2 = (int(v * self._scale) for v in track.box)
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(gray.shape[1], x2), min(gray.shape[0], y2)
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                track.points = None
+                continue
+            corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.max_points, 0.01, 3)
+            track.points = corners.reshape(-1, 2) + (x1, y1) if corners is not None else None
+
+    def _propagate(self, gray):
+        tracks = [t for t in self.active() if t.points is not None and len(t.points) >= 4]
+        for track in self.active():
+            if track not in tracks:
+                track.quality = 0.0  # nothing to follow: forces a detection next frame
+        if not tracks or self._prev_gray is None or self._prev_gray.shape != gray.shape:
+            return
+
+        counts = [len(t.points) for t in tracks]
+        prev = np.concatenate([t.points for t in tracks]).astype(np.float32).reshape(-1, 1, 2)
+        nxt, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev, None,
+                                                  winSize=(15, 15), maxLevel=2)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, nxt, None,
+                                                        winSize=(15, 15), maxLevel=2)
+        fb_error = np.linalg.norm(prev - back, axis=2).ravel()
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < 1.0)
+        prev, nxt = prev.reshape(-1, 2), nxt.reshape(-1, 2)
+
+        start = 0
+        now = self.clock()
+        for track, n in zip(tracks, counts):
+            ok = good[start:start + n]
+            p0, p1 = prev[start:start + n][ok], nxt[start:start + n][ok]
+            start += n
+            track.quality = ok.mean()
+            if len(p1) < 4:
+                track.points = None
+                continue
+            track.box = _move_box(track.box, p0 / self._scale, p1 / self._scale)
+            track.points = p1
+            track.last_seen = now
+
+
+def _inside(box, roi):
+    if roi is None:
+        return True
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    return roi[0] <= cx <= roi[2] and roi[1] <= cy <= roi[3]
+
+
+def _move_box(box, p0, p1):
+    """Shift by the median point motion and scale by the median change in spread (float box)."""
+    dx, dy = np.median(p1 - p0, axis=0)
+    spread0 = np.linalg.norm(p0 - p0.mean(axis=0), axis=1)
+    spread1 = np.linalg.norm(p1 - p1.mean(axis=0), axis=1)
+    valid = spread0 > 1e-3
+    scale = float(np.median(spread1[valid] / spread0[valid])) if valid.any() else 1.0
+    scale = min(1.2, max(0.8, scale))
+    cx, cy = (box[0] + box[2]) / 2 + dx, (box[1] + box[3]) / 2 + dy
+    hw, hh = (box[2] - box[0]) * scale / 2, (box[3] - box[1]) * scale / 2
+    return cx - hw, cy - hh, cx + hw, cy + hh